@@ -1,20 +1,20 @@
 # app/auth.py
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from app.core import config
 from app.db.database import user_collection
-
-# Contexto para Hashing de Senhas - Otimizado para performance
-pwd_context = CryptContext(
-    schemes=["bcrypt"], 
-    deprecated="auto",
-    bcrypt__rounds=12  # Reduzido de 12 para 10 rounds para melhor performance
+from app.services.password_hasher import (
+    pwd_context, password_hasher, hash_password_sync, verify_password_sync
 )
+from app.utils.cache import TTLCache
 
 # Esquema OAuth2 - URL corrigida para o Swagger
 oauth2_scheme = OAuth2PasswordBearer(
@@ -22,11 +22,112 @@ oauth2_scheme = OAuth2PasswordBearer(
     scheme_name="JWT"
 )
 
+# Esquema opcional: endpoints públicos que personalizam a resposta quando há token
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="/token",
+    scheme_name="JWT",
+    auto_error=False
+)
+
+# Cache de usuários autenticados: evita um find_one por requisição protegida
+principal_cache = TTLCache(
+    maxsize=config.USER_CACHE_MAX_SIZE,
+    ttl=config.USER_CACHE_TTL_SECONDS
+)
+
+# Projeção usada para carregar o usuário autenticado (nunca traz o hash da senha)
+PRINCIPAL_PROJECTION = {"password": 0}
+
+# Claim `type` do token de acesso (refresh tokens usam a mesma chave com type "refresh")
+ACCESS_TOKEN_TYPE = "access"
+
+
+# token_version atual por usuário: a fonte é o documento do usuário, o cache só evita
+# a consulta a cada requisição. Um reset neste processo atualiza o valor na hora;
+# nos demais workers a revogação vale em até USER_CACHE_TTL_SECONDS.
+token_version_floor = TTLCache(
+    maxsize=config.USER_CACHE_MAX_SIZE * 4,
+    ttl=config.USER_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_user_cache(username: str) -> None:
+    """Remove o usuário do cache de autenticação (ex.: após reset de senha)."""
+    principal_cache.invalidate(username)
+
+
+def revoke_tokens_before(username: str, token_version: int) -> None:
+    """Rejeita tokens autocontidos do usuário com versão anterior à informada."""
+    token_version_floor.set(username, token_version)
+    invalidate_user_cache(username)
+
+
+async def current_token_version(username: str) -> Optional[int]:
+    """
+    token_version vigente do usuário (cache em memória, banco na falta).
+
+    Returns:
+        Versão atual, ou None se o usuário não existe mais
+    """
+    token_version = token_version_floor.get(username)
+    if token_version is not None:
+        return token_version
+
+    user = await user_collection.find_one({"username": username}, {"token_version": 1})
+    if user is None:
+        return None
+
+    token_version = int(user.get("token_version", 0))
+    token_version_floor.set(username, token_version)
+    return token_version
+
+
+def build_token_claims(user: Dict) -> Dict:
+    """
+    Monta as claims do token de acesso para o usuário.
+
+    Com JWT_EMBED_PRINCIPAL habilitado, o token também carrega o ObjectId (`uid`)
+    e a versão do token (`tv`), permitindo autenticar sem consultar o banco.
+    """
+    claims = {"sub": user["username"]}
+    if config.JWT_EMBED_PRINCIPAL and user.get("_id") is not None:
+        claims["uid"] = str(user["_id"])
+        claims["tv"] = int(user.get("token_version", 0))
+    return claims
+
+
+def _principal_from_claims(payload: Dict) -> Optional[Dict]:
+    """Constrói o usuário autenticado a partir de um token autocontido."""
+    uid = payload.get("uid")
+    token_version = payload.get("tv")
+    if uid is None or token_version is None:
+        return None
+
+    try:
+        user_id = ObjectId(uid)
+    except (InvalidId, TypeError):
+        return None
+
+    return {
+        "_id": user_id,
+        "username": payload["sub"],
+        "token_version": int(token_version)
+    }
+
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_password_sync(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hash_password_sync(password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verifica a senha no pool de hashing, sem bloquear o event loop."""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Gera o hash da senha no pool de hashing, sem bloquear o event loop."""
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,10 +135,38 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": ACCESS_TOKEN_TYPE})
     encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm=config.ALGORITHM)
     return encoded_jwt
 
+# Cache de tokens já verificados: digest do token -> claims decodificadas (até o `exp`)
+verified_token_cache = TTLCache(maxsize=config.TOKEN_CACHE_MAX_SIZE, ttl=None)
+
+
+def decode_access_token(token: str, use_cache: bool = True) -> Dict:
+    """
+    Decodifica e valida o JWT, reaproveitando verificações anteriores do mesmo token.
+    
+    Raises:
+        JWTError: Token inválido, adulterado ou expirado
+    """
+    if not use_cache:
+        return jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+    
+    token_digest = hashlib.sha256(token.encode()).digest()
+    payload = verified_token_cache.get(token_digest)
+    if payload is not None:
+        return payload
+    
+    payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+    
+    exp = payload.get("exp")
+    remaining = exp - time.time() if isinstance(exp, (int, float)) else None
+    if remaining is not None and remaining > 0:
+        verified_token_cache.set(token_digest, payload, ttl=remaining)
+    
+    return payload
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     print(f"\n🔒 VERIFICANDO AUTENTICAÇÃO:")
     print(f"   🎫 Token recebido: {token[:20]}..." if token else "   ❌ Nenhum token fornecido")
@@ -50,12 +179,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     
     try:
         print(f"   🔍 Decodificando token JWT...")
-        payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         
         if username is None:
             print(f"   ❌ Username não encontrado no token!")
             raise credentials_exception
+        
+        # Só tokens de acesso: um refresh token (mesma assinatura) não autentica requisições
+        if payload.get("type") != ACCESS_TOKEN_TYPE:
+            print(f"   ❌ Token não é de acesso (type={payload.get('type')})")
+            raise credentials_exception
             
         print(f"   👤 Username extraído do token: {username}")
         print(f"   ⏰ Token expira em: {payload.get('exp', 'N/A')}")
@@ -64,12 +198,63 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         print(f"   ❌ Erro ao decodificar token: {type(e).__name__}: {str(e)}")
         raise credentials_exception
     
+    principal = _principal_from_claims(payload)
+    if principal is not None:
+        min_version = await current_token_version(username)
+        if min_version is None:
+            print(f"   ❌ Usuário '{username}' não encontrado no banco!")
+            raise credentials_exception
+        if principal["token_version"] < min_version:
+            print(f"   ❌ Token revogado (versão {principal['token_version']} < {min_version})")
+            raise credentials_exception
+        
+        print(f"   ⚡ Usuário autenticado pelas claims do token: {username}")
+        return principal
+    
+    user = principal_cache.get(username)
+    if user is not None:
+        print(f"   ⚡ Usuário obtido do cache: {username}")
+        return dict(user)
+    
     print(f"   🔍 Buscando usuário no banco de dados...")
-    user = await user_collection.find_one({"username": username})
+    user = await user_collection.find_one({"username": username}, PRINCIPAL_PROJECTION)
     
     if user is None:
         print(f"   ❌ Usuário '{username}' não encontrado no banco!")
         raise credentials_exception
+    
+    principal_cache.set(username, user)
         
     print(f"   ✅ Usuário autenticado com sucesso: {user.get('username', 'N/A')}")
-    return user
\ No newline at end of file
+    return dict(user)
+
+
+async def get_current_kiosk(current_user: dict = Depends(get_current_user)):
+    """Usuário autenticado que é uma conta de quiosque (KIOSK_USERNAMES); 403 caso contrário."""
+    if current_user["username"] not in config.KIOSK_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operação permitida apenas para contas de quiosque"
+        )
+    return current_user
+
+
+async def get_current_admin(current_user: dict = Depends(get_current_user)):
+    """Usuário autenticado que é administrador (ADMIN_USERNAMES); 403 caso contrário."""
+    if current_user["username"] not in config.ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operação permitida apenas para administradores"
+        )
+    return current_user
+
+
+async def get_optional_current_user(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """Usuário autenticado, ou None para requisições anônimas ou com token inválido."""
+    if not token:
+        return None
+    
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        return None
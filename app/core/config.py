@@ -7,4 +7,92 @@ MONGO_URL = os.getenv("MONGO_URL")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+
+# Pool de conexões do MongoDB (vazio = padrão do driver; tempos em ms, 0 = sem limite)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 0))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 0))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 20000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 0))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")  # ex.: "zstd,snappy,zlib"
+
+# Calendário de dias úteis: arquivo JSON de feriados (nacionais e da empresa)
+HOLIDAYS_FILE = os.getenv("HOLIDAYS_FILE", os.path.join(os.path.dirname(__file__), "holidays.json"))
+
+# Cache de usuários autenticados (get_current_user)
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 1024))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+
+# Pool de hashing de senhas (bcrypt fora do event loop)
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" ou "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+
+# Tokens autocontidos: inclui user_id e token_version nas claims do JWT,
+# dispensando a busca do usuário no banco a cada requisição autenticada
+JWT_EMBED_PRINCIPAL = os.getenv("JWT_EMBED_PRINCIPAL", "false").lower() in ("1", "true", "yes")
+
+# Controle de admissão dos endpoints de login
+LOGIN_MAX_CONCURRENT = int(os.getenv("LOGIN_MAX_CONCURRENT", 4))
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", 5))
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", 5))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 20))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 30))
+# Proxies reversos confiáveis (IPs ou CIDRs): só deles os headers X-Real-IP/X-Forwarded-For valem
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1")
+
+# Cache de tokens JWT já verificados (limite de entradas)
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 4096))
+
+# Cache do status de checkin por usuário (/checkin/status e /ranking/my-status)
+STATUS_CACHE_MAX_SIZE = int(os.getenv("STATUS_CACHE_MAX_SIZE", 4096))
+STATUS_CACHE_TTL_SECONDS = float(os.getenv("STATUS_CACHE_TTL_SECONDS", 300))
+# Usuário que ainda não fez checkin hoje: o checkin pode chegar por outro processo
+STATUS_CACHE_OPEN_TTL_SECONDS = float(os.getenv("STATUS_CACHE_OPEN_TTL_SECONDS", 10))
+
+# Ingestão de checkins em lote (quiosques e clientes offline)
+BATCH_CHECKIN_MAX_ITEMS = int(os.getenv("BATCH_CHECKIN_MAX_ITEMS", 500))
+BATCH_CHECKIN_MAX_AGE_DAYS = int(os.getenv("BATCH_CHECKIN_MAX_AGE_DAYS", 7))
+# Contas de quiosque autorizadas a enviar checkins em lote (usernames separados por vírgula)
+KIOSK_USERNAMES = {name.strip() for name in os.getenv("KIOSK_USERNAMES", "").split(",") if name.strip()}
+
+# Contas autorizadas nos endpoints /admin (usernames separados por vírgula; vazio = nenhuma)
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
+# Ranking semanal em memória (semanas mantidas e intervalo de ressincronização)
+LEADERBOARD_MAX_WEEKS = int(os.getenv("LEADERBOARD_MAX_WEEKS", 8))
+LEADERBOARD_RESYNC_SECONDS = float(os.getenv("LEADERBOARD_RESYNC_SECONDS", 300))
+
+# Ranking ao vivo (WebSocket / SSE): intervalo mínimo entre publicações e limite de conexões
+RANKING_BROADCAST_INTERVAL_MS = int(os.getenv("RANKING_BROADCAST_INTERVAL_MS", 1000))
+RANKING_STREAM_MAX_SUBSCRIBERS = int(os.getenv("RANKING_STREAM_MAX_SUBSCRIBERS", 5000))
+RANKING_STREAM_TOP = int(os.getenv("RANKING_STREAM_TOP", 10))
+
+# Agendador de manutenção (tarefas de banco fora do boot, um executor entre os workers)
+MAINTENANCE_JITTER_SECONDS = float(os.getenv("MAINTENANCE_JITTER_SECONDS", 10))
+MAINTENANCE_LOCK_TTL_SECONDS = float(os.getenv("MAINTENANCE_LOCK_TTL_SECONDS", 600))
+# Nova tentativa de tarefa que falhou: backoff exponencial da base até o máximo
+MAINTENANCE_RETRY_BASE_SECONDS = float(os.getenv("MAINTENANCE_RETRY_BASE_SECONDS", 5))
+MAINTENANCE_RETRY_MAX_SECONDS = float(os.getenv("MAINTENANCE_RETRY_MAX_SECONDS", 300))
+
+# Endpoints de saúde: timeout do ping (readiness) e validade das estatísticas em cache
+HEALTH_PING_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PING_TIMEOUT_SECONDS", 2))
+HEALTH_STATS_TTL_SECONDS = float(os.getenv("HEALTH_STATS_TTL_SECONDS", 60))
+
+# Snapshots do ranking semanal: remove os documentos por usuário após congelar a semana
+RANKING_SNAPSHOT_COMPACT = os.getenv("RANKING_SNAPSHOT_COMPACT", "false").lower() in ("1", "true", "yes")
+
+# Cache de respostas serializadas do ranking (por versão/variante, com ETag)
+RANKING_RESPONSE_CACHE_SIZE = int(os.getenv("RANKING_RESPONSE_CACHE_SIZE", 512))
+
+# Ranking write-behind: agrupa atualizações do ranking em memória e grava em lote
+RANKING_WRITE_BEHIND = os.getenv("RANKING_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+RANKING_FLUSH_INTERVAL_MS = int(os.getenv("RANKING_FLUSH_INTERVAL_MS", 500))
+RANKING_FLUSH_MAX_OPS = int(os.getenv("RANKING_FLUSH_MAX_OPS", 200))
+RANKING_MAX_PENDING_OPS = int(os.getenv("RANKING_MAX_PENDING_OPS", 5000))
+# Idade mínima de um checkin pendente para o replay (os mais novos ainda podem estar no buffer de um worker)
+RANKING_REPLAY_GRACE_SECONDS = float(os.getenv("RANKING_REPLAY_GRACE_SECONDS", 120))
@@ -1,69 +1,130 @@
+import asyncio
+import time
+
 import motor.motor_asyncio
+from pymongo import UpdateMany, UpdateOne
 from app.core import config
+from app.db.monitoring import command_monitor, pool_monitor
+
+
+def _client_options() -> dict:
+    """Opções do pool e timeouts do cliente (0 = sem limite, como no driver)."""
+    options = {
+        "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+        "event_listeners": [pool_monitor, command_monitor]
+    }
+    if config.MONGO_MAX_IDLE_TIME_MS > 0:
+        options["maxIdleTimeMS"] = config.MONGO_MAX_IDLE_TIME_MS
+    if config.MONGO_WAIT_QUEUE_TIMEOUT_MS > 0:
+        options["waitQueueTimeoutMS"] = config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if config.MONGO_SOCKET_TIMEOUT_MS > 0:
+        options["socketTimeoutMS"] = config.MONGO_SOCKET_TIMEOUT_MS
+    if config.MONGO_COMPRESSORS:
+        options["compressors"] = config.MONGO_COMPRESSORS
+    return options
+
 
 # Configuração do cliente MongoDB
-client = motor.motor_asyncio.AsyncIOMotorClient(config.MONGO_URL)
+client = motor.motor_asyncio.AsyncIOMotorClient(config.MONGO_URL, **_client_options())
 db = client[config.DATABASE_NAME]
 
 # Acesso às coleções
 user_collection = db.get_collection("users")
 checkin_collection = db.get_collection("checkins")
 ranking_collection = db.get_collection("weekly_rankings")
+refresh_token_collection = db.get_collection("refresh_tokens")
+all_time_collection = db.get_collection("all_time_totals")
+snapshot_collection = db.get_collection("ranking_snapshots")
+maintenance_lock_collection = db.get_collection("maintenance_locks")
+
+async def ping_database(timeout: float) -> float:
+    """
+    Verifica se o banco responde (comando ping, sem ler coleções).
+
+    Returns:
+        Latência do ping em milissegundos
+
+    Raises:
+        asyncio.TimeoutError: O banco não respondeu dentro do timeout
+    """
+    start_time = time.perf_counter()
+    await asyncio.wait_for(client.admin.command("ping"), timeout=timeout)
+    return round((time.perf_counter() - start_time) * 1000, 2)
 
 async def check_database_health():
-    """Verifica a saúde do banco de dados e retorna estatísticas básicas"""
+    """
+    Retorna estatísticas básicas do banco.
+
+    Usa estimated_document_count (metadados da coleção): o custo não cresce com os dados.
+    """
     try:
-        # Contar documentos em cada coleção
-        user_count = await user_collection.count_documents({})
-        checkin_count = await checkin_collection.count_documents({})
-        ranking_count = await ranking_collection.count_documents({})
-        
-        print(f"📊 Database Health Check:")
-        print(f"   👥 Usuários: {user_count}")
-        print(f"   ✅ Checkins: {checkin_count}")
-        print(f"   🏆 Rankings: {ranking_count}")
-        
         return {
-            "users": user_count,
-            "checkins": checkin_count,
-            "rankings": ranking_count,
+            "users": await user_collection.estimated_document_count(),
+            "checkins": await checkin_collection.estimated_document_count(),
+            "rankings": await ranking_collection.estimated_document_count(),
             "status": "healthy"
         }
     except Exception as e:
-        print(f"❌ Database Health Check Failed: {e}")
         return {"status": "error", "error": str(e)}
 
+# Usuários por lote da correção de usernames (uma operação por usuário e coleção)
+USERNAME_FIX_BATCH_SIZE = 1000
+
+
 async def fix_username_inconsistencies():
-    """Corrige inconsistências de username entre coleções"""
+    """
+    Corrige inconsistências de username entre coleções.
+
+    Percorre os usuários em lotes (apenas _id e username) e, para cada lote, envia um
+    bulk_write por coleção com um UpdateMany filtrado por user_id e username divergente:
+    a comparação acontece no servidor, usando o índice por user_id, e a memória fica
+    limitada ao tamanho do lote.
+    """
     print("🔧 Verificando consistência de usernames...")
     
-    corrections_made = 0
+    corrections = {"checkins": 0, "rankings": 0, "all_time": 0}
+    users_checked = 0
+    
+    async def apply_batch(batch):
+        # Mesmas operações para checkins e rankings (ambos referenciam o usuário por user_id)
+        user_ops = [
+            UpdateMany({"user_id": user_id, "username": {"$ne": username}}, {"$set": {"username": username}})
+            for user_id, username in batch
+        ]
+        total_ops = [
+            UpdateOne({"_id": user_id, "username": {"$ne": username}}, {"$set": {"username": username}})
+            for user_id, username in batch
+        ]
+        corrections["checkins"] += (await checkin_collection.bulk_write(user_ops, ordered=False)).modified_count
+        corrections["rankings"] += (await ranking_collection.bulk_write(user_ops, ordered=False)).modified_count
+        corrections["all_time"] += (await all_time_collection.bulk_write(total_ops, ordered=False)).modified_count
     
-    # Corrigir checkins
-    async for checkin in checkin_collection.find({}):
-        user = await user_collection.find_one({"_id": checkin["user_id"]})
-        if user and checkin.get("username") != user.get("username"):
-            await checkin_collection.update_one(
-                {"_id": checkin["_id"]},
-                {"$set": {"username": user["username"]}}
-            )
-            corrections_made += 1
-            print(f"   🔧 Corrigido username no checkin: {checkin.get('username')} → {user['username']}")
+    batch = []
+    async for user in user_collection.find({}, {"username": 1}, batch_size=USERNAME_FIX_BATCH_SIZE):
+        if not user.get("username"):
+            continue
+        batch.append((user["_id"], user["username"]))
+        if len(batch) >= USERNAME_FIX_BATCH_SIZE:
+            await apply_batch(batch)
+            users_checked += len(batch)
+            batch = []
+            print(f"   🔄 {users_checked} usuários verificados ({sum(corrections.values())} correções até agora)")
     
-    # Corrigir rankings
-    async for ranking in ranking_collection.find({}):
-        user = await user_collection.find_one({"_id": ranking["user_id"]})
-        if user and ranking.get("username") != user.get("username"):
-            await ranking_collection.update_one(
-                {"_id": ranking["_id"]},
-                {"$set": {"username": user["username"]}}
-            )
-            corrections_made += 1
-            print(f"   🔧 Corrigido username no ranking: {ranking.get('username')} → {user['username']}")
+    if batch:
+        await apply_batch(batch)
+        users_checked += len(batch)
     
+    corrections_made = sum(corrections.values())
     if corrections_made == 0:
         print("   ✅ Todos os usernames estão consistentes")
     else:
-        print(f"   ✅ {corrections_made} correções realizadas")
+        print(
+            f"   ✅ {corrections_made} correções realizadas "
+            f"(checkins: {corrections['checkins']}, rankings: {corrections['rankings']}, "
+            f"total geral: {corrections['all_time']})"
+        )
     
-    return corrections_made
\ No newline at end of file
+    return corrections_made
@@ -0,0 +1,130 @@
+"""
+Índices das coleções - criados pelo agendador de manutenção, fora do caminho de boot.
+"""
+from typing import List
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.db.database import (
+    user_collection, checkin_collection, ranking_collection, refresh_token_collection
+)
+from app.utils.exceptions import DatabaseError
+from app.utils.logging import system_logger
+
+# Índice não único antigo do ranking; substituído por RANKING_UNIQUE_INDEX
+LEGACY_RANKING_INDEX = "user_id_1_week_id_1"
+RANKING_UNIQUE_INDEX = "week_id_1_user_id_1_unique"
+
+# Índices únicos que garantem um checkin por usuário/dia e um único primeiro checkin do dia
+CHECKIN_UNIQUE_INDEXES = ("user_id_1_checkin_day_1", "first_checkin_day_1")
+
+# Confirmado uma vez por processo: índices não são removidos pela aplicação
+_checkin_indexes = {"ready": False}
+
+
+async def _create_index(failed: List[str], collection, keys, **options) -> bool:
+    """Cria um índice; uma falha é registrada em `failed` e não impede os demais."""
+    try:
+        await collection.create_index(keys, **options)
+        return True
+    except Exception as e:
+        name = options.get("name") or "_".join(f"{field}_{direction}" for field, direction in keys)
+        failed.append(f"{collection.name}.{name}")
+        system_logger.error(
+            "Erro ao criar índice",
+            error=e,
+            context={"collection": collection.name, "index": name}
+        )
+        return False
+
+
+async def ensure_indexes() -> None:
+    """
+    Cria (se ainda não existirem) os índices usados pelas consultas da aplicação.
+
+    Raises:
+        DatabaseError: Algum índice não pôde ser criado (os demais são criados mesmo assim)
+    """
+    failed: List[str] = []
+
+    # Username único (login e cadastro)
+    await _create_index(failed, user_collection, [("username", ASCENDING)], unique=True)
+
+    # Checkins por user_id e timestamp (otimiza verificações de checkin)
+    await _create_index(failed, checkin_collection, [("user_id", ASCENDING), ("timestamp", ASCENDING)])
+
+    # Chave única (user_id, checkin_day): garante um checkin por dia mesmo sob concorrência
+    await _create_index(
+        failed, checkin_collection,
+        [("user_id", ASCENDING), ("checkin_day", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"checkin_day": {"$exists": True}}
+    )
+
+    # Primeiro checkin do dia: só um documento por dia pode levar `first_checkin_day`
+    await _create_index(
+        failed, checkin_collection,
+        [("first_checkin_day", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"first_checkin_day": {"$exists": True}}
+    )
+
+    # Checkins por período (reconstrução do ranking por semana)
+    await _create_index(failed, checkin_collection, [("timestamp", ASCENDING)])
+
+    # Chave única (week_id, user_id) do ranking: exigida pelo $merge da reconstrução.
+    # Criada com outra ordem de campos para coexistir com o índice antigo, que só é
+    # removido depois que o único existe (a coleção nunca fica sem índice por usuário/semana)
+    if await _create_index(
+        failed, ranking_collection,
+        [("week_id", ASCENDING), ("user_id", ASCENDING)],
+        unique=True,
+        name=RANKING_UNIQUE_INDEX
+    ):
+        try:
+            if LEGACY_RANKING_INDEX in await ranking_collection.index_information():
+                await ranking_collection.drop_index(LEGACY_RANKING_INDEX)
+        except Exception as e:
+            failed.append(f"{ranking_collection.name}.{LEGACY_RANKING_INDEX} (drop)")
+            system_logger.error(
+                "Erro ao remover índice antigo do ranking",
+                error=e,
+                context={"index": LEGACY_RANKING_INDEX}
+            )
+
+    # Ranking da semana em ordem de pontos (paginação keyset por pontos desc, username)
+    await _create_index(
+        failed, ranking_collection,
+        [("week_id", ASCENDING), ("points", DESCENDING), ("username", ASCENDING)]
+    )
+
+    # Checkins ainda não aplicados ao ranking (modo write-behind)
+    await _create_index(
+        failed, checkin_collection,
+        [("ranking_pending", ASCENDING)],
+        partialFilterExpression={"ranking_pending": True}
+    )
+
+    # Refresh tokens: busca por hash e expiração automática (TTL)
+    await _create_index(failed, refresh_token_collection, [("token_hash", ASCENDING)], unique=True)
+    await _create_index(failed, refresh_token_collection, [("username", ASCENDING)])
+    await _create_index(failed, refresh_token_collection, [("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    if failed:
+        raise DatabaseError(
+            message="Falha ao criar índices",
+            error_code="INDEX_CREATION_ERROR",
+            details={"indexes": failed}
+        )
+
+
+async def checkin_indexes_ready() -> bool:
+    """
+    Indica se os índices únicos dos checkins já existem (criados por este ou outro worker).
+
+    Consulta o banco até a primeira confirmação; depois responde da memória.
+    """
+    if not _checkin_indexes["ready"]:
+        existing = await checkin_collection.index_information()
+        _checkin_indexes["ready"] = all(name in existing for name in CHECKIN_UNIQUE_INDEXES)
+    return _checkin_indexes["ready"]
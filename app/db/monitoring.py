@@ -0,0 +1,191 @@
+"""
+Instrumentação do driver MongoDB (pool de conexões e comandos) - Boas práticas Python aplicadas.
+Os listeners do pymongo rodam nas threads do Motor: os contadores são protegidos por lock
+e a memória é limitada (agregados por coleção/comando, sem guardar eventos).
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+# Limites (ms) dos buckets do histograma de espera por conexão
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+# Comandos de handshake/monitoramento que não entram nas métricas por coleção
+IGNORED_COMMANDS = frozenset({"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions"})
+
+
+class LatencyStats:
+    """Contagem, total e máximo de uma latência (em ms)."""
+
+    __slots__ = ("count", "failures", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, duration_ms: float, failed: bool = False) -> None:
+        self.count += 1
+        self.failures += failed
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Espera por conexão (checkout), conexões em uso e abertas, falhas de checkout."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Início do checkout por thread: início e fim do checkout acontecem na mesma thread
+        self._local = threading.local()
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.open_connections = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.pool_clears = 0
+        self.wait = LatencyStats()
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def _record_wait(self) -> None:
+        started = getattr(self._local, "checkout_started", None)
+        if started is None:
+            return
+        self._local.checkout_started = None
+        waited_ms = (time.perf_counter() - started) * 1000
+
+        bucket = len(WAIT_BUCKETS_MS)
+        for index, limit in enumerate(WAIT_BUCKETS_MS):
+            if waited_ms <= limit:
+                bucket = index
+                break
+        self.wait.add(waited_ms)
+        self.wait_buckets[bucket] += 1
+
+    def connection_check_out_started(self, event) -> None:
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            self._record_wait()
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self._record_wait()
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.pool_clears += 1
+
+    # Eventos sem métricas associadas
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do pool de conexões."""
+        with self._lock:
+            buckets = {f"<={limit}ms": count for limit, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+            buckets[f">{WAIT_BUCKETS_MS[-1]}ms"] = self.wait_buckets[-1]
+            return {
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "open_connections": self.open_connections,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pool_clears": self.pool_clears,
+                "checkout_wait": self.wait.to_dict(),
+                "checkout_wait_histogram": buckets
+            }
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Latência por comando e coleção (ex.: `checkins.find`, `weekly_rankings.update`)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[Any, int], str] = {}
+        self._commands: Dict[str, LatencyStats] = {}
+
+    @staticmethod
+    def _key(event) -> Optional[str]:
+        if event.command_name in IGNORED_COMMANDS:
+            return None
+        # getMore traz o id do cursor no nome do comando e a coleção em "collection"
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        return f"{collection}.{event.command_name}"
+
+    def started(self, event) -> None:
+        key = self._key(event)
+        if key is None:
+            return
+        with self._lock:
+            self._in_flight[(event.connection_id, event.request_id)] = key
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            key = self._in_flight.pop((event.connection_id, event.request_id), None)
+            if key is None:
+                return
+            stats = self._commands.get(key)
+            if stats is None:
+                stats = self._commands[key] = LatencyStats()
+            stats.add(event.duration_micros / 1000, failed)
+
+    def succeeded(self, event) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event) -> None:
+        self._finish(event, failed=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latência agregada por coleção/comando, dos mais lentos (tempo total) primeiro."""
+        with self._lock:
+            ordered = sorted(self._commands.items(), key=lambda item: item[1].total_ms, reverse=True)
+            return {
+                "in_flight": len(self._in_flight),
+                "commands": {key: stats.to_dict() for key, stats in ordered}
+            }
+
+
+# Instâncias globais registradas no cliente MongoDB (app/db/database.py)
+pool_monitor = PoolMonitor()
+command_monitor = CommandMonitor()
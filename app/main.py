@@ -1,9 +1,13 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
-from app.routers import checkin_router, ranking_router, user_router
-from app.db.database import user_collection, checkin_collection, ranking_collection
-from pymongo import ASCENDING
+from app.routers import admin_router, checkin_router, health_router, live_router, ranking_router, user_router
+from app.services.health import database_stats_cache
+from app.services.leaderboard import leaderboard
+from app.services.maintenance import maintenance_scheduler
+from app.services.ranking_broadcaster import ranking_broadcaster
+from app.services.ranking_writer import ranking_writer
+from app.utils.datetime_utils import get_current_datetime, get_week_id
 
 app = FastAPI(
     title="Squad Atendimentos - Treinamento Cognitivo",
@@ -79,42 +83,37 @@ async def optimized_logging_middleware(request, call_next):
         return await call_next(request)
 @app.on_event("startup")
 async def startup_db_client():
-    """Cria índices e verifica integridade do banco de dados no startup"""
+    """
+    Inicia os workers em segundo plano sem acessar o banco: índices, correções e
+    carga dos rankings em memória rodam no agendador de manutenção, depois do boot.
+    """
+    ranking_writer.start()
+    ranking_broadcaster.start()
+    maintenance_scheduler.start()
+    print("🚀 Aplicação iniciada (manutenção do banco em segundo plano)")
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Grava o ranking pendente e encerra os pools de workers usados fora do event loop"""
+    from app.services.password_hasher import password_hasher
+    
+    await maintenance_scheduler.stop()
+    await ranking_broadcaster.stop()
+    await leaderboard.stop()
+    
     try:
-        print("\n🚀 Iniciando configuração do banco de dados...")
-        
-        # Importar as funções de verificação
-        from app.db.database import check_database_health, fix_username_inconsistencies
-        
-        # Criar índices para otimizar performance das consultas
-        await user_collection.create_index([("username", ASCENDING)], unique=True)
-        print("✅ Índice de username criado com sucesso")
-        
-        # Índice para checkins por user_id e timestamp (otimiza verificações de checkin)
-        await checkin_collection.create_index([("user_id", ASCENDING), ("timestamp", ASCENDING)])
-        print("✅ Índice de checkins criado com sucesso")
-        
-        # Índice para rankings por user_id e week_id
-        await ranking_collection.create_index([("user_id", ASCENDING), ("week_id", ASCENDING)])
-        print("✅ Índice de rankings criado com sucesso")
-        
-        # Verificar saúde do banco
-        health = await check_database_health()
-        
-        # Corrigir inconsistências se houver dados
-        if health.get("users", 0) > 0:
-            await fix_username_inconsistencies()
-        
-        print("🎉 Banco de dados configurado e verificado com sucesso!\n")
-        
+        await ranking_writer.stop()
     except Exception as e:
-        print(f"⚠️ Aviso durante configuração do banco: {e}")
-        # Não falhar o startup por causa de problemas de banco
-        pass
+        print(f"⚠️ Erro ao gravar ranking pendente no shutdown: {e}")
+    
+    password_hasher.shutdown()
 
 app.include_router(user_router.router)
 app.include_router(checkin_router.router)
 app.include_router(ranking_router.router)
+app.include_router(live_router.router)
+app.include_router(admin_router.router)
+app.include_router(health_router.router)
 
 
 @app.get("/healthcheck", summary="Verificar saúde do sistema")
@@ -122,59 +121,31 @@ async def healthcheck():
     """
     Endpoint para verificar a saúde do sistema e banco de dados.
     
+    As contagens vêm do cache de estatísticas (estimadas, atualizadas em segundo plano),
+    então o custo não cresce com os dados.
+    
     Returns:
         dict: Status de saúde do sistema
-        
-    Raises:
-        HTTPException: Erro na verificação de saúde
     """
-    from app.utils.logging import system_logger
-    from app.db.database import check_database_health
-    from datetime import datetime
-    from app.services.logic import SAO_PAULO_TZ
+    current_time = get_current_datetime()
+    db_health = await database_stats_cache.get()
     
-    system_logger.info("🏥 Verificando saúde do sistema")
-    
-    try:
-        # Verificar saúde do banco
-        db_health = await check_database_health()
-        
-        # Informações do sistema
-        current_time = datetime.now(SAO_PAULO_TZ)
-        today = current_time.date()
-        week_id = f"{today.year}-W{today.isocalendar()[1]}"
-        
-        health_data = {
-            "status": "healthy",
-            "timestamp": current_time.isoformat(),
-            "current_date": today.isoformat(),
-            "current_week": week_id,
-            "database": db_health,
-            "timezone": "America/Sao_Paulo (UTC-3)"
-        }
-        
-        system_logger.info(
-            "✅ Sistema saudável",
-            {"database_status": db_health.get("status", "unknown")}
-        )
-        
-        return health_data
-        
-    except Exception as e:
-        system_logger.error("Erro na verificação de saúde", error=e)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Health check failed: {str(e)}"
-        )
+    return {
+        "status": "healthy" if db_health.get("status") == "healthy" else "degraded",
+        "timestamp": current_time.isoformat(),
+        "current_date": current_time.date().isoformat(),
+        "current_week": get_week_id(current_time.date()),
+        "database": db_health,
+        "timezone": "America/Sao_Paulo (UTC-3)"
+    }
 
 
 @app.get("/health", summary="Health check endpoint")
 async def health():
     """
-    Endpoint de health check padrão para containers Docker.
+    Endpoint de health check padrão para containers Docker (equivale a /health/ready).
     
     Returns:
-        dict: Status de saúde do sistema
+        dict: Status e latência do ping no banco
     """
-    return await healthcheck()
-
+    return await health_router.readiness()
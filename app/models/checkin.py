@@ -0,0 +1,12 @@
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel, Field
+
+from app.core.config import BATCH_CHECKIN_MAX_ITEMS
+
+class BatchCheckinItem(BaseModel):
+    username: str
+    timestamp: datetime  # Horário registrado no cliente (sem fuso = São Paulo)
+
+class BatchCheckinRequest(BaseModel):
+    items: List[BatchCheckinItem] = Field(..., min_length=1, max_length=BATCH_CHECKIN_MAX_ITEMS)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class RankingEntry(BaseModel):
     username: str
@@ -7,4 +8,31 @@ class RankingEntry(BaseModel):
 
 class WeeklyRankingResponse(BaseModel):
     week_id: str
-    ranking: List[RankingEntry]
\ No newline at end of file
+    ranking: List[RankingEntry]
+    total_participants: Optional[int] = None
+    user_position: Optional[int] = None  # Apenas com token; empates dividem a posição
+    percentile: Optional[float] = None  # % de participantes com pontuação menor ou igual
+    next_cursor: Optional[str] = None  # Cursor da próxima página (None no fim)
+
+class SnapshotEntry(RankingEntry):
+    position: int  # Empates dividem a posição
+
+class WeekSnapshotResponse(BaseModel):
+    week_id: str
+    start_date: str
+    end_date: str
+    frozen: bool  # False = semana ainda pode receber pontos (montada na hora)
+    closed_at: Optional[datetime] = None
+    total_participants: int
+    total_points: int
+    max_points: int
+    average_points: float
+    ranking: Optional[List[SnapshotEntry]] = None  # Omitido no histórico sem include_ranking
+
+class RankingHistoryResponse(BaseModel):
+    weeks: List[WeekSnapshotResponse]
+
+class RankingRebuildRequest(BaseModel):
+    week_ids: Optional[List[str]] = None  # None = todo o histórico
+    dry_run: bool = True  # Apenas compara com o ranking atual
+    concurrency: int = Field(4, ge=1, le=16)
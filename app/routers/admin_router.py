@@ -0,0 +1,183 @@
+"""
+Router para endpoints administrativos e de monitoramento - Boas práticas Python aplicadas.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.auth import get_current_admin, principal_cache, verified_token_cache
+from app.core import config
+from app.db.database import client
+from app.db.monitoring import command_monitor, pool_monitor
+from app.models.ranking import RankingRebuildRequest
+from app.services.all_time_totals import AllTimeTotalsService
+from app.services.checkin_service import user_status_cache
+from app.services.leaderboard import leaderboard
+from app.services.ranking_broadcaster import ranking_broadcaster
+from app.services.ranking_cache import ranking_response_cache
+from app.services.login_throttle import login_admission
+from app.services.maintenance import maintenance_scheduler
+from app.services.password_hasher import password_hasher
+from app.services.ranking_rebuild import RankingRebuildService, rebuild_status
+from app.services.ranking_snapshots import RankingSnapshotService
+from app.services.ranking_writer import ranking_writer
+from app.utils.exceptions import BusinessRuleError, ValidationError
+from app.utils.logging import system_logger
+from app.utils.workday_calendar import workday_calendar
+
+# Todos os endpoints exigem um administrador autenticado (ADMIN_USERNAMES)
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(get_current_admin)])
+
+
+@router.get("/metrics", summary="Métricas internas da aplicação")
+async def get_metrics():
+    """
+    Retorna contadores internos (caches, filas, pools) para dimensionamento.
+
+    Returns:
+        dict: Métricas agrupadas por componente
+    """
+    system_logger.info("📈 Consultando métricas internas")
+
+    return {
+        "principal_cache": principal_cache.stats(),
+        "verified_token_cache": verified_token_cache.stats(),
+        "user_status_cache": user_status_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "login_admission": login_admission.stats(),
+        "ranking_writer": ranking_writer.stats(),
+        "leaderboard": leaderboard.stats(),
+        "ranking_response_cache": ranking_response_cache.stats(),
+        "ranking_broadcaster": ranking_broadcaster.stats(),
+        "mongo_pool": pool_monitor.stats(),
+        "workday_calendar": workday_calendar.stats()
+    }
+
+
+@router.post("/rankings/rebuild", summary="Reconstruir ranking semanal a partir dos checkins")
+async def rebuild_rankings(request: RankingRebuildRequest):
+    """
+    Recalcula `weekly_rankings` a partir dos checkins (por semana, em paralelo).
+
+    Com `dry_run=true` (padrão) apenas retorna as diferenças, sem gravar.
+
+    Returns:
+        dict: Resumo por semana (e diferenças, no dry-run)
+    """
+    try:
+        return await RankingRebuildService.rebuild(
+            week_ids=request.week_ids,
+            dry_run=request.dry_run,
+            concurrency=request.concurrency
+        )
+    except BusinessRuleError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=e.message
+        )
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
+        )
+
+
+@router.get("/rankings/rebuild/status", summary="Progresso da reconstrução do ranking")
+async def get_rebuild_status():
+    """
+    Retorna o progresso da reconstrução em andamento (ou da última executada).
+
+    Returns:
+        dict: Semanas totais, concluídas, com falha e horários
+    """
+    return rebuild_status
+
+
+@router.get("/leaderboard/verify", summary="Verificar ranking em memória contra o banco")
+async def verify_leaderboard(week_id: Optional[str] = None):
+    """
+    Compara o ranking semanal em memória com `weekly_rankings` (semana atual por padrão).
+
+    Returns:
+        dict: Quantidade de divergências e exemplos
+    """
+    return await leaderboard.verify(week_id)
+
+
+@router.post("/all-time/backfill", summary="Reconstruir total geral a partir dos rankings semanais")
+async def backfill_all_time_totals():
+    """
+    Recalcula `all_time_totals` somando `weekly_rankings` (aggregation + $merge).
+
+    Returns:
+        dict: Quantidade de usuários e duração
+    """
+    return await AllTimeTotalsService.backfill()
+
+
+@router.post("/rankings/{week_id}/close", summary="Congelar o ranking de uma semana encerrada")
+async def close_ranking_week(week_id: str, compact: Optional[bool] = None):
+    """
+    Grava (ou regrava) o snapshot da semana; com `compact=true` remove os documentos
+    por usuário de `weekly_rankings` (padrão: RANKING_SNAPSHOT_COMPACT).
+
+    Returns:
+        dict: Estatísticas do snapshot gravado
+    """
+    try:
+        snapshot = await RankingSnapshotService.close_week(week_id, compact)
+    except BusinessRuleError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=e.message
+        )
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
+        )
+
+    return {
+        key: snapshot[key]
+        for key in ("week_id", "total_participants", "total_points", "closed_at", "compacted")
+    }
+
+
+@router.get("/maintenance", summary="Estado das tarefas de manutenção em segundo plano")
+async def get_maintenance_status():
+    """
+    Retorna as tarefas do agendador de manutenção neste processo (estado, execuções,
+    duração, último erro) e as travas compartilhadas entre os workers.
+
+    Returns:
+        dict: Tarefas e travas de manutenção
+    """
+    return await maintenance_scheduler.status()
+
+
+@router.get("/db/pool", summary="Pool de conexões e latência de comandos do MongoDB")
+async def get_database_pool():
+    """
+    Configuração do pool, espera por conexão (checkout), conexões em uso e latência
+    por coleção/comando, registradas pelos listeners do driver desde o boot.
+
+    Returns:
+        dict: Opções do pool, métricas do pool e dos comandos
+    """
+    options = client.options
+    pool_options = options.pool_options
+    return {
+        "options": {
+            "max_pool_size": pool_options.max_pool_size,
+            "min_pool_size": pool_options.min_pool_size,
+            "max_connecting": pool_options.max_connecting,
+            "max_idle_time_seconds": pool_options.max_idle_time_seconds,
+            "wait_queue_timeout_seconds": pool_options.wait_queue_timeout,
+            "connect_timeout_seconds": pool_options.connect_timeout,
+            "socket_timeout_seconds": pool_options.socket_timeout,
+            "server_selection_timeout_seconds": options.server_selection_timeout,
+            "compressors": [name for name in config.MONGO_COMPRESSORS.split(",") if name]
+        },
+        "pool": pool_monitor.stats(),
+        "commands": command_monitor.stats()
+    }
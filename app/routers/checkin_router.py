@@ -1,18 +1,42 @@
 """
 Router para endpoints de checkin - Boas práticas Python aplicadas.
 """
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.auth import get_current_user
+from app.auth import get_current_kiosk, get_current_user
+from app.db.indexes import checkin_indexes_ready
+from app.models.checkin import BatchCheckinRequest
+from app.services.batch_checkin_service import BatchCheckinService
 from app.services.checkin_service import CheckinService
-from app.schemas.responses import CheckinStatusResponse, CheckinResponse
-from app.utils.datetime_utils import format_date_brazilian, get_current_date
+from app.schemas.responses import CheckinStatusResponse, CheckinResponse, BatchCheckinResponse
+from app.utils.datetime_utils import format_date_brazilian, format_time_brazilian, get_current_date
 from app.utils.logging import checkin_logger
-from app.utils.exceptions import WeekendCheckinError, DuplicateCheckinError
 
 router = APIRouter(prefix="/checkin", tags=["Check-in"])
 
 
+async def require_checkin_indexes() -> None:
+    """
+    Só aceita gravações de checkin depois que os índices únicos existem: sem eles um
+    checkin duplicado (ou um segundo bônus de primeiro do dia) seria gravado.
+
+    Raises:
+        HTTPException: 503 com Retry-After enquanto os índices não estão prontos
+    """
+    try:
+        ready = await checkin_indexes_ready()
+    except Exception as e:
+        checkin_logger.error("Erro ao verificar índices de checkin", error=e)
+        ready = False
+
+    if not ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Check-in temporariamente indisponível, tente novamente em instantes",
+            headers={"Retry-After": "5"}
+        )
+
+
 @router.get("/status", 
            response_model=CheckinStatusResponse,
            summary="Verificar status do checkin de hoje")
@@ -35,36 +59,37 @@ async def get_checkin_status(current_user: dict = Depends(get_current_user)):
     )
     
     try:
-        # Verificar se pode fazer checkin
-        can_checkin_result = await CheckinService.can_user_checkin(user_id)
-        can_checkin = can_checkin_result["can_checkin"]
+        # Status completo com uma consulta (ou nenhuma, se em cache)
+        user_status = await CheckinService.get_user_status(user_id)
         
-        # Buscar último checkin
-        last_checkin = await CheckinService.get_user_last_checkin(user_id)
+    except Exception as e:
+        # Para erros de banco, retornar informação de erro
+        current_date = get_current_date()
+        
+        checkin_logger.error(
+            "Erro inesperado ao verificar status",
+            error=e,
+            context={"username": username}
+        )
         
         response_data = {
-            "can_checkin": can_checkin,
-            "last_checkin_date": last_checkin.date().isoformat() if last_checkin else None,
-            "last_checkin_formatted": format_date_brazilian(last_checkin) if last_checkin else None,
+            "can_checkin": False,
+            "reason": "Erro interno",
+            "message": "Ocorreu um erro ao verificar o status. Tente novamente.",
+            "today": current_date.isoformat(),
             "is_weekend": False,
             "already_checked_today": False,
-            "reason": "available",
-            "message": "Você pode fazer checkin agora",
-            "today": format_date_brazilian(get_current_date())
+            "last_checkin_date": None,
+            "last_checkin_formatted": None
         }
         
-        checkin_logger.info(
-            "✅ Status verificado - pode fazer checkin",
-            {
-                "username": username,
-                "can_checkin": can_checkin,
-                "last_checkin": response_data["last_checkin_formatted"] or "Nunca"
-            }
-        )
-        
         return response_data
-        
-    except WeekendCheckinError as e:
+    
+    last_checkin = user_status["last_checkin"]
+    last_checkin_date = last_checkin.date().isoformat() if last_checkin else None
+    last_checkin_formatted = format_date_brazilian(last_checkin) if last_checkin else None
+    
+    if user_status["is_weekend"]:
         # Retornar 200 com informação de fim de semana
         current_date = get_current_date()
         
@@ -74,9 +99,9 @@ async def get_checkin_status(current_user: dict = Depends(get_current_user)):
             "message": "Check-ins são permitidos apenas de Segunda a Sexta",
             "today": current_date.isoformat(),
             "is_weekend": True,
-            "already_checked_today": False,
-            "last_checkin_date": None,
-            "last_checkin_formatted": None
+            "already_checked_today": user_status["checked_today"],
+            "last_checkin_date": last_checkin_date,
+            "last_checkin_formatted": last_checkin_formatted
         }
         
         checkin_logger.info(
@@ -85,61 +110,83 @@ async def get_checkin_status(current_user: dict = Depends(get_current_user)):
         )
         
         return response_data
-        
-    except DuplicateCheckinError as e:
-        # Retornar 200 com informação de checkin já realizado
+    
+    if user_status["is_holiday"]:
+        # Retornar 200 com informação de feriado
         current_date = get_current_date()
-        last_checkin = await CheckinService.get_user_last_checkin(user_id)
         
         response_data = {
             "can_checkin": False,
-            "reason": "Checkin já realizado hoje",
-            "message": f"Você já fez checkin hoje às {e.details.get('checkin_time', 'N/A')}",
+            "reason": "Hoje é feriado",
+            "message": "Check-ins não são permitidos em feriados",
             "today": current_date.isoformat(),
             "is_weekend": False,
-            "already_checked_today": True,
-            "last_checkin_date": last_checkin.date().isoformat() if last_checkin else None,
-            "last_checkin_formatted": format_date_brazilian(last_checkin) if last_checkin else None
+            "already_checked_today": user_status["checked_today"],
+            "last_checkin_date": last_checkin_date,
+            "last_checkin_formatted": last_checkin_formatted
         }
         
         checkin_logger.info(
-            "🚫 Status verificado - já fez checkin",
-            {
-                "username": username,
-                "checkin_time": e.details.get('checkin_time', 'N/A')
-            }
+            "🚫 Status verificado - feriado",
+            {"username": username, "date": current_date.isoformat()}
         )
         
         return response_data
-        
-    except Exception as e:
-        # Para outros erros, retornar informação de erro
+    
+    if user_status["checked_today"]:
+        # Retornar 200 com informação de checkin já realizado
         current_date = get_current_date()
-        
-        checkin_logger.error(
-            "Erro inesperado ao verificar status",
-            error=e,
-            context={"username": username}
-        )
+        checkin_time = format_time_brazilian(last_checkin)
         
         response_data = {
             "can_checkin": False,
-            "reason": "Erro interno",
-            "message": "Ocorreu um erro ao verificar o status. Tente novamente.",
+            "reason": "Checkin já realizado hoje",
+            "message": f"Você já fez checkin hoje às {checkin_time}",
             "today": current_date.isoformat(),
             "is_weekend": False,
-            "already_checked_today": False,
-            "last_checkin_date": None,
-            "last_checkin_formatted": None
+            "already_checked_today": True,
+            "last_checkin_date": last_checkin_date,
+            "last_checkin_formatted": last_checkin_formatted
         }
         
+        checkin_logger.info(
+            "🚫 Status verificado - já fez checkin",
+            {
+                "username": username,
+                "checkin_time": checkin_time
+            }
+        )
+        
         return response_data
+    
+    response_data = {
+        "can_checkin": True,
+        "last_checkin_date": last_checkin_date,
+        "last_checkin_formatted": last_checkin_formatted,
+        "is_weekend": False,
+        "already_checked_today": False,
+        "reason": "available",
+        "message": "Você pode fazer checkin agora",
+        "today": format_date_brazilian(get_current_date())
+    }
+    
+    checkin_logger.info(
+        "✅ Status verificado - pode fazer checkin",
+        {
+            "username": username,
+            "can_checkin": True,
+            "last_checkin": last_checkin_formatted or "Nunca"
+        }
+    )
+    
+    return response_data
 
 
 @router.post("/", 
             status_code=status.HTTP_201_CREATED,
             response_model=CheckinResponse,
-            summary="Realizar checkin")
+            summary="Realizar checkin",
+            dependencies=[Depends(require_checkin_indexes)])
 async def perform_checkin(current_user: dict = Depends(get_current_user)):
     """
     Realiza o check-in do usuário autenticado.
@@ -174,4 +221,35 @@ async def perform_checkin(current_user: dict = Depends(get_current_user)):
         }
     )
     
-    return result
\ No newline at end of file
+    return result
+
+
+@router.post("/batch",
+            response_model=BatchCheckinResponse,
+            summary="Realizar checkins em lote",
+            dependencies=[Depends(require_checkin_indexes)])
+async def perform_batch_checkin(
+    batch: BatchCheckinRequest,
+    current_user: dict = Depends(get_current_kiosk)
+):
+    """
+    Registra vários checkins (usuário, horário do cliente) em uma única chamada.
+    Usado por quiosques que ficaram offline. Cada item é validado
+    individualmente (fim de semana, duplicados) e o resultado é retornado por item.
+    
+    Args:
+        batch: Itens do lote
+        current_user: Conta de quiosque autenticada via JWT (KIOSK_USERNAMES)
+    
+    Returns:
+        BatchCheckinResponse: Totais e resultado de cada item
+        
+    Raises:
+        DatabaseError: Erro nas operações de banco
+    """
+    checkin_logger.info(
+        "📦 Iniciando checkin em lote",
+        {"submitted_by": current_user["username"], "items": len(batch.items)}
+    )
+    
+    return await BatchCheckinService.process_batch(batch.items)
@@ -0,0 +1,62 @@
+"""
+Router dos endpoints de saúde (liveness, readiness e estatísticas) - Boas práticas Python aplicadas.
+"""
+from fastapi import APIRouter, HTTPException, status
+
+from app.core import config
+from app.db.database import ping_database
+from app.services.health import database_stats_cache
+from app.utils.datetime_utils import get_current_datetime
+from app.utils.logging import system_logger
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live", summary="Liveness (processo respondendo)")
+async def liveness():
+    """
+    Indica que o processo está de pé. Não acessa o banco nem outros serviços.
+
+    Returns:
+        dict: Status fixo
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready", summary="Readiness (banco acessível)")
+async def readiness():
+    """
+    Indica que a aplicação pode receber tráfego: um ping no banco com timeout.
+
+    Returns:
+        dict: Status e latência do ping
+
+    Raises:
+        HTTPException: 503 se o banco não responder dentro do timeout
+    """
+    try:
+        latency_ms = await ping_database(config.HEALTH_PING_TIMEOUT_SECONDS)
+    except Exception as e:
+        system_logger.warning("⚠️ Banco indisponível no readiness", {"error": type(e).__name__})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Banco de dados indisponível"
+        )
+
+    return {"status": "ready", "database_latency_ms": latency_ms}
+
+
+@router.get("/stats", summary="Estatísticas do banco (em cache)")
+async def database_stats():
+    """
+    Contagens estimadas das coleções, em cache por HEALTH_STATS_TTL_SECONDS
+    e atualizadas em segundo plano.
+
+    Returns:
+        dict: Contagens, horário da última atualização e idade do valor
+    """
+    current_time = get_current_datetime()
+    return {
+        "timestamp": current_time.isoformat(),
+        "database": await database_stats_cache.get()
+    }
@@ -0,0 +1,110 @@
+"""
+Router do ranking ao vivo (WebSocket e Server-Sent Events) - Boas práticas Python aplicadas.
+"""
+import asyncio
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.services.ranking_broadcaster import ranking_broadcaster
+from app.utils.exceptions import ServiceOverloadedError
+from app.utils.logging import system_logger
+
+router = APIRouter(tags=["Ranking ao vivo"])
+
+# Comentário SSE periódico: mantém a conexão aberta em proxies com timeout de leitura
+SSE_HEARTBEAT_SECONDS = 15
+
+# Código de fechamento WebSocket "Try Again Later"
+WS_TRY_AGAIN_LATER = 1013
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    """Consome (e ignora) mensagens do cliente até a desconexão."""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/ws/ranking")
+async def ranking_websocket(websocket: WebSocket):
+    """
+    Ranking da semana atual ao vivo.
+
+    Envia uma mensagem `snapshot` (primeiras posições) ao conectar e depois `update`
+    com os usuários que mudaram (no máximo uma por intervalo). `resync` indica que
+    o cliente ficou para trás e deve recarregar GET /ranking/weekly.
+    """
+    try:
+        queue = ranking_broadcaster.subscribe()
+    except ServiceOverloadedError as e:
+        system_logger.warning("Ranking ao vivo lotado", {"details": e.details})
+        # Fechar antes do accept vira um 403 no handshake; o código 1013 só chega
+        # ao cliente numa conexão já aceita
+        await websocket.accept()
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
+        return
+
+    try:
+        await websocket.accept()
+        await websocket.send_text((await ranking_broadcaster.snapshot_message()).text)
+
+        async def forward() -> None:
+            while True:
+                message = await queue.get()
+                await websocket.send_text(message.text)
+
+        tasks = {asyncio.create_task(forward()), asyncio.create_task(_wait_disconnect(websocket))}
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ranking_broadcaster.unsubscribe(queue)
+
+
+@router.get("/ranking/stream", summary="Ranking semanal ao vivo (Server-Sent Events)")
+async def ranking_stream():
+    """
+    Alternativa SSE ao WebSocket `/ws/ranking`, com as mesmas mensagens
+    (eventos `snapshot`, `update` e `resync`).
+    
+    Returns:
+        StreamingResponse: Fluxo `text/event-stream`
+        
+    Raises:
+        HTTPException: 503 se o limite de conexões for atingido
+    """
+    try:
+        queue = ranking_broadcaster.subscribe()
+    except ServiceOverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.message,
+            headers={"Retry-After": "5"}
+        )
+
+    async def events():
+        try:
+            yield (await ranking_broadcaster.snapshot_message()).event
+            # A desconexão do cliente cancela o gerador (StreamingResponse)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield message.event
+        finally:
+            ranking_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,25 +1,64 @@
 """
 Router para endpoints de ranking - Boas práticas Python aplicadas.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from typing import Optional
 
-from app.auth import get_current_user
-from app.db.database import ranking_collection
-from app.models.ranking import WeeklyRankingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+
+from app.auth import get_current_user, get_optional_current_user
+from app.models.ranking import RankingHistoryResponse, WeekSnapshotResponse, WeeklyRankingResponse
+from app.services.all_time_totals import AllTimeTotalsService
 from app.services.checkin_service import CheckinService
+from app.services.leaderboard import leaderboard
+from app.services.ranking_cache import ranking_response_cache
+from app.services.ranking_snapshots import MAX_HISTORY_WEEKS, RankingSnapshotService
 from app.schemas.responses import CheckinStatusResponse
 from app.utils.datetime_utils import get_current_date, get_week_id, format_date_brazilian
 from app.utils.decorators import handle_exceptions, log_execution_time
 from app.utils.logging import system_logger, checkin_logger
-from app.utils.exceptions import DatabaseError, WeekendCheckinError, DuplicateCheckinError
+from app.utils.exceptions import DatabaseError, ValidationError
+from app.utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/ranking", tags=["Ranking"])
 
+# Parâmetros de paginação compartilhados pelos rankings
+PAGE_LIMIT_QUERY = Query(100, ge=1, le=500, description="Entradas por página")
+CURSOR_QUERY = Query(None, description="Cursor `next_cursor` da página anterior")
+AROUND_ME_QUERY = Query(None, ge=1, le=50, description="Posições acima e abaixo do usuário")
+
+
+def _parse_cursor(cursor: Optional[str]):
+    """Decodifica o cursor recebido (400 se malformado)."""
+    try:
+        return decode_cursor(cursor)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+
+def _next_cursor(next_after) -> Optional[str]:
+    """Cursor opaco da próxima página (None no fim do ranking)."""
+    return encode_cursor(*next_after) if next_after else None
+
 
 @router.get("/weekly", response_model=WeeklyRankingResponse, summary="Ranking semanal")
-async def get_current_weekly_ranking():
+async def get_current_weekly_ranking(
+    request: Request,
+    limit: int = PAGE_LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    around_me: Optional[int] = AROUND_ME_QUERY,
+    current_user: Optional[dict] = Depends(get_optional_current_user)
+):
     """
-    Retorna o ranking da semana atual, ordenado por pontos.
+    Retorna o ranking da semana atual, ordenado por pontos (desempate por username).
+    Com token, inclui a posição e o percentil do usuário (mesmo fora do top 100).
+    
+    Args:
+        request: Requisição (If-None-Match para revalidação com ETag)
+        limit: Entradas por página
+        cursor: Continuação (keyset) a partir da página anterior
+        around_me: Retorna as `around_me` posições acima e abaixo do usuário (exige token)
+        current_user: Usuário autenticado via JWT (opcional)
     
     Returns:
         WeeklyRankingResponse: Ranking da semana atual com informações contextuais
@@ -29,41 +68,132 @@ async def get_current_weekly_ranking():
     """
     system_logger.info("📊 Consultando ranking semanal")
     
-    try:
-        current_date = get_current_date()
-        week_id = get_week_id(current_date)
-
-        # Busca otimizada com projeção e limite
-        ranking_cursor = ranking_collection.find(
-            {"week_id": week_id},
-            {"_id": 0, "username": 1, "points": 1}
-        ).sort("points", -1).limit(100)
+    after = _parse_cursor(cursor)
+    if around_me and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="around_me exige autenticação",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    
+    current_date = get_current_date()
+    week_id = get_week_id(current_date)
+    user_id = current_user["_id"] if current_user is not None else None
 
-        ranking_list = await ranking_cursor.to_list(length=100)
-        
-        response_data = {
-            "week_id": week_id, 
-            "ranking": ranking_list
-        }
+    async def render() -> bytes:
+        try:
+            # Ranking em memória (carregado do banco apenas na primeira consulta da semana)
+            board = await leaderboard.get_board(week_id)
+            if around_me:
+                ranking_list, next_after = board.around(current_user["_id"], around_me)
+            else:
+                ranking_list, next_after = board.page(after, limit)
         
-        system_logger.info(
-            "✅ Ranking semanal obtido com sucesso",
-            {
-                "week_id": week_id,
-                "participants": len(ranking_list),
-                "top_scorer": ranking_list[0]["username"] if ranking_list else "N/A"
+            response_data = {
+                "week_id": week_id, 
+                "ranking": ranking_list,
+                "total_participants": board.histogram.total,
+                "next_cursor": _next_cursor(next_after)
             }
-        )
         
-        return response_data
+            # Posição e percentil pelo histograma de pontuações (sem ordenar nem paginar)
+            if current_user is not None:
+                response_data.update(board.position(current_user["_id"]))
         
+            system_logger.info(
+                "✅ Ranking semanal obtido com sucesso",
+                {
+                    "week_id": week_id,
+                    "participants": len(ranking_list),
+                    "top_scorer": ranking_list[0]["username"] if ranking_list else "N/A"
+                }
+            )
+        
+            return WeeklyRankingResponse(**response_data).model_dump_json().encode()
+        
+        except Exception as e:
+            system_logger.error(
+                "Erro ao buscar ranking semanal",
+                error=e,
+                context={"week_id": week_id}
+            )
+            raise DatabaseError("Falha ao consultar ranking semanal") from e
+
+    # Resposta pública é a mesma para todos; a personalizada inclui o usuário na variante
+    variant = ("weekly", week_id, limit, after, around_me, user_id)
+    return await ranking_response_cache.respond(request, variant, render)
+
+
+@router.get("/weekly/{week_id}", response_model=WeekSnapshotResponse, summary="Ranking de uma semana")
+async def get_weekly_ranking_by_week(week_id: str):
+    """
+    Retorna o ranking completo de uma semana (YYYY-WNN) com as estatísticas.
+    
+    Semanas encerradas são lidas do snapshot congelado (um documento por semana);
+    semanas ainda abertas a checkins são montadas a partir do ranking atual.
+    
+    Args:
+        week_id: Semana no formato YYYY-WNN
+    
+    Returns:
+        WeekSnapshotResponse: Ranking ordenado e estatísticas da semana
+        
+    Raises:
+        HTTPException: 400 se a semana for inválida ou futura
+        DatabaseError: Erro ao consultar o ranking
+    """
+    system_logger.info("📚 Consultando ranking de semana", {"week_id": week_id})
+    
+    try:
+        return await RankingSnapshotService.get_week(week_id)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
         system_logger.error(
-            "Erro ao buscar ranking semanal",
+            "Erro ao buscar ranking da semana",
             error=e,
-            context={"week_id": week_id if 'week_id' in locals() else "unknown"}
+            context={"week_id": week_id}
         )
-        raise DatabaseError("Falha ao consultar ranking semanal") from e
+        raise DatabaseError("Falha ao consultar ranking da semana") from e
+
+
+@router.get("/history", response_model=RankingHistoryResponse, summary="Histórico de rankings semanais")
+async def get_ranking_history(
+    from_week: Optional[str] = Query(None, description="Primeira semana (YYYY-WNN, inclusive)"),
+    to_week: Optional[str] = Query(None, description="Última semana (YYYY-WNN, inclusive)"),
+    limit: int = Query(12, ge=1, le=MAX_HISTORY_WEEKS, description="Quantidade máxima de semanas"),
+    include_ranking: bool = Query(False, description="Inclui o ranking completo de cada semana")
+):
+    """
+    Retorna as semanas congeladas no intervalo, da mais recente para a mais antiga.
+    
+    Args:
+        from_week: Primeira semana do intervalo
+        to_week: Última semana do intervalo
+        limit: Quantidade máxima de semanas
+        include_ranking: Inclui o array do ranking (por padrão, apenas as estatísticas)
+    
+    Returns:
+        RankingHistoryResponse: Semanas com estatísticas (e ranking, se solicitado)
+        
+    Raises:
+        HTTPException: 400 se alguma semana for inválida
+        DatabaseError: Erro ao consultar o histórico
+    """
+    system_logger.info(
+        "📚 Consultando histórico de rankings",
+        {"from_week": from_week or "início", "to_week": to_week or "atual"}
+    )
+    
+    try:
+        weeks = await RankingSnapshotService.history(from_week, to_week, limit, include_ranking)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except Exception as e:
+        system_logger.error("Erro ao buscar histórico de rankings", error=e)
+        raise DatabaseError("Falha ao consultar histórico de rankings") from e
+    
+    return {"weeks": weeks}
 
 
 @router.get("/my-status", 
@@ -93,25 +223,13 @@ async def get_my_status(current_user: dict = Depends(get_current_user)):
     )
     
     try:
-        # Verificar se pode fazer checkin usando service layer
-        try:
-            can_checkin_result = await CheckinService.can_user_checkin(user_id)
-            can_checkin = can_checkin_result["can_checkin"]
-            is_weekend = False
-            already_checked_today = False
-            
-        except WeekendCheckinError:
-            can_checkin = False
-            is_weekend = True
-            already_checked_today = False
-            
-        except DuplicateCheckinError:
-            can_checkin = False
-            is_weekend = False
-            already_checked_today = True
-        
-        # Buscar último checkin
-        last_checkin = await CheckinService.get_user_last_checkin(user_id)
+        # Status completo com uma consulta (ou nenhuma, se em cache)
+        user_status = await CheckinService.get_user_status(user_id)
+        can_checkin = user_status["can_checkin"]
+        is_weekend = user_status["is_weekend"]
+        is_holiday = user_status["is_holiday"]
+        already_checked_today = user_status["checked_today"]
+        last_checkin = user_status["last_checkin"]
         
         response_data = {
             "can_checkin": can_checkin,
@@ -119,8 +237,8 @@ async def get_my_status(current_user: dict = Depends(get_current_user)):
             "last_checkin_formatted": format_date_brazilian(last_checkin) if last_checkin else None,
             "is_weekend": is_weekend,
             "already_checked_today": already_checked_today,
-            "reason": "available" if can_checkin else ("weekend" if is_weekend else ("already_checked" if already_checked_today else "unknown")),
-            "message": "Você pode fazer checkin agora" if can_checkin else ("Fim de semana" if is_weekend else ("Já fez checkin hoje" if already_checked_today else "Não pode fazer checkin")),
+            "reason": "available" if can_checkin else ("weekend" if is_weekend else ("holiday" if is_holiday else ("already_checked" if already_checked_today else "unknown"))),
+            "message": "Você pode fazer checkin agora" if can_checkin else ("Fim de semana" if is_weekend else ("Feriado" if is_holiday else ("Já fez checkin hoje" if already_checked_today else "Não pode fazer checkin"))),
             "today": format_date_brazilian(get_current_date())
         }
         
@@ -145,11 +263,21 @@ async def get_my_status(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/all-time", summary="Ranking geral de todos os tempos")
-async def get_all_time_ranking(current_user: dict = Depends(get_current_user)):
+async def get_all_time_ranking(
+    request: Request,
+    limit: int = PAGE_LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    around_me: Optional[int] = AROUND_ME_QUERY,
+    current_user: dict = Depends(get_current_user)
+):
     """
     Retorna o ranking geral de todos os tempos, agregando pontos por usuário.
     
     Args:
+        request: Requisição (If-None-Match para revalidação com ETag)
+        limit: Entradas por página
+        cursor: Continuação (keyset) a partir da página anterior
+        around_me: Retorna as `around_me` posições acima e abaixo do usuário
         current_user: Usuário autenticado via JWT
     
     Returns:
@@ -165,65 +293,52 @@ async def get_all_time_ranking(current_user: dict = Depends(get_current_user)):
         {"requested_by": username}
     )
     
-    try:
-        # Pipeline de agregação para somar pontos por usuário
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$username",
-                    "total_points": {"$sum": "$points"},
-                    "username": {"$first": "$username"}
-                }
-            },
-            {
-                "$sort": {"total_points": -1}
-            },
-            {
-                "$limit": 100
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "username": 1,
-                    "points": "$total_points"
-                }
-            }
-        ]
-        
-        ranking_cursor = ranking_collection.aggregate(pipeline)
-        ranking_list = await ranking_cursor.to_list(length=100)
-        
-        # Encontrar posição do usuário solicitante
-        user_position = None
-        for idx, entry in enumerate(ranking_list):
-            if entry["username"] == username:
-                user_position = idx + 1
-                break
+    after = _parse_cursor(cursor)
+    today = get_current_date()
+    
+    async def render() -> bytes:
+        try:
+            # Leitura keyset indexada do total materializado (custo independe do histórico e da página)
+            if around_me:
+                ranking_list, next_after = await AllTimeTotalsService.around(current_user["_id"], around_me)
+            else:
+                ranking_list, next_after = await AllTimeTotalsService.page(after, limit)
         
-        response_data = {
-            "type": "all_time",
-            "date": get_current_date().isoformat(),
-            "total_participants": len(ranking_list),
-            "ranking": ranking_list,
-            "user_position": user_position
-        }
+            # Posição e percentil pelo histograma de pontuações (qualquer usuário, não só o top 100)
+            if not leaderboard.all_time.loaded:
+                await leaderboard.all_time.load()
+            position = leaderboard.all_time.position(current_user["_id"])
+            user_position = position["user_position"]
         
-        system_logger.info(
-            "✅ Ranking geral obtido com sucesso",
-            {
-                "requested_by": username,
-                "participants": len(ranking_list),
-                "user_position": user_position or "N/A",
-                "top_scorer": ranking_list[0]["username"] if ranking_list else "N/A"
+            response_data = {
+                "type": "all_time",
+                "date": today.isoformat(),
+                "total_participants": leaderboard.all_time.histogram.total,
+                "ranking": ranking_list,
+                "user_position": user_position,
+                "percentile": position["percentile"],
+                "next_cursor": _next_cursor(next_after)
             }
-        )
         
-        return response_data
+            system_logger.info(
+                "✅ Ranking geral obtido com sucesso",
+                {
+                    "requested_by": username,
+                    "participants": len(ranking_list),
+                    "user_position": user_position or "N/A",
+                    "top_scorer": ranking_list[0]["username"] if ranking_list else "N/A"
+                }
+            )
         
-    except Exception as e:
-        system_logger.error(
-            "Erro ao buscar ranking geral",
-            error=e,
-            context={"requested_by": username}
-        )
-        raise DatabaseError("Falha ao consultar ranking geral") from e
+            return json.dumps(response_data, ensure_ascii=False, separators=(",", ":")).encode()
+        
+        except Exception as e:
+            system_logger.error(
+                "Erro ao buscar ranking geral",
+                error=e,
+                context={"requested_by": username}
+            )
+            raise DatabaseError("Falha ao consultar ranking geral") from e
+
+    variant = ("all_time", today.isoformat(), limit, after, around_me, current_user["_id"])
+    return await ranking_response_cache.respond(request, variant, render)
@@ -1,16 +1,26 @@
 from datetime import timedelta
 from typing import Union
-from fastapi import APIRouter, HTTPException, status, Depends, Body
+from fastapi import APIRouter, HTTPException, Request, status, Depends, Body
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 
-from app.models.user import Token, UserCreate
+from app.models.user import Token, UserCreate, RefreshTokenRequest
 from app.db.database import user_collection
-from app.auth import get_password_hash, verify_password, create_access_token
+from app.auth import (
+    get_password_hash_async, verify_password_async, create_access_token,
+    build_token_claims, invalidate_user_cache, revoke_tokens_before, get_current_admin
+)
+from app.services.password_hasher import DUMMY_PASSWORD_HASH
+from app.services.login_throttle import login_admission, get_client_ip
+from app.services.refresh_token_service import RefreshTokenService
 from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES
 from app.utils.decorators import handle_exceptions, log_execution_time
 from app.utils.logging import auth_logger, system_logger, checkin_logger
-from app.utils.exceptions import UserNotFoundError, DatabaseError
+from app.utils.exceptions import (
+    UserNotFoundError, DatabaseError, ServiceOverloadedError, RateLimitExceededError,
+    AuthenticationError
+)
 
 
 # Modelos de request/response
@@ -34,6 +44,45 @@ class UserResponse(BaseModel):
 router = APIRouter(tags=["Authentication"])
 
 
+def _admit_login(username: str, request: Request, login_type: str) -> None:
+    """
+    Reserva uma vaga de login antes de qualquer trabalho com bcrypt.
+    
+    Raises:
+        HTTPException: 429 com Retry-After quando algum limite é atingido
+    """
+    try:
+        login_admission.acquire(username, get_client_ip(request))
+    except RateLimitExceededError as e:
+        auth_logger.warning(
+            "Login rejeitado pelo controle de admissão",
+            {"username": username, "login_type": login_type, "scope": e.details["scope"]}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.message,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def _service_overloaded(error: ServiceOverloadedError, username: str) -> HTTPException:
+    """
+    Converte a sobrecarga do serviço de hashing na resposta 503 com Retry-After.
+    
+    Returns:
+        HTTPException: 503 pronta para ser lançada pelo endpoint
+    """
+    auth_logger.warning(
+        "Serviço de hashing sobrecarregado",
+        {"username": username, "details": error.details}
+    )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=error.message,
+        headers={"Retry-After": "1"}
+    )
+
+
 @router.post("/users", status_code=status.HTTP_201_CREATED, summary="Criar novo usuário")
 async def create_user(user: UserCreate):
     """
@@ -67,7 +116,7 @@ async def create_user(user: UserCreate):
             )
         
         # Hash da senha e criação do usuário
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash_async(user.password)
         user_dict = user.dict()
         user_dict["password"] = hashed_password
         
@@ -76,6 +125,8 @@ async def create_user(user: UserCreate):
         if not result.inserted_id:
             raise DatabaseError("Falha ao inserir usuário no banco de dados")
         
+        invalidate_user_cache(user.username)
+        
         auth_logger.info(
             "🎉 Usuário criado com sucesso",
             {"username": user.username, "user_id": str(result.inserted_id)}
@@ -85,6 +136,8 @@ async def create_user(user: UserCreate):
         
     except HTTPException:
         raise
+    except ServiceOverloadedError as e:
+        raise _service_overloaded(e, user.username)
     except Exception as e:
         system_logger.error(
             "Erro ao criar usuário",
@@ -98,7 +151,7 @@ async def create_user(user: UserCreate):
 
 
 @router.post("/login", response_model=Token, summary="Login")
-async def login_json_primary(login_data: LoginRequest):
+async def login_json_primary(login_data: LoginRequest, request: Request):
     """
     Endpoint principal de login que aceita dados JSON.
     
@@ -114,6 +167,8 @@ async def login_json_primary(login_data: LoginRequest):
     username = login_data.username
     password = login_data.password
     
+    _admit_login(username, request, "JSON")
+    
     try:
         auth_logger.info(
             "🔑 Tentativa de login JSON",
@@ -123,12 +178,12 @@ async def login_json_primary(login_data: LoginRequest):
         # Busca otimizada com projeção para retornar apenas campos necessários
         user = await user_collection.find_one(
             {"username": username},
-            {"username": 1, "password": 1}
+            {"username": 1, "password": 1, "token_version": 1}
         )
         
         if not user:
             # Simula tempo de verificação de senha para evitar timing attacks
-            verify_password("dummy", "$2b$12$dummy.hash.to.prevent.timing.attacks")
+            await verify_password_async(password, DUMMY_PASSWORD_HASH)
             auth_logger.warning(
                 "Login JSON negado - usuário não encontrado",
                 {"username": username, "login_type": "JSON"}
@@ -140,7 +195,7 @@ async def login_json_primary(login_data: LoginRequest):
             )
         
         # Verificação de senha
-        if not verify_password(password, user["password"]):
+        if not await verify_password_async(password, user["password"]):
             auth_logger.warning(
                 "Login JSON negado - senha incorreta",
                 {"username": username, "login_type": "JSON"}
@@ -154,7 +209,7 @@ async def login_json_primary(login_data: LoginRequest):
         # Geração do token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user["username"]}, 
+            data=build_token_claims(user), 
             expires_delta=access_token_expires
         )
         
@@ -163,10 +218,18 @@ async def login_json_primary(login_data: LoginRequest):
             {"username": user['username'], "login_type": "JSON"}
         )
         
-        return {"access_token": access_token, "token_type": "bearer"}
+        refresh_token = await RefreshTokenService.issue(user)
+        
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "refresh_token": refresh_token
+        }
         
     except HTTPException:
         raise
+    except ServiceOverloadedError as e:
+        raise _service_overloaded(e, username)
     except Exception as e:
         auth_logger.error(
             "Erro interno no login JSON",
@@ -177,10 +240,12 @@ async def login_json_primary(login_data: LoginRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
+    finally:
+        login_admission.release()
 
 
 @router.post("/token", response_model=Token, summary="Token OAuth2")
-async def login_oauth2_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_oauth2_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Endpoint de token compatível com OAuth2 (form data).
     Usado para autenticação via form data, especialmente para integração OAuth2.
@@ -197,6 +262,8 @@ async def login_oauth2_token(form_data: OAuth2PasswordRequestForm = Depends()):
     username = form_data.username
     password = form_data.password
     
+    _admit_login(username, request, "OAuth2")
+    
     try:
         auth_logger.info(
             "🔑 Tentativa de login OAuth2",
@@ -206,12 +273,12 @@ async def login_oauth2_token(form_data: OAuth2PasswordRequestForm = Depends()):
         # Busca otimizada com projeção para retornar apenas campos necessários
         user = await user_collection.find_one(
             {"username": username},
-            {"username": 1, "password": 1}
+            {"username": 1, "password": 1, "token_version": 1}
         )
         
         if not user:
             # Simula tempo de verificação de senha para evitar timing attacks
-            verify_password("dummy", "$2b$12$dummy.hash.to.prevent.timing.attacks")
+            await verify_password_async(password, DUMMY_PASSWORD_HASH)
             auth_logger.warning(
                 "Login OAuth2 negado - usuário não encontrado",
                 {"username": username, "login_type": "OAuth2"}
@@ -223,7 +290,7 @@ async def login_oauth2_token(form_data: OAuth2PasswordRequestForm = Depends()):
             )
         
         # Verificação de senha
-        if not verify_password(password, user["password"]):
+        if not await verify_password_async(password, user["password"]):
             auth_logger.warning(
                 "Login OAuth2 negado - senha incorreta",
                 {"username": username, "login_type": "OAuth2"}
@@ -237,7 +304,7 @@ async def login_oauth2_token(form_data: OAuth2PasswordRequestForm = Depends()):
         # Geração do token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user["username"]}, 
+            data=build_token_claims(user), 
             expires_delta=access_token_expires
         )
         
@@ -246,10 +313,18 @@ async def login_oauth2_token(form_data: OAuth2PasswordRequestForm = Depends()):
             {"username": user['username'], "login_type": "OAuth2"}
         )
         
-        return {"access_token": access_token, "token_type": "bearer"}
+        refresh_token = await RefreshTokenService.issue(user)
+        
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "refresh_token": refresh_token
+        }
         
     except HTTPException:
         raise
+    except ServiceOverloadedError as e:
+        raise _service_overloaded(e, username)
     except Exception as e:
         auth_logger.error(
             "Erro interno no login OAuth2",
@@ -260,6 +335,60 @@ async def login_oauth2_token(form_data: OAuth2PasswordRequestForm = Depends()):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
+    finally:
+        login_admission.release()
+
+
+@router.post("/token/refresh", response_model=Token, summary="Renovar token de acesso")
+async def refresh_access_token(refresh_data: RefreshTokenRequest):
+    """
+    Troca um refresh token válido por um novo token de acesso, sem verificar senha.
+    O refresh token apresentado é consumido e um novo é devolvido (rotação).
+    
+    Args:
+        refresh_data: Refresh token obtido no login ou na última renovação
+        
+    Returns:
+        Token: Novo token de acesso e novo refresh token
+        
+    Raises:
+        HTTPException: Refresh token inválido, expirado ou revogado
+    """
+    try:
+        user, refresh_token = await RefreshTokenService.rotate(refresh_data.refresh_token)
+        
+        access_token = create_access_token(
+            data=build_token_claims(user),
+            expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        
+        auth_logger.info(
+            "🔄 Token de acesso renovado",
+            {"username": user["username"]}
+        )
+        
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "refresh_token": refresh_token
+        }
+        
+    except AuthenticationError as e:
+        auth_logger.warning(
+            "Renovação de token negada",
+            {"error_code": e.error_code}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=e.message,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except Exception as e:
+        auth_logger.error("Erro interno na renovação de token", error=e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
 
 
 @router.get("/users", response_model=list[UserResponse], summary="Listar todos os usuários")
@@ -339,17 +468,25 @@ async def reset_password(reset_data: PasswordResetRequest):
             )
         
         # Hash da nova senha
-        new_hashed_password = get_password_hash(reset_data.new_password)
+        new_hashed_password = await get_password_hash_async(reset_data.new_password)
         
-        # Atualizar a senha no banco
-        result = await user_collection.update_one(
+        # Atualizar a senha no banco e invalidar tokens emitidos anteriormente
+        updated_user = await user_collection.find_one_and_update(
             {"username": reset_data.username},
-            {"$set": {"password": new_hashed_password}}
+            {
+                "$set": {"password": new_hashed_password},
+                "$inc": {"token_version": 1}
+            },
+            projection={"token_version": 1},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count != 1:
+        if not updated_user:
             raise DatabaseError("Falha ao atualizar senha no banco")
         
+        revoke_tokens_before(reset_data.username, updated_user["token_version"])
+        await RefreshTokenService.revoke_user(reset_data.username)
+        
         auth_logger.info(
             "✅ Senha resetada com sucesso",
             {"username": reset_data.username}
@@ -362,6 +499,8 @@ async def reset_password(reset_data: PasswordResetRequest):
             
     except HTTPException:
         raise
+    except ServiceOverloadedError as e:
+        raise _service_overloaded(e, reset_data.username)
     except Exception as e:
         system_logger.error(
             "Erro inesperado no reset de senha",
@@ -374,7 +513,11 @@ async def reset_password(reset_data: PasswordResetRequest):
         )
 
 
-@router.post("/admin/fix-data", summary="Corrigir inconsistências de dados")
+@router.post(
+    "/admin/fix-data",
+    summary="Corrigir inconsistências de dados",
+    dependencies=[Depends(get_current_admin)]
+)
 async def fix_data_inconsistencies():
     """
     Endpoint administrativo para corrigir inconsistências de dados manualmente.
@@ -2,7 +2,7 @@
 Schemas para respostas da API - garante consistência e documentação automática.
 """
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -25,11 +25,30 @@ class CheckinResponse(BaseModel):
     can_checkin: bool
     reason: str
     points_awarded: Optional[int] = None
+    streak_days: Optional[int] = None
     username: Optional[str] = None
     checkin_time: Optional[str] = None
     checkin_date: Optional[str] = None
 
 
+class BatchCheckinItemResult(BaseModel):
+    """Schema para o resultado de um item do checkin em lote."""
+    index: int
+    username: str
+    status: str
+    message: str
+    checkin_date: Optional[str] = None
+    points_awarded: Optional[int] = None
+
+
+class BatchCheckinResponse(BaseModel):
+    """Schema para resposta do checkin em lote."""
+    total: int
+    created: int
+    rejected: int
+    results: List[BatchCheckinItemResult]
+
+
 class HealthCheckResponse(BaseModel):
     """Schema para resposta do health check."""
     status: str
@@ -0,0 +1,167 @@
+"""
+Total geral de pontos por usuário (materializado) - Boas práticas Python aplicadas.
+`all_time_totals` é mantido por $inc no mesmo caminho de escrita do ranking semanal
+(RankingWriter); aqui ficam a leitura paginada (keyset) indexada e o backfill a partir dos rankings.
+
+Backfill manual:
+    python -m app.services.all_time_totals
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.db.database import all_time_collection, ranking_collection, snapshot_collection
+from app.services.leaderboard import leaderboard
+from app.services.ranking_writer import ranking_writer
+from app.utils.logging import system_logger
+
+
+class AllTimeTotalsService:
+    """Serviço responsável pelo total geral de pontos (ranking de todos os tempos)."""
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Índice da leitura top-K: pontos desc com username como desempate."""
+        await all_time_collection.create_index([("points", DESCENDING), ("username", ASCENDING)])
+
+    @staticmethod
+    async def _read(query: Dict, sort: List, limit: int) -> List[Dict]:
+        return await all_time_collection.find(
+            query,
+            {"_id": 0, "username": 1, "points": 1}
+        ).sort(sort).limit(limit).to_list(length=limit)
+
+    @staticmethod
+    async def page(
+        after: Optional[Tuple[int, str]] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict], Optional[Tuple[int, str]]]:
+        """
+        Página do ranking geral após a posição (pontos, username) do cursor.
+
+        A condição de keyset usa o mesmo índice (points desc, username asc) da primeira
+        página, então páginas profundas custam o mesmo que a primeira (sem skip).
+
+        Returns:
+            Tupla (entradas, posição do cursor da próxima página ou None no fim)
+        """
+        query = {}
+        if after:
+            points, username = after
+            query = {"$or": [
+                {"points": {"$lt": points}},
+                {"points": points, "username": {"$gt": username}}
+            ]}
+
+        # Uma entrada a mais indica se existe próxima página
+        entries = await AllTimeTotalsService._read(
+            query, [("points", DESCENDING), ("username", ASCENDING)], limit + 1
+        )
+        if len(entries) <= limit:
+            return entries, None
+
+        entries = entries[:limit]
+        return entries, (entries[-1]["points"], entries[-1]["username"])
+
+    @staticmethod
+    async def around(
+        user_id: ObjectId,
+        window: int
+    ) -> Tuple[List[Dict], Optional[Tuple[int, str]]]:
+        """
+        Janela com `window` posições acima e abaixo do usuário (vazia se ele não pontuou).
+
+        Returns:
+            Tupla (entradas, posição do cursor para continuar abaixo da janela ou None)
+        """
+        me = await all_time_collection.find_one({"_id": user_id}, {"_id": 0, "username": 1, "points": 1})
+        if me is None:
+            return [], None
+
+        points, username = me["points"], me["username"]
+        above = await AllTimeTotalsService._read(
+            {"$or": [
+                {"points": {"$gt": points}},
+                {"points": points, "username": {"$lt": username}}
+            ]},
+            [("points", ASCENDING), ("username", DESCENDING)],
+            window
+        )
+        below, next_after = await AllTimeTotalsService.page((points, username), window)
+
+        return list(reversed(above)) + [me] + below, next_after
+
+    @staticmethod
+    async def backfill() -> Dict:
+        """
+        Reconstrói `all_time_totals` somando `weekly_rankings` no servidor ($group + $merge).
+        Semanas compactadas (sem documentos por usuário) entram pelo array do snapshot.
+
+        Idempotente: substitui o total de cada usuário pela soma atual das semanas.
+        A soma e o $merge rodam com o gravador do ranking pausado: um $inc concorrente
+        seria sobrescrito pelo "replace". Checkins desse intervalo esperam a pausa
+        (ou ficam no buffer do write-behind) e são somados depois, nas duas coleções.
+
+        Returns:
+            Dict com a quantidade de usuários e a duração
+        """
+        start_time = time.perf_counter()
+
+        # Deltas ainda em memória (write-behind) precisam estar no banco antes da soma
+        await ranking_writer.flush()
+
+        async with ranking_writer.paused():
+            await ranking_collection.aggregate([
+                {"$unionWith": {
+                    "coll": snapshot_collection.name,
+                    "pipeline": [
+                        {"$match": {"compacted": True}},
+                        {"$unwind": "$ranking"},
+                        {"$project": {
+                            "_id": 0,
+                            "user_id": "$ranking.user_id",
+                            "username": "$ranking.username",
+                            "points": "$ranking.points",
+                            "updated_at": "$closed_at"
+                        }}
+                    ]
+                }},
+                {"$sort": {"updated_at": 1}},
+                {"$group": {
+                    "_id": "$user_id",
+                    "points": {"$sum": "$points"},
+                    "username": {"$last": "$username"},
+                    "updated_at": {"$max": "$updated_at"}
+                }},
+                {"$merge": {
+                    "into": all_time_collection.name,
+                    "on": "_id",
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
+                }}
+            ], allowDiskUse=True).to_list(length=None)
+
+        users = await all_time_collection.count_documents({})
+        await leaderboard.all_time.load()
+        duration = (time.perf_counter() - start_time) * 1000
+
+        system_logger.info(
+            "🧮 Backfill do total geral concluído",
+            {"users": users, "duration_ms": f"{duration:.2f}"}
+        )
+
+        return {"users": users, "duration_ms": round(duration, 2)}
+
+
+async def _main() -> None:
+    await AllTimeTotalsService.ensure_indexes()
+    result = await AllTimeTotalsService.backfill()
+    print(f"✅ all_time_totals reconstruído: {result['users']} usuários em {result['duration_ms']}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,284 @@
+"""
+Service layer para ingestão de checkins em lote - Boas práticas Python aplicadas.
+Valida os itens em memória e grava tudo com poucas operações em lote no banco.
+"""
+import time
+from datetime import timedelta
+from typing import Dict, List
+
+from pymongo.errors import BulkWriteError
+
+from app.core import config
+from app.db.database import (
+    user_collection, checkin_collection
+)
+from app.models.checkin import BatchCheckinItem
+from app.services.checkin_service import CheckinService, claimed_days, is_first_of_day_conflict
+from app.services.ranking_writer import RankingWriter, ranking_writer
+from app.utils.datetime_utils import (
+    get_current_datetime, is_weekend, is_holiday, get_week_id, to_sao_paulo
+)
+from app.utils.decorators import handle_checkin_exceptions, log_checkin_operation
+from app.utils.exceptions import DatabaseError
+from app.utils.logging import checkin_logger
+
+# Tolerância para relógios de clientes adiantados
+CLOCK_SKEW_TOLERANCE = timedelta(minutes=5)
+
+# Código de erro do MongoDB para chave duplicada
+DUPLICATE_KEY_ERROR = 11000
+
+
+class BatchCheckinService:
+    """Serviço responsável por checkins em lote (quiosques e clientes offline)."""
+
+    @staticmethod
+    @handle_checkin_exceptions
+    @log_checkin_operation("processo_checkin_lote")
+    async def process_batch(items: List[BatchCheckinItem]) -> Dict:
+        """
+        Processa vários checkins (usuário, horário do cliente) de uma só vez.
+
+        Args:
+            items: Itens do lote, na ordem enviada pelo cliente
+
+        Returns:
+            Dict com totais e o resultado de cada item
+
+        Raises:
+            DatabaseError: Erro nas operações de banco
+        """
+        start_time = time.time()
+        now = get_current_datetime()
+        oldest_allowed = (now - timedelta(days=config.BATCH_CHECKIN_MAX_AGE_DAYS)).date()
+
+        results = [
+            {
+                "index": index,
+                "username": item.username,
+                "status": "pending",
+                "message": "",
+                "checkin_date": None,
+                "points_awarded": None
+            }
+            for index, item in enumerate(items)
+        ]
+
+        try:
+            # 1 consulta: todos os usuários do lote
+            usernames = list({item.username for item in items})
+            users = {
+                user["username"]: user
+                for user in await user_collection.find(
+                    {"username": {"$in": usernames}},
+                    {"_id": 1, "username": 1}
+                ).to_list(length=None)
+            }
+
+            # Validação em memória: usuário, horário, fim de semana e duplicados no lote
+            candidates = []
+            seen_keys = set()
+            for index, item in enumerate(items):
+                result = results[index]
+                user = users.get(item.username)
+                timestamp = to_sao_paulo(item.timestamp)
+                checkin_date = timestamp.date()
+                result["checkin_date"] = checkin_date.isoformat()
+
+                if user is None:
+                    BatchCheckinService._reject(result, "unknown_user", "Usuário não encontrado")
+                elif timestamp > now + CLOCK_SKEW_TOLERANCE:
+                    BatchCheckinService._reject(result, "invalid_timestamp", "Horário no futuro")
+                elif checkin_date < oldest_allowed:
+                    BatchCheckinService._reject(result, "invalid_timestamp", "Checkin antigo demais para reenvio")
+                elif is_weekend(checkin_date):
+                    BatchCheckinService._reject(result, "weekend", "Check-ins são permitidos apenas de Segunda a Sexta")
+                elif is_holiday(checkin_date):
+                    BatchCheckinService._reject(result, "holiday", "Check-ins não são permitidos em feriados")
+                elif (user["_id"], checkin_date) in seen_keys:
+                    BatchCheckinService._reject(result, "duplicate", "Checkin duplicado no lote")
+                else:
+                    seen_keys.add((user["_id"], checkin_date))
+                    candidates.append((index, user, timestamp))
+
+            if candidates:
+                await BatchCheckinService._store_candidates(candidates, results, now)
+
+        except Exception as e:
+            if isinstance(e, DatabaseError):
+                raise
+            raise DatabaseError(
+                message="Erro no processamento do checkin em lote",
+                error_code="BATCH_CHECKIN_PROCESS_ERROR",
+                details={"items": len(items)}
+            ) from e
+
+        created = sum(1 for result in results if result["status"] == "created")
+        duration = (time.time() - start_time) * 1000
+        checkin_logger.info(
+            "📦 Checkin em lote processado",
+            {
+                "items": len(items),
+                "created": created,
+                "rejected": len(items) - created,
+                "duration_ms": f"{duration:.2f}"
+            }
+        )
+
+        return {
+            "total": len(items),
+            "created": created,
+            "rejected": len(items) - created,
+            "results": results
+        }
+
+    @staticmethod
+    def _reject(result: Dict, status: str, message: str) -> None:
+        """Marca um item do lote como rejeitado."""
+        result["status"] = status
+        result["message"] = message
+
+    @staticmethod
+    async def _insert(documents: List[Dict]) -> Dict[int, bool]:
+        """
+        Insere os documentos sem ordem (duplicados não interrompem o lote).
+
+        Returns:
+            Posições que falharam por chave duplicada -> True se o conflito foi no
+            primeiro checkin do dia (first_checkin_day) e não no par usuário/dia
+        """
+        try:
+            await checkin_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed_positions = {}
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != DUPLICATE_KEY_ERROR:
+                    raise
+                failed_positions[error["index"]] = is_first_of_day_conflict(error)
+            return failed_positions
+        return {}
+
+    @staticmethod
+    async def _store_candidates(candidates: List, results: List[Dict], now) -> None:
+        """Calcula pontos e grava os checkins válidos com operações em lote."""
+        user_ids = list({user["_id"] for _, user, _ in candidates})
+        days = list({timestamp.date().isoformat() for _, _, timestamp in candidates})
+
+        # 1 consulta: checkins já existentes para os pares (usuário, dia) do lote
+        existing = {
+            (doc["user_id"], doc["checkin_day"])
+            for doc in await checkin_collection.find(
+                {"user_id": {"$in": user_ids}, "checkin_day": {"$in": days}},
+                {"user_id": 1, "checkin_day": 1}
+            ).to_list(length=None)
+        }
+
+        # 2 consultas: dias que já têm primeiro checkin e streaks dos usuários
+        open_days = {day for day in days if not claimed_days.get(day)}
+        if open_days:
+            for doc in await checkin_collection.find(
+                {"first_checkin_day": {"$in": list(open_days)}}, {"first_checkin_day": 1}
+            ).to_list(length=None):
+                claimed_days.set(doc["first_checkin_day"], True)
+                open_days.discard(doc["first_checkin_day"])
+        streaks = await CheckinService._find_streak_states(user_ids)
+
+        # Processar em ordem cronológica para o primeiro do dia e streaks corretos
+        documents = []
+        document_indexes = []
+        for index, user, timestamp in sorted(candidates, key=lambda candidate: candidate[2]):
+            checkin_date = timestamp.date()
+            checkin_day = checkin_date.isoformat()
+
+            if (user["_id"], checkin_day) in existing:
+                BatchCheckinService._reject(results[index], "duplicate", "Checkin já realizado neste dia")
+                continue
+
+            # Candidato ao primeiro do dia: o índice único em first_checkin_day decide na inserção
+            claim_first_of_day = checkin_day in open_days
+            open_days.discard(checkin_day)
+            base_points = CheckinService._base_points_for(1 if claim_first_of_day else 2)
+
+            # Streak calculado em memória, em ordem cronológica; vai no próprio documento
+            next_streak = CheckinService._next_streak(streaks.get(user["_id"]), checkin_date)
+            streak_bonus = 0
+            if next_streak is not None:
+                streaks[user["_id"]] = {**next_streak, "last_workday": checkin_day}
+                streak_bonus = CheckinService._streak_bonus_for(next_streak["current_streak"])
+
+            points_awarded = base_points + streak_bonus
+            results[index]["points_awarded"] = points_awarded
+            document = {
+                "user_id": user["_id"],
+                "username": user["username"],
+                "timestamp": timestamp,
+                "checkin_day": checkin_day,
+                "week_id": get_week_id(checkin_date),
+                "points": points_awarded
+            }
+            if claim_first_of_day:
+                document["first_checkin_day"] = checkin_day
+            if next_streak is not None:
+                document["streak_days"] = next_streak["current_streak"]
+                document["longest_streak"] = next_streak["longest_streak"]
+            if ranking_writer.write_behind:
+                document["ranking_pending"] = True
+            documents.append(document)
+            document_indexes.append(index)
+
+        if not documents:
+            return
+
+        # 1 escrita: inserção não ordenada; duplicados concorrentes não interrompem o lote
+        failed_positions = await BatchCheckinService._insert(documents)
+
+        # Primeiro do dia já tomado por outro checkin: reinserir como checkin regular
+        retry_positions = [
+            position for position, is_first_conflict in failed_positions.items() if is_first_conflict
+        ]
+        if retry_positions:
+            retry_documents = []
+            for position in retry_positions:
+                document = documents[position]
+                claimed_days.set(document.pop("first_checkin_day"), True)
+                document.pop("_id", None)
+                document["points"] += CheckinService._base_points_for(2) - CheckinService._base_points_for(1)
+                results[document_indexes[position]]["points_awarded"] = document["points"]
+                retry_documents.append(document)
+
+            retry_failed = await BatchCheckinService._insert(retry_documents)
+            for position in retry_positions:
+                del failed_positions[position]
+            for retry_position in retry_failed:
+                failed_positions[retry_positions[retry_position]] = False
+
+        for document in documents:
+            if "first_checkin_day" in document:
+                claimed_days.set(document["first_checkin_day"], True)
+
+        ranking_deltas = []
+        for position, (document, index) in enumerate(zip(documents, document_indexes)):
+            result = results[index]
+            if position in failed_positions:
+                result["points_awarded"] = None
+                BatchCheckinService._reject(result, "duplicate", "Checkin já realizado neste dia")
+                continue
+
+            result["status"] = "created"
+            result["message"] = "Check-in realizado com sucesso!"
+            CheckinService.invalidate_user_status(document["user_id"])
+
+            ranking_deltas.append(RankingWriter.build_delta(
+                user_id=document["user_id"],
+                username=document["username"],
+                week_id=document["week_id"],
+                points=document["points"],
+                last_checkin_date=document["checkin_day"],
+                updated_at=now,
+                checkin_id=document["_id"]
+            ))
+
+        # 1 rodada de escritas: ranking semanal e total geral (só dos checkins inseridos;
+        # agrupada no modo write-behind)
+        await ranking_writer.record_many(ranking_deltas)
+
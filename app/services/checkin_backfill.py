@@ -0,0 +1,209 @@
+"""
+Backfills únicos do histórico de checkins - Boas práticas Python aplicadas.
+Preenchem campos e estados introduzidos depois que já existiam checkins gravados;
+rodam uma vez pelo agendador de manutenção (app/services/maintenance.py).
+"""
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core import config
+from app.db.database import checkin_collection
+from app.utils.datetime_utils import (
+    from_database, get_current_date, get_previous_workday, get_start_of_day
+)
+from app.utils.logging import system_logger
+
+# Checkins por lote de atualização
+BACKFILL_BATCH_SIZE = 1000
+
+# Código de erro do MongoDB para chave duplicada
+DUPLICATE_KEY_ERROR = 11000
+
+
+class CheckinBackfillService:
+    """Serviço responsável pelos backfills do histórico de checkins."""
+
+    @staticmethod
+    async def _apply(operations) -> Dict[str, int]:
+        """Aplica um lote; chaves duplicadas (checkins repetidos no mesmo dia) são contadas e puladas."""
+        try:
+            result = await checkin_collection.bulk_write(operations, ordered=False)
+            return {"updated": result.modified_count, "duplicates": 0}
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            return {"updated": e.details.get("nModified", 0), "duplicates": len(errors)}
+
+    @staticmethod
+    async def backfill_checkin_days() -> Dict[str, int]:
+        """
+        Preenche `checkin_day` (data em São Paulo) nos checkins gravados antes do campo existir.
+
+        Sem o campo, o índice único parcial (user_id, checkin_day) não enxerga esses
+        checkins e um segundo checkin no mesmo dia passaria. Quando o histórico já tem
+        dois checkins do usuário no mesmo dia, o mais antigo fica com o campo e o outro
+        é mantido como está (contado em `duplicates`).
+
+        Returns:
+            Dict com checkins atualizados, duplicados e a duração
+        """
+        start_time = time.perf_counter()
+        totals = {"updated": 0, "duplicates": 0}
+
+        operations = []
+        cursor = checkin_collection.find(
+            {"checkin_day": {"$exists": False}},
+            {"timestamp": 1},
+            batch_size=BACKFILL_BATCH_SIZE
+        ).sort("timestamp", ASCENDING)
+
+        async for checkin in cursor:
+            checkin_day = from_database(checkin["timestamp"]).date().isoformat()
+            operations.append(UpdateOne(
+                {"_id": checkin["_id"], "checkin_day": {"$exists": False}},
+                {"$set": {"checkin_day": checkin_day}}
+            ))
+            if len(operations) >= BACKFILL_BATCH_SIZE:
+                for key, value in (await CheckinBackfillService._apply(operations)).items():
+                    totals[key] += value
+                operations = []
+
+        if operations:
+            for key, value in (await CheckinBackfillService._apply(operations)).items():
+                totals[key] += value
+
+        duration = (time.perf_counter() - start_time) * 1000
+        system_logger.info(
+            "🗓️ Backfill de checkin_day concluído",
+            {**totals, "duration_ms": f"{duration:.2f}"}
+        )
+        return {**totals, "duration_ms": round(duration, 2)}
+
+    @staticmethod
+    def _streaks_from_days(days: List[str]) -> Tuple[int, int]:
+        """
+        Calcula (streak atual, maior streak) a partir dos dias com checkin, em ordem.
+
+        Dias úteis consecutivos seguem a mesma regra do checkin: o dia anterior do
+        streak precisa ser o dia útil imediatamente anterior.
+        """
+        current_streak = longest_streak = 0
+        previous_day = None
+        for day in days:
+            expected_previous = get_previous_workday(date.fromisoformat(day)).isoformat()
+            current_streak = current_streak + 1 if previous_day == expected_previous else 1
+            longest_streak = max(longest_streak, current_streak)
+            previous_day = day
+        return current_streak, longest_streak
+
+    @staticmethod
+    def _to_streak_operation(user: Dict) -> UpdateOne:
+        """Grava o streak calculado no checkin mais recente do usuário (o estado atual)."""
+        days = sorted(user["days"])
+        current_streak, longest_streak = CheckinBackfillService._streaks_from_days(days)
+        return UpdateOne(
+            {"_id": user["last_checkin_id"]},
+            {"$set": {"streak_days": current_streak, "longest_streak": longest_streak}}
+        )
+
+    @staticmethod
+    async def backfill_streaks() -> Dict[str, int]:
+        """
+        Grava o streak (`streak_days`, `longest_streak`) no último checkin de cada usuário,
+        calculado a partir do histórico.
+
+        O checkin mais recente é o estado do streak: sem isso, o streak de todos os
+        usuários recomeçaria em 1. Os dias de cada usuário vêm de uma agregação
+        (checkin_day, ou a data do timestamp em São Paulo nos checkins antigos).
+
+        Returns:
+            Dict com usuários atualizados e a duração
+        """
+        start_time = time.perf_counter()
+        users = 0
+
+        cursor = checkin_collection.aggregate([
+            {"$sort": {"timestamp": 1}},
+            {"$group": {
+                "_id": "$user_id",
+                "last_checkin_id": {"$last": "$_id"},
+                "days": {"$addToSet": {"$ifNull": [
+                    "$checkin_day",
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp", "timezone": "-03:00"}}
+                ]}}
+            }}
+        ], allowDiskUse=True, batchSize=BACKFILL_BATCH_SIZE)
+
+        operations = []
+        async for user in cursor:
+            if user["_id"] is None or not user["days"]:
+                continue
+            operations.append(CheckinBackfillService._to_streak_operation(user))
+            if len(operations) >= BACKFILL_BATCH_SIZE:
+                await checkin_collection.bulk_write(operations, ordered=False)
+                users += len(operations)
+                operations = []
+
+        if operations:
+            await checkin_collection.bulk_write(operations, ordered=False)
+            users += len(operations)
+
+        duration = (time.perf_counter() - start_time) * 1000
+        system_logger.info(
+            "🔥 Backfill de streaks concluído",
+            {"users": users, "duration_ms": f"{duration:.2f}"}
+        )
+        return {"users": users, "duration_ms": round(duration, 2)}
+
+    @staticmethod
+    async def backfill_first_checkins() -> Dict[str, int]:
+        """
+        Marca `first_checkin_day` no checkin mais antigo de cada dia ainda aberto a
+        checkins (hoje e o prazo do lote, BATCH_CHECKIN_MAX_AGE_DAYS).
+
+        Checkins gravados antes do campo não ocupam o índice único do primeiro do dia:
+        sem isso, o primeiro checkin depois da atualização receberia o bônus de novo
+        em um dia que já teve primeiro checkin.
+
+        Returns:
+            Dict com dias marcados, duplicados (dia já reservado) e a duração
+        """
+        start_time = time.perf_counter()
+        since = get_start_of_day(get_current_date() - timedelta(days=config.BATCH_CHECKIN_MAX_AGE_DAYS))
+
+        cursor = checkin_collection.aggregate([
+            {"$match": {"timestamp": {"$gte": since}}},
+            {"$sort": {"timestamp": 1}},
+            {"$group": {
+                "_id": {"$ifNull": [
+                    "$checkin_day",
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp", "timezone": "-03:00"}}
+                ]},
+                "first_checkin_id": {"$first": "$_id"},
+                "claimed": {"$max": {"$ne": [{"$type": "$first_checkin_day"}, "missing"]}}
+            }},
+            {"$match": {"claimed": False}}
+        ])
+
+        operations = [
+            UpdateOne(
+                {"_id": day["first_checkin_id"], "first_checkin_day": {"$exists": False}},
+                {"$set": {"first_checkin_day": day["_id"]}}
+            )
+            async for day in cursor
+        ]
+        totals = {"updated": 0, "duplicates": 0}
+        if operations:
+            totals = await CheckinBackfillService._apply(operations)
+
+        duration = (time.perf_counter() - start_time) * 1000
+        system_logger.info(
+            "🥇 Backfill do primeiro checkin do dia concluído",
+            {**totals, "duration_ms": f"{duration:.2f}"}
+        )
+        return {**totals, "duration_ms": round(duration, 2)}
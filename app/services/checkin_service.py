@@ -2,22 +2,46 @@
 Service layer para lógica de checkin - Boas práticas Python aplicadas.
 """
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
+from app.core import config
 from app.db.database import user_collection, checkin_collection, ranking_collection
-from app.utils.constants import POINTS, MESSAGES
+from app.services.ranking_writer import RankingWriter, ranking_writer
+from app.utils.constants import POINTS, STREAK_BONUS_TIERS, MESSAGES
 from app.utils.datetime_utils import (
     get_current_datetime, get_current_date, get_start_of_day, 
-    is_weekend, get_week_id, format_time_brazilian
+    is_weekend, is_holiday, get_week_id, get_previous_workday, format_time_brazilian,
+    from_database
 )
 from app.utils.exceptions import (
-    WeekendCheckinError, DuplicateCheckinError, DatabaseError
+    WeekendCheckinError, HolidayCheckinError, DuplicateCheckinError, DatabaseError
 )
+from app.utils.cache import TTLCache
 from app.utils.decorators import handle_checkin_exceptions, log_checkin_operation
 from app.utils.logging import checkin_logger
 
+# Dias cujo primeiro checkin já tem dono (evita tentar o bônus e consultar o dia de novo)
+claimed_days = TTLCache(maxsize=32, ttl=None)
+
+# Modelo de leitura do status por usuário: último checkin (o "fez hoje" é derivado na leitura).
+# Só "ainda não fez checkin hoje" pode ficar velho (checkin gravado por outro processo), então
+# essa entrada vive STATUS_CACHE_OPEN_TTL_SECONDS; "já fez hoje" vale até a virada do dia
+user_status_cache = TTLCache(
+    maxsize=config.STATUS_CACHE_MAX_SIZE,
+    ttl=config.STATUS_CACHE_TTL_SECONDS
+)
+
+
+def is_first_of_day_conflict(error_details: Optional[Dict]) -> bool:
+    """Indica se a chave duplicada é a do primeiro checkin do dia (e não a do usuário/dia)."""
+    error_details = error_details or {}
+    if "first_checkin_day" in (error_details.get("keyPattern") or {}):
+        return True
+    return "first_checkin_day" in str(error_details.get("errmsg", ""))
+
 
 class CheckinService:
     """Serviço responsável pela lógica de checkin."""
@@ -36,14 +60,13 @@ class CheckinService:
             Dict com status e informações relevantes
             
         Raises:
-            WeekendCheckinError: Se for fim de semana
+            WeekendCheckinError: Se for fim de semana (HolidayCheckinError em feriados)
             DuplicateCheckinError: Se já fez checkin hoje
         """
         current_date = get_current_date()
         
-        # Verificar fim de semana
-        if is_weekend(current_date):
-            raise WeekendCheckinError(current_date.isoformat())
+        # Verificar fim de semana e feriado
+        CheckinService._ensure_workday(current_date)
         
         # Verificar se já fez checkin hoje
         start_of_day = get_start_of_day(current_date)
@@ -61,7 +84,7 @@ class CheckinService:
             ) from e
         
         if existing_checkin:
-            checkin_time = format_time_brazilian(existing_checkin["timestamp"])
+            checkin_time = format_time_brazilian(from_database(existing_checkin["timestamp"]))
             username = existing_checkin.get("username", "Unknown")
             raise DuplicateCheckinError(username, checkin_time)
         
@@ -101,115 +124,251 @@ class CheckinService:
             ) from e
     
     @staticmethod
-    @handle_checkin_exceptions
-    @log_checkin_operation("calculo_pontos")
-    async def calculate_points(user_id: ObjectId) -> int:
+    def _ensure_workday(target_date: date) -> None:
         """
-        Calcula os pontos que o usuário deve receber.
+        Garante que a data é dia útil.
+        
+        Raises:
+            WeekendCheckinError: Se for fim de semana
+            HolidayCheckinError: Se for feriado
+        """
+        if is_weekend(target_date):
+            raise WeekendCheckinError(target_date.isoformat())
+        if is_holiday(target_date):
+            raise HolidayCheckinError(target_date.isoformat())
+    
+    @staticmethod
+    async def get_user_status(user_id: ObjectId) -> Dict:
+        """
+        Status de checkin do usuário com uma única consulta (ou nenhuma, se em cache).
         
         Args:
             user_id: ID do usuário
             
         Returns:
-            Quantidade de pontos a ser atribuída
+            Dict com `last_checkin` (datetime em São Paulo ou None), `checked_today`,
+            `is_weekend`, `is_holiday` e `can_checkin`
             
         Raises:
-            DatabaseError: Erro nas consultas ao banco
+            DatabaseError: Erro na consulta ao banco
         """
-        current_date = get_current_date()
-        start_of_day = get_start_of_day(current_date)
+        status = user_status_cache.get(user_id)
         
-        try:
-            # Verificar se é o primeiro checkin do dia
-            first_checkin_today = await checkin_collection.find_one({
-                "timestamp": {"$gte": start_of_day}
-            })
-            
-            base_points = (POINTS['FIRST_CHECKIN_OF_DAY'] 
-                          if not first_checkin_today 
-                          else POINTS['REGULAR_CHECKIN'])
-            
-            # Calcular streak bonus
-            streak_bonus = await CheckinService._calculate_streak_bonus(user_id)
-            total_points = base_points + streak_bonus
-            
-            # Log detalhado do cálculo
-            checkin_logger.points_calculation(
-                username="user_" + str(user_id)[-6:],  # Últimos 6 chars do ID
-                base_points=base_points,
-                streak_bonus=streak_bonus,
-                total=total_points
-            )
-            
-            return total_points
-            
-        except Exception as e:
-            if not isinstance(e, DatabaseError):
+        if status is None:
+            try:
+                last_checkin = await checkin_collection.find_one(
+                    {"user_id": user_id},
+                    {"timestamp": 1},
+                    sort=[("timestamp", -1)]
+                )
+            except Exception as e:
                 raise DatabaseError(
-                    message="Erro no cálculo de pontos",
-                    error_code="POINTS_CALCULATION_ERROR",
+                    message="Erro ao buscar status de checkin",
+                    error_code="DB_CHECKIN_STATUS_ERROR",
                     details={"user_id": str(user_id)}
                 ) from e
-            raise
+            
+            status = CheckinService._cache_user_status(
+                user_id, from_database(last_checkin["timestamp"]) if last_checkin else None
+            )
+        
+        current_date = get_current_date()
+        last_checkin = status["last_checkin"]
+        checked_today = last_checkin is not None and last_checkin.date() == current_date
+        weekend = is_weekend(current_date)
+        holiday = is_holiday(current_date)
+        
+        return {
+            "last_checkin": last_checkin,
+            "checked_today": checked_today,
+            "is_weekend": weekend,
+            "is_holiday": holiday,
+            "can_checkin": not weekend and not holiday and not checked_today
+        }
     
     @staticmethod
-    async def _calculate_streak_bonus(user_id: ObjectId) -> int:
+    def _cache_user_status(user_id: ObjectId, last_checkin: Optional[datetime]) -> Dict:
+        """Guarda o status do usuário com TTL conforme ele já tenha (ou não) feito checkin hoje."""
+        now = get_current_datetime()
+        if last_checkin is not None and last_checkin.date() == now.date():
+            until_tomorrow = (get_start_of_day(now.date() + timedelta(days=1)) - now).total_seconds()
+            ttl = max(0.0, min(config.STATUS_CACHE_TTL_SECONDS, until_tomorrow))
+        else:
+            ttl = config.STATUS_CACHE_OPEN_TTL_SECONDS
+        
+        status = {"last_checkin": last_checkin}
+        user_status_cache.set(user_id, status, ttl=ttl)
+        return status
+    
+    @staticmethod
+    def invalidate_user_status(user_id: ObjectId) -> None:
+        """Descarta o status em cache (ex.: checkins gravados por outro caminho)."""
+        user_status_cache.invalidate(user_id)
+    
+    @staticmethod
+    def _streak_bonus_for(streak_days: int) -> int:
         """
-        Calcula bônus de streak.
+        Calcula o bônus pela quantidade de dias úteis consecutivos com checkin.
         
         Args:
-            user_id: ID do usuário
+            streak_days: Tamanho do streak contando o checkin atual
             
         Returns:
-            Pontos de bônus por streak
+            Pontos de bônus por streak (maior faixa atingida)
         """
-        current_date = get_current_date()
-        week_id = get_week_id(current_date)
+        for min_days, bonus in STREAK_BONUS_TIERS:
+            if streak_days >= min_days:
+                return bonus
+        return 0
+    
+    @staticmethod
+    def _streak_state(last_checkin: Optional[Dict]) -> Optional[Dict]:
+        """
+        Estado do streak a partir do último checkin do usuário.
         
-        try:
-            user_ranking = await ranking_collection.find_one({
-                "user_id": user_id, 
-                "week_id": week_id
+        O streak é gravado no próprio documento do checkin (`streak_days` e
+        `longest_streak`), na mesma escrita: o checkin mais recente é o estado atual.
+        Checkins anteriores ao campo contam como streak de 1 dia.
+        """
+        if not last_checkin:
+            return None
+        streak_days = last_checkin.get("streak_days", 1)
+        return {
+            "current_streak": streak_days,
+            "longest_streak": last_checkin.get("longest_streak", streak_days),
+            "last_workday": last_checkin["checkin_day"]
+        }
+    
+    @staticmethod
+    async def _find_streak_states(user_ids: List[ObjectId]) -> Dict[ObjectId, Dict]:
+        """Estado do streak de vários usuários (último checkin de cada) em uma consulta."""
+        latest = await checkin_collection.aggregate([
+            {"$match": {"user_id": {"$in": user_ids}, "checkin_day": {"$exists": True}}},
+            {"$sort": {"user_id": 1, "checkin_day": -1}},
+            {"$group": {
+                "_id": "$user_id",
+                "checkin_day": {"$first": "$checkin_day"},
+                "streak_days": {"$first": "$streak_days"},
+                "longest_streak": {"$first": "$longest_streak"}
+            }}
+        ]).to_list(length=None)
+        return {
+            doc["_id"]: CheckinService._streak_state({
+                key: value for key, value in doc.items() if value is not None
             })
+            for doc in latest
+        }
+    
+    @staticmethod
+    def _next_streak(streak_state: Optional[Dict], checkin_date: date) -> Optional[Dict]:
+        """
+        Calcula o streak do usuário após um checkin em `checkin_date` (sem escrita).
+        
+        O streak continua se o último dia útil registrado for o dia útil anterior e
+        reinicia caso contrário.
+        
+        Args:
+            streak_state: Estado de `_streak_state` (ou None se o usuário não tem checkins)
+            checkin_date: Data do checkin
             
-            if not user_ranking:
-                return 0
-            
-            last_checkin_db = user_ranking.get("last_checkin_date")
-            if not last_checkin_db:
-                return 0
-            
-            # Converter string para date se necessário
-            if isinstance(last_checkin_db, str):
-                last_checkin_date = datetime.strptime(last_checkin_db, "%Y-%m-%d").date()
-            else:
-                last_checkin_date = last_checkin_db
-            
-            # Calcular dia anterior esperado
-            expected_previous_day = current_date - timedelta(days=1)
-            if current_date.weekday() == 0:  # Segunda-feira
-                expected_previous_day = current_date - timedelta(days=3)  # Sexta anterior
-            
-            if last_checkin_date == expected_previous_day:
-                checkin_logger.info(
-                    "🔥 Streak bonus aplicado",
-                    {
-                        "user_id": str(user_id),
-                        "last_checkin": last_checkin_date.isoformat(),
-                        "expected": expected_previous_day.isoformat()
-                    }
-                )
-                return POINTS['STREAK_BONUS']
-            
-            return 0
+        Returns:
+            Dict com `current_streak` e `longest_streak`, ou None se o dia já foi
+            contabilizado (mesmo dia ou checkin anterior ao último registrado)
+        """
+        streak_state = streak_state or {}
+        checkin_day = checkin_date.isoformat()
+        last_workday = streak_state.get("last_workday")
+        
+        if last_workday is not None and last_workday >= checkin_day:
+            return None
+        
+        if last_workday == get_previous_workday(checkin_date).isoformat():
+            current_streak = streak_state.get("current_streak", 0) + 1
+        else:
+            current_streak = 1
+        
+        return {
+            "current_streak": current_streak,
+            "longest_streak": max(streak_state.get("longest_streak", 0), current_streak)
+        }
+    
+    @staticmethod
+    def _base_points_for(position_of_day: int) -> int:
+        """
+        Calcula os pontos base a partir da posição do checkin no dia.
+        
+        Args:
+            position_of_day: Ordem do checkin no dia (1 = primeiro)
             
-        except Exception as e:
-            checkin_logger.error(
-                "Erro no cálculo de streak bonus",
-                error=e,
-                context={"user_id": str(user_id)}
-            )
-            return 0  # Em caso de erro, não aplicar bonus
+        Returns:
+            Pontos base do checkin
+        """
+        return (POINTS['FIRST_CHECKIN_OF_DAY'] 
+                if position_of_day == 1 
+                else POINTS['REGULAR_CHECKIN'])
+    
+    @staticmethod
+    async def _may_be_first_of_day(checkin_day: str) -> bool:
+        """
+        Indica se vale tentar o bônus de primeiro checkin do dia.
+        
+        Só evita tentativas inúteis: quem decide é o índice único parcial em
+        `first_checkin_day`, que também responde esta leitura (um documento por dia).
+        Depois que o dia tem dono, nenhuma consulta é feita neste processo.
+        """
+        if claimed_days.get(checkin_day):
+            return False
+        
+        if await checkin_collection.find_one({"first_checkin_day": checkin_day}, {"_id": 1}):
+            claimed_days.set(checkin_day, True)
+            return False
+        return True
+    
+    @staticmethod
+    async def _insert_checkin(checkin_data: Dict, claim_first_of_day: bool, streak_bonus: int) -> None:
+        """
+        Insere o checkin definindo os pontos; tenta reservar o primeiro checkin do dia.
+        
+        Com `claim_first_of_day`, o documento leva `first_checkin_day`: se outro checkin
+        já ocupou o dia no índice único, a inserção é refeita como checkin regular.
+        
+        Raises:
+            DuplicateKeyError: Usuário já fez checkin no dia (índice user_id/checkin_day)
+        """
+        checkin_day = checkin_data["checkin_day"]
+        
+        if claim_first_of_day:
+            checkin_data["first_checkin_day"] = checkin_day
+            checkin_data["points"] = CheckinService._base_points_for(1) + streak_bonus
+            try:
+                await checkin_collection.insert_one(checkin_data)
+                claimed_days.set(checkin_day, True)
+                return
+            except DuplicateKeyError as e:
+                if not is_first_of_day_conflict(e.details):
+                    raise
+                claimed_days.set(checkin_day, True)
+                del checkin_data["first_checkin_day"]
+                checkin_data.pop("_id", None)
+        
+        checkin_data["points"] = CheckinService._base_points_for(2) + streak_bonus
+        await checkin_collection.insert_one(checkin_data)
+    
+    @staticmethod
+    async def _raise_duplicate_checkin(user_id: ObjectId, username: str, checkin_day: str):
+        """
+        Levanta DuplicateCheckinError com o horário do checkin já existente.
+        
+        Raises:
+            DuplicateCheckinError: Sempre
+        """
+        existing_checkin = await checkin_collection.find_one(
+            {"user_id": user_id, "checkin_day": checkin_day},
+            {"timestamp": 1}
+        )
+        checkin_time = (format_time_brazilian(from_database(existing_checkin["timestamp"]))
+                        if existing_checkin else "N/A")
+        raise DuplicateCheckinError(username, checkin_time)
     
     @staticmethod
     @handle_checkin_exceptions
@@ -238,51 +397,84 @@ class CheckinService:
         
         start_time = time.time()
         
+        # Verificar fim de semana e feriado (calendário em memória, sem consulta ao banco)
+        CheckinService._ensure_workday(current_date)
+        
+        week_id = get_week_id(current_date)
+        checkin_day = current_date.isoformat()
+        
         try:
-            # Verificar se pode fazer checkin (já lança exceções apropriadas)
-            await CheckinService.can_user_checkin(user_id)
+            # Streak (atravessa semanas): uma leitura do último checkin pelo índice
+            # (user_id, checkin_day), sem consultar o histórico
+            last_checkin = await checkin_collection.find_one(
+                {"user_id": user_id, "checkin_day": {"$exists": True}},
+                {"checkin_day": 1, "streak_days": 1, "longest_streak": 1},
+                sort=[("checkin_day", -1)]
+            )
+            streak_state = CheckinService._streak_state(last_checkin)
+            streak = CheckinService._next_streak(streak_state, current_date) or streak_state
+            streak_days = streak["current_streak"]
+            streak_bonus = CheckinService._streak_bonus_for(streak_days)
             
-            # Calcular pontos
-            points_awarded = await CheckinService.calculate_points(user_id)
+            claim_first_of_day = await CheckinService._may_be_first_of_day(checkin_day)
             
-            # Salvar checkin
+            # Inserção otimista (1ª escrita): os índices únicos (user_id, checkin_day) e
+            # first_checkin_day impedem duplicados e dois bônus de primeiro do dia; o
+            # streak vai no próprio documento, então checkin e streak nunca divergem
             checkin_data = {
                 "user_id": user_id,
                 "username": username,
-                "timestamp": current_datetime
+                "timestamp": current_datetime,
+                "checkin_day": checkin_day,
+                "week_id": week_id,
+                "streak_days": streak_days,
+                "longest_streak": streak["longest_streak"]
             }
+            if ranking_writer.write_behind:
+                # Marca para replay caso o processo caia antes da descarga do ranking
+                checkin_data["ranking_pending"] = True
             
-            checkin_result = await checkin_collection.insert_one(checkin_data)
+            try:
+                await CheckinService._insert_checkin(checkin_data, claim_first_of_day, streak_bonus)
+            except DuplicateKeyError:
+                CheckinService.invalidate_user_status(user_id)
+                await CheckinService._raise_duplicate_checkin(user_id, username, checkin_day)
             
+            points_awarded = checkin_data["points"]
+            checkin_logger.points_calculation(
+                username=username,
+                base_points=points_awarded - streak_bonus,
+                streak_bonus=streak_bonus,
+                total=points_awarded
+            )
             checkin_logger.database_operation(
                 operation="insert_checkin",
                 collection="checkins",
-                success=bool(checkin_result.inserted_id)
+                success=True
             )
             
-            # Atualizar ranking
-            week_id = get_week_id(current_date)
-            ranking_update = {
-                "$inc": {"points": points_awarded},
-                "$set": {
-                    "last_checkin_date": current_date.strftime("%Y-%m-%d"),
-                    "username": username,
-                    "updated_at": current_datetime
-                }
-            }
-            
-            ranking_result = await ranking_collection.update_one(
-                {"user_id": user_id, "week_id": week_id},
-                ranking_update,
-                upsert=True
-            )
+            # Estado derivado só após a inserção (um duplicado não altera nada): upsert do
+            # ranking semanal e, em seguida, $inc do total geral - 2 comandos no modo direto;
+            # no modo write-behind vão para o buffer e saem da requisição
+            await ranking_writer.record(RankingWriter.build_delta(
+                user_id=user_id,
+                username=username,
+                week_id=week_id,
+                points=points_awarded,
+                last_checkin_date=checkin_day,
+                updated_at=current_datetime,
+                checkin_id=checkin_data["_id"]
+            ))
             
             checkin_logger.database_operation(
-                operation="update_ranking",
+                operation="queue_ranking" if ranking_writer.write_behind else "update_ranking",
                 collection="rankings",
-                success=bool(ranking_result.acknowledged)
+                success=True
             )
             
+            # Atualizar o status em cache sem nova consulta
+            CheckinService._cache_user_status(user_id, current_datetime)
+            
             # Log de sucesso
             duration = (time.time() - start_time) * 1000
             checkin_logger.checkin_success(username, points_awarded, duration)
@@ -292,6 +484,7 @@ class CheckinService:
                 "message": MESSAGES['CHECKIN_SUCCESS'],
                 "username": username,
                 "points_awarded": points_awarded,
+                "streak_days": streak_days,
                 "can_checkin": False,
                 "reason": "checkin_completed"
             }
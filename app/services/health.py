@@ -0,0 +1,73 @@
+"""
+Estatísticas de saúde do banco em cache - Boas práticas Python aplicadas.
+A consulta ao banco nunca acontece no caminho da requisição depois da primeira:
+com o cache vencido, a resposta usa o valor anterior e a atualização roda em segundo plano.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from app.core import config
+from app.db.database import check_database_health
+from app.utils.datetime_utils import get_current_datetime
+from app.utils.logging import system_logger
+
+
+class DatabaseStatsCache:
+    """Contagens estimadas das coleções, atualizadas em segundo plano após o TTL."""
+
+    def __init__(self, ttl_seconds: float = 60):
+        self.ttl = max(1.0, float(ttl_seconds))
+
+        self._stats: Optional[Dict[str, Any]] = None
+        self._refreshed_at = 0.0
+        self._refreshed_at_iso: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshes = 0
+        self.hits = 0
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Consulta o banco e substitui o valor em cache."""
+        async with self._lock:
+            stats = await check_database_health()
+            if stats.get("status") == "error":
+                system_logger.warning("⚠️ Falha ao atualizar estatísticas do banco", {"error": stats.get("error")})
+            self._stats = stats
+            self._refreshed_at = time.monotonic()
+            self._refreshed_at_iso = get_current_datetime().isoformat()
+            self.refreshes += 1
+            return stats
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        finally:
+            self._task = None
+
+    async def get(self) -> Dict[str, Any]:
+        """
+        Estatísticas em cache (consulta o banco apenas na primeira chamada).
+        Vencido o TTL, devolve o valor anterior e agenda uma única atualização.
+        """
+        if self._stats is None:
+            await self.refresh()
+        else:
+            self.hits += 1
+            if time.monotonic() - self._refreshed_at >= self.ttl and self._task is None:
+                self._task = asyncio.create_task(self._refresh_in_background())
+
+        return {
+            **self._stats,
+            "refreshed_at": self._refreshed_at_iso,
+            "age_seconds": round(time.monotonic() - self._refreshed_at, 1)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do cache de estatísticas."""
+        return {"ttl_seconds": self.ttl, "refreshes": self.refreshes, "hits": self.hits}
+
+
+# Instância global das estatísticas de saúde do banco
+database_stats_cache = DatabaseStatsCache(ttl_seconds=config.HEALTH_STATS_TTL_SECONDS)
@@ -0,0 +1,387 @@
+"""
+Ranking semanal em memória - Boas práticas Python aplicadas.
+Mantém, por week_id, uma lista ordenada por (pontos desc, username) e um histograma de
+pontuações, atualizados incrementalmente pelos deltas do RankingWriter; top-N, posição e
+percentil sem consultar o banco. O total geral (all-time) tem seu próprio histograma.
+"""
+import asyncio
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core import config
+from app.db.database import all_time_collection, ranking_collection
+from app.services.ranking_cache import ranking_response_cache
+from app.services.ranking_writer import ranking_writer
+from app.utils.datetime_utils import get_week_id
+from app.utils.histogram import ScoreHistogram
+from app.utils.logging import system_logger
+
+# Chave de ordenação: pontos em ordem decrescente, username como desempate
+SortKey = Tuple[int, str]
+
+# Tentativas de carga quando deltas chegam durante a leitura do banco
+MAX_LOAD_ATTEMPTS = 3
+
+
+class WeeklyLeaderboard:
+    """Ranking de uma semana: lista ordenada de chaves + posição atual de cada usuário."""
+
+    def __init__(self, week_id: str):
+        self.week_id = week_id
+        self._keys: List[SortKey] = []
+        self._entries: Dict[ObjectId, SortKey] = {}
+        self.histogram = ScoreHistogram()
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_entries(cls, week_id: str, entries: List[Dict[str, Any]]) -> "WeeklyLeaderboard":
+        """Monta o ranking de uma vez (uma ordenação em vez de N inserções)."""
+        board = cls(week_id)
+        for entry in entries:
+            board._entries[entry["user_id"]] = (-int(entry.get("points", 0)), entry["username"])
+        board._keys = sorted(board._entries.values())
+        for negative_points, _ in board._keys:
+            board.histogram.move(None, -negative_points)
+        return board
+
+    def add(self, user_id: ObjectId, username: str, points: int) -> None:
+        """Soma pontos ao usuário (cria a entrada se necessário) mantendo a ordenação."""
+        current = self._entries.get(user_id)
+        total = points
+        if current is not None:
+            del self._keys[bisect_left(self._keys, current)]
+            total -= current[0]
+
+        key = (-total, username)
+        insort(self._keys, key)
+        self._entries[user_id] = key
+        self.histogram.move(-current[0] if current is not None else None, total)
+
+    @staticmethod
+    def _to_entries(keys: List[SortKey]) -> List[Dict[str, Any]]:
+        return [
+            {"username": username, "points": -negative_points}
+            for negative_points, username in keys
+        ]
+
+    def top(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Primeiras posições do ranking."""
+        return self._to_entries(self._keys[:limit])
+
+    def page(
+        self,
+        after: Optional[Tuple[int, str]] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, str]]]:
+        """
+        Página do ranking após a posição (pontos, username) do cursor.
+
+        Returns:
+            Tupla (entradas, posição do cursor da próxima página ou None no fim)
+        """
+        start = bisect_right(self._keys, (-after[0], after[1])) if after else 0
+        return self._slice(start, start + limit)
+
+    def around(
+        self,
+        user_id: ObjectId,
+        window: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, str]]]:
+        """
+        Janela com `window` posições acima e abaixo do usuário (vazia se ele não pontuou).
+
+        Returns:
+            Tupla (entradas, posição do cursor para continuar abaixo da janela ou None)
+        """
+        key = self._entries.get(user_id)
+        if key is None:
+            return [], None
+
+        index = bisect_left(self._keys, key)
+        return self._slice(max(0, index - window), index + window + 1)
+
+    def _slice(self, start: int, end: int) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, str]]]:
+        """Entradas [start, end) e o cursor da continuação."""
+        keys = self._keys[start:end]
+        next_after = None
+        if keys and end < len(self._keys):
+            next_after = (-keys[-1][0], keys[-1][1])
+        return self._to_entries(keys), next_after
+
+    def rank(self, user_id: ObjectId) -> Optional[int]:
+        """Posição (1 = primeiro) do usuário, ou None se ainda não pontuou na semana."""
+        key = self._entries.get(user_id)
+        if key is None:
+            return None
+        return bisect_left(self._keys, key) + 1
+
+    def points(self, user_id: ObjectId) -> Optional[int]:
+        """Pontos do usuário na semana, ou None se ainda não pontuou."""
+        key = self._entries.get(user_id)
+        return -key[0] if key is not None else None
+
+    def position(self, user_id: ObjectId) -> Dict[str, Optional[float]]:
+        """Posição (empates dividem a posição) e percentil do usuário na semana."""
+        return self.histogram.position(self.points(user_id))
+
+    def snapshot(self) -> Dict[ObjectId, SortKey]:
+        """Cópia do estado atual (usada na verificação de consistência)."""
+        return dict(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class AllTimeRankIndex:
+    """Pontos de todos os tempos por usuário + histograma (posição/percentil em memória)."""
+
+    def __init__(self):
+        self._points: Dict[ObjectId, int] = {}
+        self.histogram = ScoreHistogram()
+        self.loaded = False
+        self._loading: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    def apply(self, deltas: List[Dict[str, Any]]) -> None:
+        """Aplica deltas de qualquer semana ao total geral."""
+        if self._loading is not None:
+            self._loading += len(deltas)
+        if not self.loaded:
+            return
+
+        for delta in deltas:
+            previous = self._points.get(delta["user_id"])
+            total = (previous or 0) + delta["points"]
+            self._points[delta["user_id"]] = total
+            self.histogram.move(previous, total)
+
+    async def load(self) -> None:
+        """Carrega os totais de `all_time_totals` (mais deltas pendentes do write-behind)."""
+        async with self._lock:
+            for attempt in range(MAX_LOAD_ATTEMPTS):
+                self._loading = 0
+                flushes_before = ranking_writer.flushes
+                try:
+                    points = {
+                        entry["_id"]: int(entry.get("points", 0))
+                        async for entry in all_time_collection.find({}, {"points": 1})
+                    }
+                    for delta in ranking_writer.pending_deltas():
+                        points[delta["user_id"]] = points.get(delta["user_id"], 0) + delta["points"]
+                finally:
+                    concurrent_deltas, self._loading = self._loading, None
+
+                if not concurrent_deltas and ranking_writer.flushes == flushes_before:
+                    break
+
+            histogram = ScoreHistogram()
+            for total in points.values():
+                histogram.move(None, total)
+
+            self._points, self.histogram, self.loaded = points, histogram, True
+            ranking_response_cache.bump()
+
+    def position(self, user_id: ObjectId) -> Dict[str, Optional[float]]:
+        """Posição (empates dividem a posição) e percentil do usuário no total geral."""
+        return self.histogram.position(self._points.get(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do índice de total geral."""
+        return {"loaded": self.loaded, **self.histogram.stats()}
+
+
+class LeaderboardRegistry:
+    """Rankings semanais em memória (LRU por semana) sincronizados com `weekly_rankings`."""
+
+    def __init__(self, max_weeks: int = 8, resync_seconds: float = 300):
+        """
+        Args:
+            max_weeks: Quantidade de semanas mantidas em memória
+            resync_seconds: Intervalo de recarga completa a partir do banco (0 = desligado)
+        """
+        self.max_weeks = max(1, int(max_weeks))
+        self.resync_seconds = float(resync_seconds)
+
+        self._boards: "OrderedDict[str, WeeklyLeaderboard]" = OrderedDict()
+        self._loading: Dict[str, int] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.all_time = AllTimeRankIndex()
+
+        self.hits = 0
+        self.loads = 0
+        self.load_retries = 0
+        self.applied_deltas = 0
+        self.resyncs = 0
+
+    def apply(self, deltas: List[Dict[str, Any]]) -> None:
+        """Listener do RankingWriter: aplica os deltas às semanas carregadas e ao total geral."""
+        self.all_time.apply(deltas)
+        for delta in deltas:
+            week_id = delta["week_id"]
+            board = self._boards.get(week_id)
+            if board is not None:
+                board.add(delta["user_id"], delta["username"], delta["points"])
+                self.applied_deltas += 1
+            if week_id in self._loading:
+                # Carga em andamento: o resultado lido do banco pode estar desatualizado
+                self._loading[week_id] += 1
+
+    async def _read_week(self, week_id: str) -> WeeklyLeaderboard:
+        """Lê a semana do banco e sobrepõe os deltas ainda não gravados (write-behind)."""
+        entries = await ranking_collection.find(
+            {"week_id": week_id},
+            {"_id": 0, "user_id": 1, "username": 1, "points": 1}
+        ).to_list(length=None)
+        board = WeeklyLeaderboard.from_entries(week_id, entries)
+
+        for delta in ranking_writer.pending_deltas(week_id):
+            board.add(delta["user_id"], delta["username"], delta["points"])
+        return board
+
+    async def load(self, week_id: str) -> WeeklyLeaderboard:
+        """
+        Carrega (ou recarrega) a semana a partir do banco.
+
+        Se deltas da semana chegarem (ou uma descarga do write-behind acontecer)
+        durante a leitura, a carga é repetida para não contar pontos duas vezes.
+        """
+        lock = self._load_locks.setdefault(week_id, asyncio.Lock())
+        async with lock:
+            board = None
+            for attempt in range(MAX_LOAD_ATTEMPTS):
+                self._loading[week_id] = 0
+                flushes_before = ranking_writer.flushes
+                try:
+                    board = await self._read_week(week_id)
+                finally:
+                    concurrent_deltas = self._loading.pop(week_id, 0)
+
+                if not concurrent_deltas and ranking_writer.flushes == flushes_before:
+                    break
+                self.load_retries += 1
+            else:
+                system_logger.warning(
+                    "⚠️ Ranking em memória carregado com escritas concorrentes - será corrigido na próxima ressincronização",
+                    {"week_id": week_id}
+                )
+
+            self._boards[week_id] = board
+            self._boards.move_to_end(week_id)
+            while len(self._boards) > self.max_weeks:
+                self._boards.popitem(last=False)
+
+            self.loads += 1
+            ranking_response_cache.bump()
+            return board
+
+    async def get_board(self, week_id: Optional[str] = None) -> WeeklyLeaderboard:
+        """Ranking da semana (semana atual por padrão), carregando do banco se necessário."""
+        week_id = week_id or get_week_id()
+        board = self._boards.get(week_id)
+        if board is None:
+            return await self.load(week_id)
+
+        self.hits += 1
+        self._boards.move_to_end(week_id)
+        return board
+
+    async def reload_all(self) -> int:
+        """Recarrega do banco todas as semanas em memória (ex.: após reconstrução do ranking)."""
+        week_ids = list(self._boards)
+        for week_id in week_ids:
+            await self.load(week_id)
+        return len(week_ids)
+
+    async def verify(self, week_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Compara o ranking em memória com o banco (mais os deltas pendentes).
+
+        Returns:
+            Dict com a quantidade de divergências e alguns exemplos
+        """
+        week_id = week_id or get_week_id()
+        board = self._boards.get(week_id)
+        if board is None:
+            return {"week_id": week_id, "loaded": False}
+
+        expected = (await self._read_week(week_id)).snapshot()
+        actual = board.snapshot()
+
+        mismatches = []
+        for user_id in expected.keys() | actual.keys():
+            if expected.get(user_id) != actual.get(user_id):
+                mismatches.append({
+                    "user_id": str(user_id),
+                    "memory": actual.get(user_id),
+                    "database": expected.get(user_id)
+                })
+
+        if mismatches:
+            system_logger.warning(
+                "⚠️ Ranking em memória divergente do banco",
+                {"week_id": week_id, "mismatches": len(mismatches)}
+            )
+
+        return {
+            "week_id": week_id,
+            "loaded": True,
+            "entries": len(board),
+            "consistent": not mismatches,
+            "mismatches": len(mismatches),
+            "examples": mismatches[:20]
+        }
+
+    async def _run(self) -> None:
+        """Ressincronização periódica (corrige escritas feitas fora deste processo)."""
+        while True:
+            await asyncio.sleep(self.resync_seconds)
+            try:
+                await self.reload_all()
+                await self.all_time.load()
+                self.resyncs += 1
+            except Exception as e:
+                system_logger.error("Erro ao ressincronizar ranking em memória", error=e)
+
+    async def start(self) -> None:
+        """Carrega a semana atual e o total geral e inicia a ressincronização periódica."""
+        await self.load(get_week_id())
+        await self.all_time.load()
+        if self.resync_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para a ressincronização periódica."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna as métricas dos rankings em memória."""
+        return {
+            "weeks": {week_id: len(board) for week_id, board in self._boards.items()},
+            "max_weeks": self.max_weeks,
+            "resync_seconds": self.resync_seconds,
+            "hits": self.hits,
+            "loads": self.loads,
+            "load_retries": self.load_retries,
+            "applied_deltas": self.applied_deltas,
+            "resyncs": self.resyncs,
+            "all_time": self.all_time.stats()
+        }
+
+
+# Instância global dos rankings em memória (alimentada pelo gravador de ranking)
+leaderboard = LeaderboardRegistry(
+    max_weeks=config.LEADERBOARD_MAX_WEEKS,
+    resync_seconds=config.LEADERBOARD_RESYNC_SECONDS
+)
+ranking_writer.add_listener(leaderboard.apply)
@@ -0,0 +1,201 @@
+"""
+Controle de admissão para os endpoints de login - Boas práticas Python aplicadas.
+Limita verificações bcrypt simultâneas e aplica token buckets por usuário e por IP,
+rejeitando o excesso antes de qualquer trabalho caro.
+"""
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+
+from app.core import config
+from app.utils.exceptions import RateLimitExceededError
+
+
+class TokenBucket:
+    """Token bucket simples: `capacity` tentativas com reposição contínua."""
+
+    __slots__ = ("capacity", "refill_per_second", "tokens", "updated_at")
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = now
+
+    def consume(self, now: float) -> float:
+        """
+        Tenta consumir um token.
+
+        Returns:
+            0.0 se o token foi consumido, ou os segundos até o próximo token
+        """
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        if self.refill_per_second <= 0:
+            return 60.0
+        return (1 - self.tokens) / self.refill_per_second
+
+
+class BucketRegistry:
+    """Conjunto limitado de token buckets por chave, com despejo LRU."""
+
+    def __init__(self, capacity: float, per_minute: float, max_keys: int):
+        self.capacity = capacity
+        self.refill_per_second = per_minute / 60.0
+        self.max_keys = max(1, int(max_keys))
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def consume(self, key: str, now: float) -> float:
+        """Consome um token do bucket da chave. Retorna a espera necessária (0 = liberado)."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.capacity, self.refill_per_second, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        return bucket.consume(now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginAdmissionController:
+    """Admissão de logins: limite global de concorrência + buckets por usuário e IP."""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        user_burst: int,
+        user_per_minute: float,
+        ip_burst: int,
+        ip_per_minute: float,
+        max_tracked_keys: int = 10000
+    ):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.user_buckets = BucketRegistry(user_burst, user_per_minute, max_tracked_keys)
+        self.ip_buckets = BucketRegistry(ip_burst, ip_per_minute, max_tracked_keys)
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.rejected_concurrency = 0
+        self.rejected_username = 0
+        self.rejected_ip = 0
+
+    def acquire(self, username: str, client_ip: Optional[str]) -> None:
+        """
+        Admite uma tentativa de login ou rejeita imediatamente.
+
+        Raises:
+            RateLimitExceededError: Limite global, por IP ou por usuário atingido
+        """
+        if self.in_flight >= self.max_concurrent:
+            self.rejected_concurrency += 1
+            raise RateLimitExceededError("concurrency", retry_after=1)
+
+        now = time.monotonic()
+
+        if client_ip:
+            wait = self.ip_buckets.consume(client_ip, now)
+            if wait > 0:
+                self.rejected_ip += 1
+                raise RateLimitExceededError("ip", retry_after=math.ceil(wait))
+
+        wait = self.user_buckets.consume(username.lower(), now)
+        if wait > 0:
+            self.rejected_username += 1
+            raise RateLimitExceededError("username", retry_after=math.ceil(wait))
+
+        self.in_flight += 1
+        self.admitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self) -> None:
+        """Libera a vaga de uma tentativa admitida."""
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna os contadores de admissão para dimensionamento."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "admitted": self.admitted,
+            "rejected_concurrency": self.rejected_concurrency,
+            "rejected_username": self.rejected_username,
+            "rejected_ip": self.rejected_ip,
+            "tracked_usernames": len(self.user_buckets),
+            "tracked_ips": len(self.ip_buckets)
+        }
+
+
+def parse_trusted_proxies(value: str) -> Tuple:
+    """Converte a lista separada por vírgulas (IPs ou CIDRs) em redes."""
+    networks = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            networks.append(ipaddress.ip_network(item, strict=False))
+    return tuple(networks)
+
+
+# Proxies cujos headers X-Real-IP / X-Forwarded-For são confiáveis (ex.: o nginx)
+TRUSTED_PROXIES = parse_trusted_proxies(config.TRUSTED_PROXIES)
+
+
+def _is_trusted_proxy(host: Optional[str]) -> bool:
+    if not host:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """
+    Obtém o IP do cliente. Os headers definidos pelo nginx só são considerados
+    quando a conexão vem de um proxy confiável (TRUSTED_PROXIES); caso contrário,
+    qualquer cliente poderia trocar de IP a cada requisição.
+    """
+    peer = request.client.host if request.client else None
+    if not _is_trusted_proxy(peer):
+        return peer
+
+    real_ip = request.headers.get("x-real-ip")
+    if real_ip:
+        return real_ip.strip()
+
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if forwarded_for:
+        # Da direita para a esquerda: o primeiro endereço que não é um proxy confiável
+        for hop in reversed(forwarded_for.split(",")):
+            hop = hop.strip()
+            if hop and not _is_trusted_proxy(hop):
+                return hop
+
+    return peer
+
+
+# Instância global do controle de admissão de logins
+login_admission = LoginAdmissionController(
+    max_concurrent=config.LOGIN_MAX_CONCURRENT,
+    user_burst=config.LOGIN_USER_BURST,
+    user_per_minute=config.LOGIN_USER_PER_MINUTE,
+    ip_burst=config.LOGIN_IP_BURST,
+    ip_per_minute=config.LOGIN_IP_PER_MINUTE
+)
@@ -0,0 +1,364 @@
+"""
+Agendador de manutenção em segundo plano - Boas práticas Python aplicadas.
+Tarefas de banco (índices, correções, reprocessamentos) rodam depois do boot, com jitter,
+e um documento de trava em `maintenance_locks` garante um único executor entre os workers.
+"""
+import asyncio
+import random
+import secrets
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core import config
+from app.db.database import (
+    all_time_collection, fix_username_inconsistencies, maintenance_lock_collection,
+    ranking_collection
+)
+from app.db.indexes import ensure_indexes
+from app.services.all_time_totals import AllTimeTotalsService
+from app.services.checkin_backfill import CheckinBackfillService
+from app.services.leaderboard import leaderboard
+from app.services.ranking_snapshots import RankingSnapshotService
+from app.services.ranking_writer import ranking_writer
+from app.utils.datetime_utils import get_current_datetime
+from app.utils.logging import system_logger
+
+
+@dataclass
+class MaintenanceJob:
+    """Tarefa de manutenção e o estado da última execução neste processo."""
+
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    interval_seconds: float  # Intervalo mínimo entre execuções (considerando todos os workers)
+    repeat: bool = False  # False = uma vez por boot até dar certo (pulada se outro worker rodou no intervalo)
+    locked: bool = True  # False = roda em todos os workers (estado em memória do processo)
+    once: bool = False  # True = backfill único: não roda mais depois de um sucesso registrado
+    delay_seconds: float = 0
+
+    state: str = "scheduled"
+    runs: int = 0
+    skips: int = 0
+    failures: int = 0
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_result: Any = None
+    last_error: Optional[str] = None
+    next_run_at: Optional[datetime] = None
+
+    def status(self) -> Dict[str, Any]:
+        """Estado da tarefa para o endpoint de status."""
+        return {
+            "state": self.state,
+            "repeat": self.repeat,
+            "locked": self.locked,
+            "once": self.once,
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "skips": self.skips,
+            "failures": self.failures,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_duration_ms": self.last_duration_ms,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None
+        }
+
+
+class MaintenanceScheduler:
+    """Executa tarefas de manutenção como tasks asyncio, com jitter e trava entre workers."""
+
+    def __init__(
+        self,
+        jitter_seconds: float = 10,
+        lock_ttl_seconds: float = 600,
+        retry_base_seconds: float = 5,
+        retry_max_seconds: float = 300
+    ):
+        """
+        Args:
+            jitter_seconds: Atraso aleatório máximo antes de cada execução
+            lock_ttl_seconds: Validade da trava (renovada enquanto a tarefa roda)
+            retry_base_seconds: Espera antes da primeira nova tentativa após uma falha
+            retry_max_seconds: Espera máxima entre tentativas (o backoff dobra até ela)
+        """
+        self.jitter_seconds = max(0.0, float(jitter_seconds))
+        self.lock_ttl = timedelta(seconds=max(30.0, float(lock_ttl_seconds)))
+        self.retry_base = max(1.0, float(retry_base_seconds))
+        self.retry_max = max(self.retry_base, float(retry_max_seconds))
+        # Identifica este processo como dono das travas
+        self.holder_id = f"{socket.gethostname()}:{secrets.token_hex(4)}"
+
+        self._jobs: Dict[str, MaintenanceJob] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        interval_seconds: float,
+        repeat: bool = False,
+        locked: bool = True,
+        once: bool = False,
+        delay_seconds: float = 0
+    ) -> None:
+        """Registra uma tarefa (antes de `start`)."""
+        self._jobs[name] = MaintenanceJob(
+            name=name,
+            func=func,
+            interval_seconds=interval_seconds,
+            repeat=repeat,
+            locked=locked,
+            once=once,
+            delay_seconds=delay_seconds
+        )
+
+    async def _acquire(self, job: MaintenanceJob) -> bool:
+        """
+        Assume a trava da tarefa se ela estiver livre (ou expirada) e a próxima execução
+        já estiver vencida. Com outro dono, o upsert colide no _id e a tarefa é pulada.
+        Tarefas únicas (`once`) também são puladas depois do primeiro sucesso.
+        """
+        now = get_current_datetime()
+        query = {"_id": job.name, "expires_at": {"$lte": now}, "next_run_at": {"$lte": now}}
+        if job.once:
+            query["last_status"] = {"$ne": "succeeded"}
+        try:
+            await maintenance_lock_collection.update_one(
+                query,
+                {"$set": {
+                    "holder": self.holder_id,
+                    "expires_at": now + self.lock_ttl,
+                    "next_run_at": now,
+                    "started_at": now
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _renew(self, job: MaintenanceJob) -> None:
+        """Renova a trava enquanto a tarefa roda (tarefas mais longas que o TTL)."""
+        while True:
+            await asyncio.sleep(self.lock_ttl.total_seconds() / 3)
+            await maintenance_lock_collection.update_one(
+                {"_id": job.name, "holder": self.holder_id},
+                {"$set": {"expires_at": get_current_datetime() + self.lock_ttl}}
+            )
+
+    async def _release(self, job: MaintenanceJob, succeeded: bool) -> None:
+        """Libera a trava e agenda a próxima execução entre os workers."""
+        now = get_current_datetime()
+        # Após falha, qualquer worker pode tentar de novo na sua próxima rodada
+        next_run_at = now + timedelta(seconds=job.interval_seconds) if succeeded else now
+        await maintenance_lock_collection.update_one(
+            {"_id": job.name, "holder": self.holder_id},
+            {"$set": {
+                "expires_at": now,
+                "next_run_at": next_run_at,
+                "last_status": "succeeded" if succeeded else "failed",
+                "last_finished_at": now,
+                "last_duration_ms": job.last_duration_ms,
+                "last_error": job.last_error
+            }}
+        )
+
+    async def _execute(self, job: MaintenanceJob) -> None:
+        """Executa a tarefa uma vez (se conseguir a trava)."""
+        try:
+            acquired = not job.locked or await self._acquire(job)
+        except Exception as e:
+            job.state = "failed"
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            system_logger.error("Erro ao obter trava de manutenção", error=e, context={"job": job.name})
+            return
+
+        if not acquired:
+            job.state = "skipped"
+            job.skips += 1
+            return
+
+        job.state = "running"
+        job.last_started_at = get_current_datetime()
+        start_time = time.perf_counter()
+        renew_task = asyncio.create_task(self._renew(job)) if job.locked else None
+        succeeded = False
+
+        try:
+            job.last_result = await job.func()
+            job.last_error = None
+            job.runs += 1
+            job.state = "succeeded"
+            succeeded = True
+        except Exception as e:
+            job.last_error = f"{type(e).__name__}: {e}"
+            job.failures += 1
+            job.state = "failed"
+            system_logger.error(
+                "Erro na tarefa de manutenção",
+                error=e,
+                context={"job": job.name}
+            )
+        finally:
+            if renew_task is not None:
+                renew_task.cancel()
+            job.last_duration_ms = round((time.perf_counter() - start_time) * 1000, 2)
+            job.last_finished_at = get_current_datetime()
+
+        if job.locked:
+            try:
+                await self._release(job, succeeded)
+            except Exception as e:
+                # A trava expira sozinha após o TTL
+                system_logger.error(
+                    "Erro ao liberar trava de manutenção",
+                    error=e,
+                    context={"job": job.name}
+                )
+
+        system_logger.info(
+            "🧰 Tarefa de manutenção concluída",
+            {"job": job.name, "state": job.state, "duration_ms": job.last_duration_ms}
+        )
+
+    def _retry_delay(self, job: MaintenanceJob, attempt: int) -> float:
+        """Backoff exponencial após a `attempt`-ésima falha seguida (recorrentes: até o intervalo)."""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+        if job.repeat:
+            delay = min(delay, job.interval_seconds)
+        return delay + random.uniform(0, self.jitter_seconds)
+
+    async def _loop(self, job: MaintenanceJob) -> None:
+        """
+        Agenda a tarefa: atraso inicial com jitter e, se recorrente, intervalo com jitter.
+        Uma falha (inclusive de tarefa de execução única) é repetida com backoff exponencial
+        até dar certo; "pulada" significa que outro worker executa ou já executou.
+        """
+        delay = job.delay_seconds + random.uniform(0, self.jitter_seconds)
+        failed_attempts = 0
+        while True:
+            job.next_run_at = get_current_datetime() + timedelta(seconds=delay)
+            await asyncio.sleep(delay)
+            job.next_run_at = None
+            await self._execute(job)
+
+            if job.state == "failed":
+                failed_attempts += 1
+                delay = self._retry_delay(job, failed_attempts)
+                continue
+            failed_attempts = 0
+            if not job.repeat:
+                return
+            delay = job.interval_seconds + random.uniform(0, self.jitter_seconds)
+
+    def start(self) -> None:
+        """Inicia as tarefas registradas (não bloqueia o boot)."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self._jobs.values()]
+        system_logger.info(
+            "🧰 Agendador de manutenção iniciado",
+            {"jobs": len(self._jobs), "holder": self.holder_id}
+        )
+
+    async def stop(self) -> None:
+        """Cancela as tarefas (as travas em uso expiram pelo TTL)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def status(self) -> Dict[str, Any]:
+        """Estado das tarefas neste processo e das travas compartilhadas."""
+        locks = {
+            lock["_id"]: {
+                "holder": lock.get("holder"),
+                "expires_at": lock.get("expires_at"),
+                "next_run_at": lock.get("next_run_at"),
+                "last_status": lock.get("last_status"),
+                "last_finished_at": lock.get("last_finished_at")
+            }
+            async for lock in maintenance_lock_collection.find({})
+        }
+        return {
+            "holder": self.holder_id,
+            "running": bool(self._tasks),
+            "jobs": {name: job.status() for name, job in self._jobs.items()},
+            "locks": locks
+        }
+
+
+async def _fix_usernames() -> int:
+    """Corrige usernames e recarrega os rankings em memória se algo mudou."""
+    corrections = await fix_username_inconsistencies()
+    if corrections:
+        await leaderboard.reload_all()
+        await leaderboard.all_time.load()
+    return corrections
+
+
+async def _replay_pending() -> int:
+    """Reaplica checkins pendentes; os rankings em memória não recebem esses deltas."""
+    replayed = await ranking_writer.replay_pending()
+    if replayed:
+        await leaderboard.reload_all()
+        await leaderboard.all_time.load()
+    return replayed
+
+
+async def _backfill_all_time_if_empty() -> Optional[Dict]:
+    """Primeira execução com a coleção materializada: preencher a partir dos rankings."""
+    if await all_time_collection.estimated_document_count() > 0:
+        return None
+    if await ranking_collection.find_one({}, {"_id": 1}) is None:
+        return None
+    return await AllTimeTotalsService.backfill()
+
+
+async def _ensure_indexes() -> None:
+    await ensure_indexes()
+    await AllTimeTotalsService.ensure_indexes()
+
+
+# Instância global do agendador de manutenção
+maintenance_scheduler = MaintenanceScheduler(
+    jitter_seconds=config.MAINTENANCE_JITTER_SECONDS,
+    lock_ttl_seconds=config.MAINTENANCE_LOCK_TTL_SECONDS,
+    retry_base_seconds=config.MAINTENANCE_RETRY_BASE_SECONDS,
+    retry_max_seconds=config.MAINTENANCE_RETRY_MAX_SECONDS
+)
+
+# Por processo: o ranking em memória é de cada worker
+maintenance_scheduler.register("leaderboard", leaderboard.start, interval_seconds=0, locked=False)
+# Uma vez por boot (pulada se outro worker já executou dentro do intervalo)
+maintenance_scheduler.register("indexes", _ensure_indexes, interval_seconds=600)
+# Backfill único: checkin_day nos checkins antigos (índice único por usuário/dia)
+maintenance_scheduler.register(
+    "checkin_day_backfill", CheckinBackfillService.backfill_checkin_days, interval_seconds=600, once=True
+)
+# Backfill único: streak no último checkin de cada usuário (sem ele todos recomeçariam em 1)
+maintenance_scheduler.register(
+    "streak_state_backfill", CheckinBackfillService.backfill_streaks, interval_seconds=600, once=True
+)
+# Backfill único: primeiro checkin dos dias ainda abertos (evita um segundo bônus no dia da atualização)
+maintenance_scheduler.register(
+    "first_checkin_backfill", CheckinBackfillService.backfill_first_checkins, interval_seconds=600, once=True
+)
+# Recorrente: a recuperação de checkins pendentes não pode depender de quando outro worker
+# rodou pela última vez (um reinício rápido cairia dentro do intervalo e pularia o replay)
+maintenance_scheduler.register("replay_pending", _replay_pending, interval_seconds=60, repeat=True)
+maintenance_scheduler.register("username_fix", _fix_usernames, interval_seconds=6 * 3600, delay_seconds=30)
+maintenance_scheduler.register("all_time_backfill", _backfill_all_time_if_empty, interval_seconds=600, delay_seconds=10)
+# Recorrente: congela semanas encerradas mesmo sem consultas ao histórico
+maintenance_scheduler.register(
+    "close_weeks", RankingSnapshotService.close_final_weeks, interval_seconds=6 * 3600, repeat=True, delay_seconds=60
+)
@@ -0,0 +1,143 @@
+"""
+Serviço de hashing de senhas fora do event loop - Boas práticas Python aplicadas.
+Executa bcrypt em um pool limitado para não bloquear as demais requisições.
+"""
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from passlib.context import CryptContext
+
+from app.core import config
+from app.utils.exceptions import ServiceOverloadedError
+
+# Contexto para Hashing de Senhas
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=12
+)
+
+# Hash bcrypt válido usado para igualar o tempo de resposta quando o usuário não existe
+DUMMY_PASSWORD_HASH = "$2b$12$cowdnsI/yztskvM1ydtSyeBiLtoOmI1TCmiBPTNsF3XxB4I5NP8CW"
+
+
+def hash_password_sync(password: str) -> str:
+    """Gera o hash bcrypt da senha (bloqueante)."""
+    return pwd_context.hash(password)
+
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    """Verifica a senha contra o hash bcrypt (bloqueante)."""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Executa hashing/verificação bcrypt em um pool com limite de fila e métricas."""
+
+    def __init__(
+        self,
+        executor_type: str = "thread",
+        max_workers: int = 2,
+        max_pending: int = 32
+    ):
+        """
+        Args:
+            executor_type: "thread" (bcrypt libera o GIL) ou "process"
+            max_workers: Quantidade de workers do pool
+            max_pending: Máximo de operações em andamento + enfileiradas
+        """
+        self.executor_type = executor_type
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self._executor: Optional[Executor] = None
+
+        self.pending = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+
+    def _get_executor(self) -> Executor:
+        """Cria o pool sob demanda (evita processos ociosos em imports/testes)."""
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        """Agenda a função no pool respeitando o limite de fila."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServiceOverloadedError(
+                message="Serviço de autenticação sobrecarregado, tente novamente",
+                error_code="PASSWORD_HASHER_OVERLOADED",
+                details={"pending": self.pending, "max_pending": self.max_pending}
+            )
+
+        self.pending += 1
+        self.submitted += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        start_time = time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+            duration = (time.perf_counter() - start_time) * 1000
+            self.total_duration_ms += duration
+            self.max_duration_ms = max(self.max_duration_ms, duration)
+
+    async def hash(self, password: str) -> str:
+        """Gera o hash da senha sem bloquear o event loop."""
+        return await self._run(hash_password_sync, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica a senha sem bloquear o event loop."""
+        return await self._run(verify_password_sync, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Encerra o pool de workers."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna as métricas do serviço de hashing."""
+        finished = self.completed + self.failed
+        return {
+            "executor_type": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_duration_ms": round(self.total_duration_ms / finished, 2) if finished else 0.0,
+            "max_duration_ms": round(self.max_duration_ms, 2)
+        }
+
+
+# Instância global do serviço de hashing
+password_hasher = PasswordHasher(
+    executor_type=config.PASSWORD_HASH_EXECUTOR,
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_pending=config.PASSWORD_HASH_MAX_PENDING
+)
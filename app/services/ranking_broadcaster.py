@@ -0,0 +1,197 @@
+"""
+Ranking semanal ao vivo (WebSocket / SSE) - Boas práticas Python aplicadas.
+Os deltas do RankingWriter são acumulados e publicados no máximo uma vez por intervalo;
+cada publicação é serializada uma única vez e repassada a todos os assinantes.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Set
+
+from bson import ObjectId
+
+from app.core import config
+from app.services.leaderboard import leaderboard
+from app.services.ranking_writer import ranking_writer
+from app.utils.datetime_utils import get_week_id
+from app.utils.exceptions import ServiceOverloadedError
+from app.utils.logging import system_logger
+
+
+class LiveMessage:
+    """Mensagem já serializada, nos formatos de WebSocket (texto) e SSE (evento)."""
+
+    __slots__ = ("text", "event")
+
+    def __init__(self, message_type: str, payload: Dict[str, Any]):
+        self.text = json.dumps({"type": message_type, **payload}, ensure_ascii=False, separators=(",", ":"))
+        self.event = f"event: {message_type}\ndata: {self.text}\n\n"
+
+
+# Enviada a quem não consumiu a publicação anterior: recarregar GET /ranking/weekly
+RESYNC_MESSAGE = LiveMessage("resync", {})
+
+
+class RankingBroadcaster:
+    """Publica as mudanças do ranking da semana atual para assinantes conectados."""
+
+    def __init__(self, interval_ms: int = 1000, max_subscribers: int = 5000, top: int = 10):
+        """
+        Args:
+            interval_ms: Intervalo mínimo entre publicações (mudanças são acumuladas)
+            max_subscribers: Limite de conexões simultâneas
+            top: Posições enviadas na mensagem inicial de cada assinante
+        """
+        self.interval = max(50, int(interval_ms)) / 1000
+        self.max_subscribers = max(1, int(max_subscribers))
+        self.top = max(1, int(top))
+
+        # Fila de uma posição por assinante: memória constante, mesmo com clientes lentos
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._changed: Dict[ObjectId, str] = {}
+        self._changed_week: Optional[str] = None
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.broadcasts = 0
+        self.coalesced_deltas = 0
+        self.dropped_messages = 0
+        self.rejected_subscribers = 0
+        self.peak_subscribers = 0
+
+    def on_deltas(self, deltas: List[Dict[str, Any]]) -> None:
+        """Listener do RankingWriter: marca os usuários da semana atual que mudaram."""
+        week_id = get_week_id()
+        for delta in deltas:
+            if delta["week_id"] != week_id:
+                continue
+            if self._changed_week != week_id:
+                self._changed.clear()
+                self._changed_week = week_id
+            self._changed[delta["user_id"]] = delta["username"]
+            self.coalesced_deltas += 1
+
+        if self._changed:
+            self._dirty.set()
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Registra um assinante.
+
+        Raises:
+            ServiceOverloadedError: Limite de assinantes atingido
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            self.rejected_subscribers += 1
+            raise ServiceOverloadedError(
+                message="Limite de conexões do ranking ao vivo atingido",
+                error_code="RANKING_STREAM_FULL",
+                details={"subscribers": len(self._subscribers)}
+            )
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        self.peak_subscribers = max(self.peak_subscribers, len(self._subscribers))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Remove um assinante (desconexão)."""
+        self._subscribers.discard(queue)
+
+    async def snapshot_message(self) -> LiveMessage:
+        """Mensagem inicial: primeiras posições da semana atual."""
+        board = await leaderboard.get_board()
+        return LiveMessage("snapshot", {
+            "week_id": board.week_id,
+            "total_participants": board.histogram.total,
+            "ranking": board.top(self.top)
+        })
+
+    async def _build_update(self) -> Optional[LiveMessage]:
+        """Mudanças acumuladas desde a última publicação, com pontos e posição atuais."""
+        week_id, changed = self._changed_week, self._changed
+        self._changed = {}
+        if not changed:
+            return None
+
+        board = await leaderboard.get_board(week_id)
+        changes = []
+        for user_id, username in changed.items():
+            points = board.points(user_id)
+            if points is None:
+                continue
+            changes.append({
+                "username": username,
+                "points": points,
+                "position": board.histogram.rank(points)
+            })
+        changes.sort(key=lambda change: (-change["points"], change["username"]))
+
+        return LiveMessage("update", {
+            "week_id": week_id,
+            "total_participants": board.histogram.total,
+            "changes": changes
+        })
+
+    def _publish(self, message: LiveMessage) -> None:
+        """
+        Entrega a mesma mensagem a todos. Quem ainda não consumiu a anterior perdeu
+        mudanças: a pendente é trocada por um pedido de ressincronização.
+        """
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                queue.put_nowait(RESYNC_MESSAGE)
+                self.dropped_messages += 1
+            else:
+                queue.put_nowait(message)
+        self.broadcasts += 1
+
+    async def _run(self) -> None:
+        """Publica as mudanças acumuladas no máximo uma vez por intervalo."""
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            try:
+                message = await self._build_update()
+                if message is not None and self._subscribers:
+                    self._publish(message)
+            except Exception as e:
+                system_logger.error("Erro ao publicar ranking ao vivo", error=e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Inicia a tarefa de publicação."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para a tarefa de publicação."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do ranking ao vivo."""
+        return {
+            "subscribers": len(self._subscribers),
+            "peak_subscribers": self.peak_subscribers,
+            "max_subscribers": self.max_subscribers,
+            "interval_ms": int(self.interval * 1000),
+            "broadcasts": self.broadcasts,
+            "coalesced_deltas": self.coalesced_deltas,
+            "dropped_messages": self.dropped_messages,
+            "rejected_subscribers": self.rejected_subscribers
+        }
+
+
+# Instância global do ranking ao vivo (alimentada pelo gravador de ranking)
+ranking_broadcaster = RankingBroadcaster(
+    interval_ms=config.RANKING_BROADCAST_INTERVAL_MS,
+    max_subscribers=config.RANKING_STREAM_MAX_SUBSCRIBERS,
+    top=config.RANKING_STREAM_TOP
+)
+ranking_writer.add_listener(ranking_broadcaster.on_deltas)
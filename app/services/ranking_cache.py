@@ -0,0 +1,108 @@
+"""
+Cache HTTP condicional das respostas de ranking (ETag / 304) - Boas práticas Python aplicadas.
+Um contador de versão é incrementado a cada escrita no ranking; o ETag deriva da versão
+e da variante da requisição, e os bytes serializados ficam em cache por ETag.
+"""
+import hashlib
+import secrets
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core import config
+from app.services.ranking_writer import ranking_writer
+from app.utils.cache import TTLCache
+
+# Respostas de ranking podem ser reutilizadas, mas sempre revalidadas com o servidor
+CACHE_CONTROL = "no-cache"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o header If-None-Match (lista de ETags ou *) com o ETag atual."""
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", etag):
+            return True
+    return False
+
+
+class RankingResponseCache:
+    """Versão do ranking + corpos de resposta serializados por ETag."""
+
+    def __init__(self, maxsize: int = 512):
+        # Identificador do processo: versões de processos diferentes nunca colidem
+        self.boot_id = secrets.token_hex(4)
+        self.version = 0
+        # Sem expiração por tempo: o ETag muda com a versão e o LRU descarta o que sobrar
+        self._bodies = TTLCache(maxsize=maxsize, ttl=None)
+
+        self.not_modified = 0
+        self.cache_hits = 0
+        self.renders = 0
+
+    def bump(self, *_args: Any) -> None:
+        """Invalida todas as respostas (chamado a cada escrita/recarga do ranking)."""
+        self.version += 1
+
+    def etag(self, variant: Tuple) -> str:
+        """ETag forte da variante (endpoint, semana, página, usuário...) na versão atual."""
+        raw = f"{self.boot_id}:{self.version}:{variant!r}".encode()
+        return f'"{hashlib.sha1(raw).hexdigest()[:20]}"'
+
+    async def respond(
+        self,
+        request: Request,
+        variant: Tuple,
+        render: Callable[[], Awaitable[bytes]]
+    ) -> Response:
+        """
+        Responde 304 se o cliente já tem a versão atual; senão devolve os bytes em cache
+        ou renderiza (uma vez por versão/variante).
+
+        Args:
+            request: Requisição (para o header If-None-Match)
+            variant: Tupla que identifica a resposta (inclui o usuário se personalizada)
+            render: Função que consulta e serializa a resposta
+
+        Returns:
+            Response com ETag
+        """
+        # ETag calculado antes da consulta: se o ranking mudar durante a renderização,
+        # o corpo é mais novo que a versão e a próxima requisição apenas revalida de novo
+        etag = self.etag(variant)
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        body = self._bodies.get(etag)
+        if body is None:
+            body = await render()
+            self._bodies.set(etag, body)
+            self.renders += 1
+        else:
+            self.cache_hits += 1
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do cache de respostas do ranking."""
+        return {
+            "version": f"{self.boot_id}-{self.version}",
+            "not_modified": self.not_modified,
+            "cache_hits": self.cache_hits,
+            "renders": self.renders,
+            "bodies": self._bodies.stats()
+        }
+
+
+# Instância global: versão incrementada a cada delta aplicado e a cada descarga do write-behind
+ranking_response_cache = RankingResponseCache(maxsize=config.RANKING_RESPONSE_CACHE_SIZE)
+ranking_writer.add_listener(ranking_response_cache.bump)
+ranking_writer.add_flush_listener(ranking_response_cache.bump)
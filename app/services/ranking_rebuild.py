@@ -0,0 +1,367 @@
+"""
+Reconstrução do ranking semanal a partir dos checkins - Boas práticas Python aplicadas.
+Recalcula `weekly_rankings` no servidor (aggregation + $merge), particionado por semana.
+
+Só semanas encerradas (fora do prazo de checkins em lote) são gravadas: numa semana que
+ainda recebe checkins, o $merge sobrescreveria os $inc feitos durante a reconstrução.
+"""
+import asyncio
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.core import config
+from app.db.database import checkin_collection, ranking_collection, snapshot_collection
+from app.services.all_time_totals import AllTimeTotalsService
+from app.services.leaderboard import leaderboard
+from app.services.ranking_writer import ranking_writer
+from app.utils.constants import POINTS, SAO_PAULO_TZ
+from app.utils.datetime_utils import get_current_date, get_current_datetime, get_week_id
+from app.utils.exceptions import BusinessRuleError, ValidationError
+from app.utils.logging import system_logger
+
+WEEK_ID_PATTERN = re.compile(r"^(\d{4})-W(\d{2})$")
+
+# Limite de linhas de diferença retornadas por semana no modo dry-run
+MAX_DIFF_ROWS_PER_WEEK = 100
+
+# Estado da última reconstrução (consultado pelo endpoint de progresso)
+rebuild_status: Dict[str, Any] = {
+    "running": False,
+    "dry_run": None,
+    "total_weeks": 0,
+    "completed_weeks": 0,
+    "failed_weeks": [],
+    "started_at": None,
+    "finished_at": None
+}
+
+
+class RankingRebuildService:
+    """Serviço responsável por recalcular o ranking semanal a partir dos checkins."""
+
+    @staticmethod
+    def week_bounds(week_id: str) -> tuple:
+        """
+        Retorna o intervalo [início, fim) da semana ISO em São Paulo.
+
+        Raises:
+            ValidationError: week_id fora do formato YYYY-WNN
+        """
+        match = WEEK_ID_PATTERN.match(week_id)
+        if not match:
+            raise ValidationError(
+                message=f"Semana inválida: {week_id}",
+                error_code="INVALID_WEEK_ID",
+                details={"week_id": week_id}
+            )
+
+        try:
+            monday = date.fromisocalendar(int(match.group(1)), int(match.group(2)), 1)
+        except ValueError as e:
+            raise ValidationError(
+                message=f"Semana inválida: {week_id}",
+                error_code="INVALID_WEEK_ID",
+                details={"week_id": week_id}
+            ) from e
+
+        start = datetime.combine(monday, datetime.min.time()).replace(tzinfo=SAO_PAULO_TZ)
+        return start, start + timedelta(days=7)
+
+    @staticmethod
+    def is_final(week_id: str, now: Optional[datetime] = None) -> bool:
+        """Semana encerrada e fora do prazo de checkins em lote (não recebe mais pontos)."""
+        _, end = RankingRebuildService.week_bounds(week_id)
+        now = now or get_current_datetime()
+        return now >= end + timedelta(days=config.BATCH_CHECKIN_MAX_AGE_DAYS)
+
+    @staticmethod
+    def build_pipeline(week_id: str) -> List[Dict]:
+        """
+        Monta o pipeline que recalcula o ranking de uma semana.
+
+        Checkins antigos (anteriores ao registro de `points` no documento) recebem os
+        pontos pela regra original: primeiro checkin do dia (entre todos os usuários) ou
+        regular, mais o bônus de streak quando o checkin anterior do usuário na mesma
+        semana foi no dia anterior. Use o dry-run para avaliar o impacto antes de aplicar.
+        """
+        start, end = RankingRebuildService.week_bounds(week_id)
+
+        return [
+            {"$match": {"timestamp": {"$gte": start, "$lt": end}}},
+            {"$set": {"day": {"$ifNull": [
+                "$checkin_day",
+                {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp", "timezone": "-03:00"}}
+            ]}}},
+            # Posição do checkin no dia e dia do checkin anterior do usuário (regra original)
+            {"$setWindowFields": {
+                "partitionBy": "$day",
+                "sortBy": {"timestamp": 1},
+                "output": {"position_in_day": {"$documentNumber": {}}}
+            }},
+            {"$setWindowFields": {
+                "partitionBy": "$user_id",
+                "sortBy": {"timestamp": 1},
+                "output": {"previous_day": {"$shift": {"output": "$day", "by": -1, "default": None}}}
+            }},
+            {"$set": {"legacy_points": {"$add": [
+                {"$cond": [
+                    {"$eq": ["$position_in_day", 1]},
+                    POINTS['FIRST_CHECKIN_OF_DAY'],
+                    POINTS['REGULAR_CHECKIN']
+                ]},
+                {"$cond": [
+                    {"$eq": ["$previous_day", {"$dateToString": {
+                        "format": "%Y-%m-%d",
+                        "date": {"$dateSubtract": {"startDate": "$timestamp", "unit": "day", "amount": 1}},
+                        "timezone": "-03:00"
+                    }}]},
+                    POINTS['STREAK_BONUS'],
+                    0
+                ]}
+            ]}}},
+            {"$sort": {"timestamp": 1}},
+            {"$group": {
+                "_id": "$user_id",
+                "points": {"$sum": {"$ifNull": ["$points", "$legacy_points"]}},
+                "username": {"$last": "$username"},
+                "last_checkin_date": {"$max": "$day"},
+                "updated_at": {"$max": "$timestamp"}
+            }},
+            {"$project": {
+                "_id": 0,
+                "user_id": "$_id",
+                "week_id": {"$literal": week_id},
+                "points": 1,
+                "username": 1,
+                "last_checkin_date": 1,
+                "updated_at": 1
+            }}
+        ]
+
+    @staticmethod
+    async def list_weeks() -> List[str]:
+        """Lista todas as semanas do primeiro checkin registrado até a semana atual."""
+        first_checkin = await checkin_collection.find_one(
+            {}, {"timestamp": 1}, sort=[("timestamp", 1)]
+        )
+        if not first_checkin:
+            return []
+
+        first_day = first_checkin["timestamp"].date()
+        monday = first_day - timedelta(days=first_day.weekday())
+        today = get_current_date()
+
+        weeks = []
+        while monday <= today:
+            weeks.append(get_week_id(monday))
+            monday += timedelta(days=7)
+        return weeks
+
+    @staticmethod
+    async def rebuild_week(week_id: str, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Recalcula o ranking de uma semana.
+
+        Args:
+            week_id: Semana no formato YYYY-WNN
+            dry_run: Apenas compara com o ranking atual, sem gravar
+
+        Returns:
+            Dict com o resumo (e as diferenças, no dry-run) da semana
+        """
+        pipeline = RankingRebuildService.build_pipeline(week_id)
+
+        if not dry_run:
+            started_at = get_current_datetime()
+            pipeline.append({"$merge": {
+                "into": ranking_collection.name,
+                "on": ["user_id", "week_id"],
+                "whenMatched": "merge",
+                "whenNotMatched": "insert"
+            }})
+            await checkin_collection.aggregate(pipeline).to_list(length=None)
+
+            # Órfãos: usuários sem checkin na semana (documentos atualizados durante a
+            # reconstrução, por checkins novos, são mantidos)
+            start, end = RankingRebuildService.week_bounds(week_id)
+            user_ids = await checkin_collection.distinct(
+                "user_id", {"timestamp": {"$gte": start, "$lt": end}}
+            )
+            await ranking_collection.delete_many({
+                "week_id": week_id,
+                "user_id": {"$nin": user_ids},
+                "updated_at": {"$not": {"$gte": started_at}}
+            })
+            # Snapshot congelado ficou desatualizado: a semana é congelada de novo na próxima consulta
+            await snapshot_collection.delete_one({"_id": week_id})
+            rebuilt = await ranking_collection.count_documents({"week_id": week_id})
+            return {"week_id": week_id, "rankings": rebuilt}
+
+        computed = {
+            entry["user_id"]: entry
+            for entry in await checkin_collection.aggregate(pipeline).to_list(length=None)
+        }
+        current = {
+            entry["user_id"]: entry
+            async for entry in ranking_collection.find(
+                {"week_id": week_id}, {"user_id": 1, "username": 1, "points": 1}
+            )
+        }
+
+        diff = []
+        changed = missing = orphaned = 0
+        for user_id, entry in computed.items():
+            existing = current.get(user_id)
+            if existing is None:
+                missing += 1
+            elif existing.get("points") != entry["points"]:
+                changed += 1
+            else:
+                continue
+            if len(diff) < MAX_DIFF_ROWS_PER_WEEK:
+                diff.append({
+                    "username": entry["username"],
+                    "current_points": existing.get("points") if existing else None,
+                    "rebuilt_points": entry["points"]
+                })
+
+        for user_id, existing in current.items():
+            if user_id not in computed:
+                orphaned += 1
+                if len(diff) < MAX_DIFF_ROWS_PER_WEEK:
+                    diff.append({
+                        "username": existing.get("username"),
+                        "current_points": existing.get("points"),
+                        "rebuilt_points": None
+                    })
+
+        return {
+            "week_id": week_id,
+            "rankings": len(computed),
+            "changed": changed,
+            "missing": missing,
+            "orphaned": orphaned,
+            "diff": diff
+        }
+
+    @staticmethod
+    async def rebuild(
+        week_ids: Optional[List[str]] = None,
+        dry_run: bool = True,
+        concurrency: int = 4
+    ) -> Dict[str, Any]:
+        """
+        Recalcula o ranking de várias semanas em paralelo.
+
+        Args:
+            week_ids: Semanas a recalcular (None = todo o histórico)
+            dry_run: Apenas compara com o ranking atual, sem gravar
+            concurrency: Quantidade de semanas processadas ao mesmo tempo
+
+        Returns:
+            Dict com o resumo por semana
+
+        Raises:
+            ValidationError: Semana fora do formato YYYY-WNN
+            BusinessRuleError: Já existe uma reconstrução em andamento, ou alguma semana
+                pedida ainda recebe checkins (só no modo de gravação)
+        """
+        for week_id in week_ids or []:
+            RankingRebuildService.week_bounds(week_id)  # valida o formato
+
+        if not dry_run:
+            open_weeks = [
+                week_id for week_id in week_ids or [] if not RankingRebuildService.is_final(week_id)
+            ]
+            if open_weeks:
+                raise BusinessRuleError(
+                    message="Semana ainda recebe checkins: reconstrua depois do prazo de checkins em lote",
+                    error_code="RANKING_WEEK_OPEN",
+                    details={"week_ids": open_weeks}
+                )
+
+        # Verificado e marcado antes de qualquer await: impede duas reconstruções simultâneas
+        if rebuild_status["running"]:
+            raise BusinessRuleError(
+                message="Já existe uma reconstrução de ranking em andamento",
+                error_code="RANKING_REBUILD_RUNNING",
+                details={"started_at": rebuild_status["started_at"]}
+            )
+        skipped_weeks: List[str] = []
+        rebuild_status.update({
+            "running": True,
+            "dry_run": dry_run,
+            "total_weeks": len(week_ids or []),
+            "completed_weeks": 0,
+            "failed_weeks": [],
+            "started_at": get_current_datetime().isoformat(),
+            "finished_at": None
+        })
+
+        try:
+            if not week_ids:
+                week_ids = await RankingRebuildService.list_weeks()
+                if not dry_run:
+                    # Semanas abertas ficam de fora da gravação (ver docstring do módulo)
+                    skipped_weeks = [
+                        week_id for week_id in week_ids if not RankingRebuildService.is_final(week_id)
+                    ]
+                    week_ids = [week_id for week_id in week_ids if week_id not in skipped_weeks]
+                rebuild_status["total_weeks"] = len(week_ids)
+
+            # Deltas ainda em memória (write-behind) precisam estar no banco antes da comparação
+            await ranking_writer.flush()
+        except Exception:
+            rebuild_status["running"] = False
+            rebuild_status["finished_at"] = get_current_datetime().isoformat()
+            raise
+
+        system_logger.info(
+            "🔁 Reconstrução de ranking iniciada",
+            {"weeks": len(week_ids), "dry_run": dry_run, "concurrency": concurrency}
+        )
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_week(week_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await RankingRebuildService.rebuild_week(week_id, dry_run)
+                except Exception as e:
+                    rebuild_status["failed_weeks"].append(week_id)
+                    system_logger.error(
+                        "Erro ao reconstruir semana",
+                        error=e,
+                        context={"week_id": week_id}
+                    )
+                    return {"week_id": week_id, "error": str(e)}
+
+                rebuild_status["completed_weeks"] += 1
+                system_logger.info(
+                    "📊 Progresso da reconstrução",
+                    {
+                        "week_id": week_id,
+                        "completed": rebuild_status["completed_weeks"],
+                        "total": rebuild_status["total_weeks"]
+                    }
+                )
+                return result
+
+        try:
+            weeks = await asyncio.gather(*(run_week(week_id) for week_id in week_ids))
+            if not dry_run:
+                # Derivados do ranking semanal refletem o estado anterior: recalcular
+                await AllTimeTotalsService.backfill()
+                await leaderboard.reload_all()
+        finally:
+            rebuild_status["running"] = False
+            rebuild_status["finished_at"] = get_current_datetime().isoformat()
+
+        return {
+            "dry_run": dry_run,
+            "total_weeks": len(week_ids),
+            "failed_weeks": list(rebuild_status["failed_weeks"]),
+            "skipped_weeks": skipped_weeks,
+            "weeks": weeks
+        }
@@ -0,0 +1,241 @@
+"""
+Snapshots congelados do ranking semanal - Boas práticas Python aplicadas.
+Ao fim da semana, o ranking vira um único documento em `ranking_snapshots` (_id = week_id)
+com o array ordenado e as estatísticas; o histórico é lido com um documento por semana.
+
+Uma semana só é congelada depois do prazo de checkins em lote (BATCH_CHECKIN_MAX_AGE_DAYS),
+pois até lá ainda pode receber pontos.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.core import config
+from app.db.database import ranking_collection, snapshot_collection
+from app.services.leaderboard import leaderboard
+from app.services.ranking_rebuild import RankingRebuildService
+from app.services.ranking_writer import ranking_writer
+from app.utils.datetime_utils import get_current_datetime, get_week_id
+from app.utils.exceptions import BusinessRuleError, ValidationError
+from app.utils.logging import system_logger
+
+# Limite de semanas retornadas pelo endpoint de histórico
+MAX_HISTORY_WEEKS = 52
+
+
+class RankingSnapshotService:
+    """Serviço responsável por congelar e consultar o ranking de semanas encerradas."""
+
+    @staticmethod
+    def is_final(week_id: str, now: Optional[datetime] = None) -> bool:
+        """Semana encerrada e fora do prazo de checkins em lote (não recebe mais pontos)."""
+        return RankingRebuildService.is_final(week_id, now)
+
+    @staticmethod
+    async def build(week_id: str) -> Dict[str, Any]:
+        """Monta o snapshot da semana a partir de `weekly_rankings` (sem gravar)."""
+        entries = await ranking_collection.find(
+            {"week_id": week_id},
+            {"_id": 0, "user_id": 1, "username": 1, "points": 1}
+        ).sort([("points", DESCENDING), ("username", ASCENDING)]).to_list(length=None)
+        return RankingSnapshotService._from_entries(week_id, entries)
+
+    @staticmethod
+    async def build_live(week_id: str) -> Dict[str, Any]:
+        """
+        Monta o snapshot de uma semana aberta a partir do ranking em memória, que já
+        inclui os deltas ainda não gravados (write-behind) - sem descarregar o buffer.
+        """
+        board = await leaderboard.get_board(week_id)
+        entries = sorted(
+            (
+                {"user_id": user_id, "username": username, "points": -negative_points}
+                for user_id, (negative_points, username) in board.snapshot().items()
+            ),
+            key=lambda entry: (-entry["points"], entry["username"])
+        )
+        return RankingSnapshotService._from_entries(week_id, entries)
+
+    @staticmethod
+    def _from_entries(week_id: str, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Monta o snapshot a partir das entradas já ordenadas (pontos desc, username).
+
+        Empates dividem a posição (1, 1, 3), como no histograma do ranking em memória.
+        """
+        start, end = RankingRebuildService.week_bounds(week_id)
+
+        ranking = []
+        for index, entry in enumerate(entries):
+            if index and entry["points"] == entries[index - 1]["points"]:
+                position = ranking[-1]["position"]
+            else:
+                position = index + 1
+            ranking.append({
+                "position": position,
+                "user_id": entry["user_id"],
+                "username": entry["username"],
+                "points": entry["points"]
+            })
+
+        total_points = sum(entry["points"] for entry in ranking)
+        return {
+            "_id": week_id,
+            "week_id": week_id,
+            "start_date": start.date().isoformat(),
+            "end_date": (end - timedelta(days=1)).date().isoformat(),
+            "total_participants": len(ranking),
+            "total_points": total_points,
+            "max_points": ranking[0]["points"] if ranking else 0,
+            "average_points": round(total_points / len(ranking), 2) if ranking else 0.0,
+            "ranking": ranking
+        }
+
+    @staticmethod
+    async def close_week(week_id: str, compact: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Congela o ranking de uma semana encerrada em um único documento.
+
+        Args:
+            week_id: Semana no formato YYYY-WNN
+            compact: Remove os documentos por usuário de `weekly_rankings` após congelar
+                     (padrão: RANKING_SNAPSHOT_COMPACT)
+
+        Returns:
+            Dict com o snapshot gravado
+
+        Raises:
+            ValidationError: Semana inválida ou ainda aberta a checkins
+            BusinessRuleError: Semana já compactada (os documentos por usuário não existem
+                               mais; reconstrua o ranking da semana antes de congelar de novo)
+        """
+        if not RankingSnapshotService.is_final(week_id):
+            raise ValidationError(
+                message=f"Semana ainda aberta a checkins: {week_id}",
+                error_code="WEEK_NOT_CLOSED",
+                details={"week_id": week_id}
+            )
+
+        existing = await snapshot_collection.find_one({"_id": week_id}, {"compacted": 1})
+        if existing is not None and existing.get("compacted"):
+            raise BusinessRuleError(
+                message=f"Semana já compactada: {week_id} - reconstrua o ranking antes de congelar de novo",
+                error_code="WEEK_ALREADY_COMPACTED",
+                details={"week_id": week_id}
+            )
+        if compact is None:
+            compact = config.RANKING_SNAPSHOT_COMPACT
+
+        # Deltas ainda em memória (write-behind) precisam estar no banco antes de congelar
+        await ranking_writer.flush()
+
+        snapshot = await RankingSnapshotService.build(week_id)
+        snapshot["closed_at"] = get_current_datetime()
+        snapshot["compacted"] = compact
+        await snapshot_collection.replace_one({"_id": week_id}, snapshot, upsert=True)
+
+        removed = 0
+        if compact:
+            result = await ranking_collection.delete_many({"week_id": week_id})
+            removed = result.deleted_count
+
+        system_logger.info(
+            "🧊 Ranking semanal congelado",
+            {
+                "week_id": week_id,
+                "participants": snapshot["total_participants"],
+                "compacted_rankings": removed
+            }
+        )
+        return snapshot
+
+    @staticmethod
+    async def close_final_weeks() -> List[str]:
+        """Congela todas as semanas encerradas que ainda não têm snapshot."""
+        week_ids = await ranking_collection.distinct("week_id")
+        closed = set(await snapshot_collection.distinct("_id"))
+
+        pending = sorted(
+            week_id for week_id in week_ids
+            if week_id not in closed and RankingSnapshotService.is_final(week_id)
+        )
+        for week_id in pending:
+            await RankingSnapshotService.close_week(week_id)
+        return pending
+
+    @staticmethod
+    async def get_week(week_id: str) -> Dict[str, Any]:
+        """
+        Ranking de uma semana: snapshot congelado (um documento) ou, se a semana ainda
+        pode receber pontos, montado a partir do ranking em memória.
+
+        Semanas encerradas sem snapshot são congeladas na primeira consulta.
+
+        Raises:
+            ValidationError: Semana inválida ou futura
+        """
+        if week_id > get_week_id():
+            RankingRebuildService.week_bounds(week_id)  # valida o formato antes de recusar
+            raise ValidationError(
+                message=f"Semana futura: {week_id}",
+                error_code="FUTURE_WEEK",
+                details={"week_id": week_id}
+            )
+
+        snapshot = await snapshot_collection.find_one({"_id": week_id})
+        if snapshot is not None:
+            snapshot["frozen"] = True
+            return snapshot
+
+        final = RankingSnapshotService.is_final(week_id)
+        # Semanas sem nenhum ranking não geram snapshot (evita gravar semanas arbitrárias)
+        if final and await ranking_collection.find_one({"week_id": week_id}, {"_id": 1}):
+            snapshot = await RankingSnapshotService.close_week(week_id)
+        elif final:
+            snapshot = await RankingSnapshotService.build(week_id)
+            snapshot["closed_at"] = None
+        else:
+            snapshot = await RankingSnapshotService.build_live(week_id)
+            snapshot["closed_at"] = None
+
+        snapshot["frozen"] = final
+        return snapshot
+
+    @staticmethod
+    async def history(
+        from_week: Optional[str] = None,
+        to_week: Optional[str] = None,
+        limit: int = 12,
+        include_ranking: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Semanas congeladas no intervalo, da mais recente para a mais antiga.
+
+        Args:
+            from_week: Primeira semana (inclusive)
+            to_week: Última semana (inclusive)
+            limit: Quantidade máxima de semanas
+            include_ranking: Inclui o array completo do ranking de cada semana
+
+        Raises:
+            ValidationError: Semana inválida
+        """
+        query: Dict[str, Any] = {}
+        if from_week:
+            RankingRebuildService.week_bounds(from_week)
+            query.setdefault("_id", {})["$gte"] = from_week
+        if to_week:
+            RankingRebuildService.week_bounds(to_week)
+            query.setdefault("_id", {})["$lte"] = to_week
+
+        # week_id (YYYY-WNN) ordena cronologicamente como texto: range direto no _id
+        projection = None if include_ranking else {"ranking": 0}
+        limit = max(1, min(limit, MAX_HISTORY_WEEKS))
+        snapshots = await snapshot_collection.find(query, projection).sort(
+            "_id", DESCENDING
+        ).limit(limit).to_list(length=limit)
+
+        for snapshot in snapshots:
+            snapshot["frozen"] = True
+        return snapshots
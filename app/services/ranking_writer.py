@@ -0,0 +1,491 @@
+"""
+Gravação de atualizações do ranking semanal - Boas práticas Python aplicadas.
+Ponto único de escrita do estado derivado dos checkins (`weekly_rankings` e `all_time_totals`):
+grava direto ou, no modo write-behind, agrupa os deltas por (user_id, week_id) em memória e
+descarrega em lote. O streak não passa por aqui: fica no próprio documento do checkin.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core import config
+from app.db.database import (
+    all_time_collection, checkin_collection, ranking_collection
+)
+from app.utils.datetime_utils import get_current_datetime
+from app.utils.exceptions import DatabaseError
+from app.utils.logging import checkin_logger, system_logger
+
+RankingKey = Tuple[ObjectId, str]
+
+
+class RankingWriter:
+    """Aplica deltas de pontuação ao ranking semanal (direto ou write-behind)."""
+
+    def __init__(
+        self,
+        write_behind: bool = False,
+        flush_interval_ms: int = 500,
+        flush_max_ops: int = 200,
+        max_pending_ops: int = 5000,
+        replay_grace_seconds: float = 120
+    ):
+        """
+        Args:
+            write_behind: Agrupar os deltas em memória em vez de gravar por requisição
+            flush_interval_ms: Intervalo máximo entre descargas no modo write-behind
+            flush_max_ops: Quantidade de deltas que antecipa a descarga
+            max_pending_ops: Limite de deltas pendentes (acima dele o chamador aguarda a descarga)
+            replay_grace_seconds: Idade mínima de um checkin pendente para ser reaplicado
+        """
+        self.write_behind = write_behind
+        self.flush_interval = max(10, int(flush_interval_ms)) / 1000
+        self.flush_max_ops = max(1, int(flush_max_ops))
+        self.max_pending_ops = max(self.flush_max_ops, int(max_pending_ops))
+        # Nunca menor que algumas descargas: checkins recentes ainda estão no buffer de algum worker
+        self.replay_grace = timedelta(seconds=max(float(replay_grace_seconds), 10 * self.flush_interval))
+
+        self._pending: Dict[RankingKey, Dict[str, Any]] = {}
+        self._pending_ops = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._flush_listeners: List[Callable[[int], None]] = []
+        # Pausa das gravações (backfill do total geral): gravações em andamento terminam antes
+        self._write_gate = asyncio.Condition()
+        self._paused = False
+        self._active_writes = 0
+
+        self.recorded_ops = 0
+        self.flushes = 0
+        self.flushed_ops = 0
+        self.flushed_documents = 0
+        self.failed_flushes = 0
+        self.backpressure_waits = 0
+        self.replayed_checkins = 0
+        self.last_flush_duration_ms = 0.0
+        self.failed_total_writes = 0
+        self.pauses = 0
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Registra um callback chamado (de forma síncrona) com os deltas aplicados."""
+        self._listeners.append(listener)
+
+    def add_flush_listener(self, listener: Callable[[int], None]) -> None:
+        """Registra um callback chamado após cada descarga bem-sucedida (write-behind)."""
+        self._flush_listeners.append(listener)
+
+    def _notify(self, deltas: List[Dict[str, Any]]) -> None:
+        """Repassa os deltas para os listeners sem deixar um erro derrubar a escrita."""
+        for listener in self._listeners:
+            try:
+                listener(deltas)
+            except Exception as e:
+                system_logger.error(
+                    "Erro em listener do ranking",
+                    error=e,
+                    context={"listener": getattr(listener, "__qualname__", repr(listener))}
+                )
+
+    @staticmethod
+    def build_delta(
+        user_id: ObjectId,
+        username: str,
+        week_id: str,
+        points: int,
+        last_checkin_date: str,
+        updated_at: Optional[datetime] = None,
+        checkin_id: Optional[ObjectId] = None
+    ) -> Dict[str, Any]:
+        """Monta o delta de um checkin no formato aceito por `record_many`."""
+        return {
+            "user_id": user_id,
+            "username": username,
+            "week_id": week_id,
+            "points": points,
+            "last_checkin_date": last_checkin_date,
+            "updated_at": updated_at or get_current_datetime(),
+            "checkin_ids": [checkin_id] if checkin_id is not None else [],
+            "checkins": 1
+        }
+
+    @staticmethod
+    def _to_operation(delta: Dict[str, Any]) -> UpdateOne:
+        """Converte um delta (já agrupado) em operação de upsert."""
+        return UpdateOne(
+            {"user_id": delta["user_id"], "week_id": delta["week_id"]},
+            {
+                "$inc": {"points": delta["points"]},
+                "$max": {"last_checkin_date": delta["last_checkin_date"]},
+                "$set": {"username": delta["username"], "updated_at": delta["updated_at"]}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    def _to_total_operations(deltas: List[Dict[str, Any]]) -> List[UpdateOne]:
+        """Converte deltas (de qualquer semana) em upserts do total geral por usuário."""
+        totals: Dict[ObjectId, Dict[str, Any]] = {}
+        for delta in deltas:
+            total = totals.setdefault(delta["user_id"], {"points": 0})
+            total["points"] += delta["points"]
+            total["username"] = delta["username"]
+            total["updated_at"] = max(total.get("updated_at", delta["updated_at"]), delta["updated_at"])
+
+        return [
+            UpdateOne(
+                {"_id": user_id},
+                {
+                    "$inc": {"points": total["points"]},
+                    "$set": {"username": total["username"], "updated_at": total["updated_at"]}
+                },
+                upsert=True
+            )
+            for user_id, total in totals.items()
+        ]
+
+    @asynccontextmanager
+    async def paused(self) -> AsyncIterator[None]:
+        """
+        Suspende as gravações no ranking semanal e no total geral enquanto o bloco executa.
+
+        Espera as gravações em andamento terminarem; as que começarem durante a pausa
+        aguardam o fim dela (no modo direto o checkin espera; no write-behind os deltas
+        seguem no buffer). Uma pausa por vez.
+        """
+        async with self._write_gate:
+            await self._write_gate.wait_for(lambda: not self._paused)
+            self._paused = True
+            self.pauses += 1
+            await self._write_gate.wait_for(lambda: self._active_writes == 0)
+
+        try:
+            yield
+        finally:
+            async with self._write_gate:
+                self._paused = False
+                self._write_gate.notify_all()
+
+    async def _write(self, deltas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Grava deltas já agrupados no ranking semanal e, em seguida, no total geral
+        (aguardando o fim de uma pausa, se houver).
+
+        Returns:
+            Deltas cuja operação no ranking semanal falhou (não aplicados em nenhuma coleção)
+        """
+        async with self._write_gate:
+            await self._write_gate.wait_for(lambda: not self._paused)
+            self._active_writes += 1
+
+        try:
+            return await self._write_unpaused(deltas)
+        finally:
+            async with self._write_gate:
+                self._active_writes -= 1
+                self._write_gate.notify_all()
+
+    async def _write_unpaused(self, deltas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Corpo de `_write`: ranking semanal e depois total geral."""
+        failed_deltas = []
+        try:
+            await ranking_collection.bulk_write(
+                [self._to_operation(delta) for delta in deltas],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            # Escrita não ordenada: só as operações em writeErrors falharam, as demais já valem
+            failed_positions = {error["index"] for error in e.details.get("writeErrors", [])}
+            if e.details.get("writeConcernErrors"):
+                system_logger.warning(
+                    "Write concern não confirmado ao gravar ranking",
+                    {"errors": len(e.details["writeConcernErrors"])}
+                )
+            failed_deltas = [delta for position, delta in enumerate(deltas) if position in failed_positions]
+            deltas = [delta for position, delta in enumerate(deltas) if position not in failed_positions]
+            if not deltas:
+                return failed_deltas
+
+        try:
+            await all_time_collection.bulk_write(self._to_total_operations(deltas), ordered=False)
+        except Exception as e:
+            # Total geral é derivado do ranking semanal: o backfill corrige a divergência
+            self.failed_total_writes += 1
+            system_logger.error(
+                "Erro ao atualizar total geral - execute o backfill de all_time_totals",
+                error=e
+            )
+
+        return failed_deltas
+
+    @staticmethod
+    def _merge_into(target: Dict[RankingKey, Dict[str, Any]], delta: Dict[str, Any]) -> None:
+        """Agrupa o delta em `target` por (user_id, week_id)."""
+        key = (delta["user_id"], delta["week_id"])
+        pending = target.get(key)
+        if pending is None:
+            target[key] = {**delta, "checkin_ids": list(delta["checkin_ids"])}
+            return
+
+        pending["points"] += delta["points"]
+        pending["last_checkin_date"] = max(pending["last_checkin_date"], delta["last_checkin_date"])
+        pending["username"] = delta["username"]
+        pending["updated_at"] = max(pending["updated_at"], delta["updated_at"])
+        pending["checkin_ids"].extend(delta["checkin_ids"])
+        pending["checkins"] += delta["checkins"]
+
+    def _merge(self, delta: Dict[str, Any]) -> None:
+        """Agrupa o delta no buffer de pendências do modo write-behind."""
+        self._merge_into(self._pending, delta)
+
+    def pending_deltas(self, week_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Deltas (da semana, ou de todas) ainda não gravados no banco (modo write-behind)."""
+        return [
+            delta for delta in self._pending.values()
+            if week_id is None or delta["week_id"] == week_id
+        ]
+
+    async def record(self, delta: Dict[str, Any]) -> None:
+        """Registra um delta de ranking (ver `record_many`)."""
+        await self.record_many([delta])
+
+    async def record_many(self, deltas: List[Dict[str, Any]]) -> None:
+        """
+        Registra deltas de ranking.
+
+        No modo direto grava imediatamente (um bulk_write). No modo write-behind
+        apenas agrupa em memória; se o buffer estiver cheio, aguarda uma descarga.
+        """
+        if not deltas:
+            return
+
+        self.recorded_ops += len(deltas)
+
+        if not self.write_behind:
+            coalesced: Dict[RankingKey, Dict[str, Any]] = {}
+            for delta in deltas:
+                self._merge_into(coalesced, delta)
+            failed_deltas = await self._write(list(coalesced.values()))
+            failed_keys = {(delta["user_id"], delta["week_id"]) for delta in failed_deltas}
+            self._notify([
+                delta for delta in deltas if (delta["user_id"], delta["week_id"]) not in failed_keys
+            ])
+            if failed_deltas:
+                raise DatabaseError(
+                    message="Erro ao atualizar o ranking",
+                    error_code="RANKING_WRITE_ERROR",
+                    details={"failed": len(failed_deltas), "total": len(coalesced)}
+                )
+            return
+
+        if self._pending_ops + len(deltas) > self.max_pending_ops:
+            # Backpressure: o produtor espera a descarga em vez de crescer sem limite
+            self.backpressure_waits += 1
+            await self.flush()
+
+        for delta in deltas:
+            self._merge(delta)
+        self._pending_ops += len(deltas)
+        self._notify(deltas)
+
+        if self._pending_ops >= self.flush_max_ops:
+            self._flush_requested.set()
+
+    async def flush(self) -> int:
+        """
+        Descarrega os deltas pendentes com um único bulk_write.
+
+        Returns:
+            Quantidade de documentos de ranking atualizados
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            ops_count, self._pending_ops = self._pending_ops, 0
+            start_time = time.perf_counter()
+
+            try:
+                failed_deltas = await self._write(list(batch.values()))
+            except Exception:
+                # Devolver ao buffer para nova tentativa na próxima descarga
+                self.failed_flushes += 1
+                for delta in batch.values():
+                    self._merge(delta)
+                self._pending_ops += ops_count
+                raise
+
+            # Falha parcial: só os deltas com erro voltam ao buffer (os demais já foram aplicados)
+            failed_ops = 0
+            for delta in failed_deltas:
+                self._merge(delta)
+                failed_ops += delta["checkins"]
+            self._pending_ops += failed_ops
+            failed_keys = {(delta["user_id"], delta["week_id"]) for delta in failed_deltas}
+            applied = [delta for key, delta in batch.items() if key not in failed_keys]
+
+            # Marcar os checkins como aplicados ao ranking (base do replay após falhas)
+            checkin_ids = [
+                checkin_id for delta in applied for checkin_id in delta["checkin_ids"]
+            ]
+            if checkin_ids:
+                await checkin_collection.update_many(
+                    {"_id": {"$in": checkin_ids}},
+                    {"$unset": {"ranking_pending": ""}}
+                )
+
+            self.flushes += 1
+            self.flushed_ops += ops_count - failed_ops
+            self.flushed_documents += len(applied)
+            self.last_flush_duration_ms = (time.perf_counter() - start_time) * 1000
+
+            checkin_logger.database_operation(
+                operation="flush_ranking",
+                collection="rankings",
+                success=not failed_deltas,
+                duration_ms=self.last_flush_duration_ms
+            )
+
+            if applied:
+                for listener in self._flush_listeners:
+                    try:
+                        listener(len(applied))
+                    except Exception as e:
+                        system_logger.error("Erro em listener de descarga do ranking", error=e)
+
+            if failed_deltas:
+                self.failed_flushes += 1
+                raise DatabaseError(
+                    message="Erro ao descarregar o ranking pendente",
+                    error_code="RANKING_FLUSH_ERROR",
+                    details={"failed": len(failed_deltas), "applied": len(applied)}
+                )
+
+            return len(applied)
+
+    async def _run(self) -> None:
+        """Loop de descarga periódica do modo write-behind."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                system_logger.error("Erro ao descarregar ranking pendente", error=e)
+
+    def start(self) -> None:
+        """Inicia o loop de descarga (apenas no modo write-behind)."""
+        if self.write_behind and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para o loop de descarga e grava tudo o que estiver pendente."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+
+    async def replay_pending(self) -> int:
+        """
+        Reaplica checkins gravados no modo write-behind cujo delta não chegou ao ranking
+        (ex.: processo encerrado antes da descarga). Roda com a aplicação atendendo.
+
+        Só entram checkins inseridos há mais de `replay_grace` (pela data do ObjectId, não
+        pelo horário do checkin, que no lote vem do cliente): os mais novos ainda podem estar
+        no buffer deste ou de outro worker. Os que estão no buffer deste processo são
+        ignorados; a busca roda sob a trava de descarga para não cruzar com uma descarga.
+
+        A garantia é de pelo menos uma vez: uma queda entre o bulk_write do ranking e a
+        marcação dos checkins, ou um worker que não consegue descarregar por mais que
+        `replay_grace`, pode reaplicar esses pontos (o rebuild de rankings corrige).
+
+        Returns:
+            Quantidade de checkins reaplicados
+        """
+        cutoff = ObjectId.from_datetime(get_current_datetime() - self.replay_grace)
+
+        async with self._flush_lock:
+            queued = {
+                checkin_id for delta in self._pending.values() for checkin_id in delta["checkin_ids"]
+            }
+            deltas = [
+                self.build_delta(
+                    user_id=checkin["user_id"],
+                    username=checkin["username"],
+                    week_id=checkin["week_id"],
+                    points=checkin["points"],
+                    last_checkin_date=checkin["checkin_day"],
+                    checkin_id=checkin["_id"]
+                )
+                async for checkin in checkin_collection.find(
+                    {"ranking_pending": True, "_id": {"$lt": cutoff}},
+                    {"user_id": 1, "username": 1, "week_id": 1, "points": 1, "checkin_day": 1}
+                )
+                if checkin["_id"] not in queued
+            ]
+
+            if not deltas:
+                return 0
+
+            for delta in deltas:
+                self._merge(delta)
+            self._pending_ops += len(deltas)
+
+        await self.flush()
+
+        self.replayed_checkins += len(deltas)
+        system_logger.info(
+            "♻️ Checkins pendentes reaplicados ao ranking",
+            {"checkins": len(deltas)}
+        )
+        return len(deltas)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna as métricas do gravador de ranking."""
+        return {
+            "write_behind": self.write_behind,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "flush_max_ops": self.flush_max_ops,
+            "max_pending_ops": self.max_pending_ops,
+            "pending_ops": self._pending_ops,
+            "pending_documents": len(self._pending),
+            "recorded_ops": self.recorded_ops,
+            "flushes": self.flushes,
+            "flushed_ops": self.flushed_ops,
+            "flushed_documents": self.flushed_documents,
+            "failed_flushes": self.failed_flushes,
+            "backpressure_waits": self.backpressure_waits,
+            "replayed_checkins": self.replayed_checkins,
+            "replay_grace_seconds": self.replay_grace.total_seconds(),
+            "failed_total_writes": self.failed_total_writes,
+            "paused": self._paused,
+            "pauses": self.pauses,
+            "last_flush_duration_ms": round(self.last_flush_duration_ms, 2)
+        }
+
+
+# Instância global do gravador de ranking
+ranking_writer = RankingWriter(
+    write_behind=config.RANKING_WRITE_BEHIND,
+    flush_interval_ms=config.RANKING_FLUSH_INTERVAL_MS,
+    flush_max_ops=config.RANKING_FLUSH_MAX_OPS,
+    max_pending_ops=config.RANKING_MAX_PENDING_OPS,
+    replay_grace_seconds=config.RANKING_REPLAY_GRACE_SECONDS
+)
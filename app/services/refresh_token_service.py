@@ -0,0 +1,139 @@
+"""
+Service layer para refresh tokens - Boas práticas Python aplicadas.
+Permite renovar o token de acesso sem repetir a verificação bcrypt do login.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+from jose import JWTError, jwt
+
+from app.core import config
+from app.db.database import refresh_token_collection
+from app.utils.exceptions import AuthenticationError, DatabaseError
+from app.utils.logging import auth_logger
+
+REFRESH_TOKEN_TYPE = "refresh"
+
+
+def _hash_token_id(token_id: str) -> str:
+    """Hash do identificador do refresh token (o valor em claro nunca é armazenado)."""
+    return hashlib.sha256(token_id.encode()).hexdigest()
+
+
+class RefreshTokenService:
+    """Serviço responsável pela emissão e rotação de refresh tokens."""
+
+    @staticmethod
+    async def issue(user: Dict) -> str:
+        """
+        Emite um novo refresh token para o usuário.
+
+        Args:
+            user: Documento do usuário (precisa de `_id` e `username`)
+
+        Returns:
+            Refresh token assinado (JWT)
+
+        Raises:
+            DatabaseError: Erro ao registrar o token
+        """
+        token_id = secrets.token_urlsafe(32)
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(days=config.REFRESH_TOKEN_EXPIRE_DAYS)
+
+        try:
+            await refresh_token_collection.insert_one({
+                "token_hash": _hash_token_id(token_id),
+                "user_id": user["_id"],
+                "username": user["username"],
+                "token_version": int(user.get("token_version", 0)),
+                "created_at": now,
+                "expires_at": expires_at
+            })
+        except Exception as e:
+            raise DatabaseError(
+                message="Erro ao registrar refresh token",
+                error_code="DB_REFRESH_TOKEN_ERROR",
+                details={"username": user["username"]}
+            ) from e
+
+        return jwt.encode(
+            {
+                "sub": user["username"],
+                "jti": token_id,
+                "type": REFRESH_TOKEN_TYPE,
+                "exp": expires_at
+            },
+            config.SECRET_KEY,
+            algorithm=config.ALGORITHM
+        )
+
+    @staticmethod
+    async def rotate(refresh_token: str) -> Tuple[Dict, str]:
+        """
+        Consome o refresh token e emite um novo (rotação).
+
+        Args:
+            refresh_token: Refresh token apresentado pelo cliente
+
+        Returns:
+            Tupla (usuário para as claims do access token, novo refresh token)
+
+        Raises:
+            AuthenticationError: Token inválido, expirado, revogado ou reutilizado
+        """
+        try:
+            payload = jwt.decode(refresh_token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+        except JWTError as e:
+            raise AuthenticationError(
+                message="Refresh token inválido ou expirado",
+                error_code="INVALID_REFRESH_TOKEN"
+            ) from e
+
+        username = payload.get("sub")
+        token_id = payload.get("jti")
+        if payload.get("type") != REFRESH_TOKEN_TYPE or not username or not token_id:
+            raise AuthenticationError(
+                message="Refresh token inválido",
+                error_code="INVALID_REFRESH_TOKEN"
+            )
+
+        # Busca indexada que também invalida o token atual (uso único)
+        stored = await refresh_token_collection.find_one_and_delete(
+            {"token_hash": _hash_token_id(token_id)}
+        )
+
+        if stored is None:
+            # Assinatura válida mas token já consumido: possível reuso de token vazado
+            await RefreshTokenService.revoke_user(username)
+            auth_logger.warning(
+                "Refresh token reutilizado ou revogado - sessões do usuário encerradas",
+                {"username": username}
+            )
+            raise AuthenticationError(
+                message="Refresh token revogado",
+                error_code="REVOKED_REFRESH_TOKEN",
+                details={"username": username}
+            )
+
+        user = {
+            "_id": stored["user_id"],
+            "username": stored["username"],
+            "token_version": stored.get("token_version", 0)
+        }
+
+        new_refresh_token = await RefreshTokenService.issue(user)
+        return user, new_refresh_token
+
+    @staticmethod
+    async def revoke_user(username: str) -> int:
+        """
+        Revoga todos os refresh tokens do usuário (ex.: após reset de senha).
+
+        Returns:
+            Quantidade de tokens revogados
+        """
+        result = await refresh_token_collection.delete_many({"username": username})
+        return result.deleted_count
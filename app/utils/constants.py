@@ -23,6 +23,13 @@ POINTS = {
     'STREAK_BONUS': 2
 }
 
+# Faixas de bônus por streak: (dias úteis consecutivos mínimos, bônus), da maior para a menor
+STREAK_BONUS_TIERS = (
+    (20, 5),
+    (5, 3),
+    (2, POINTS['STREAK_BONUS'])
+)
+
 # Configurações de dias da semana
 WEEKDAYS = {
     'WORKDAYS': list(range(5)),  # 0-4: Segunda a Sexta
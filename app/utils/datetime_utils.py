@@ -1,8 +1,9 @@
 """
 Utilitários para manipulação de datas e tempo.
 """
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
 from app.utils.constants import SAO_PAULO_TZ, WEEKDAYS
+from app.utils.workday_calendar import workday_calendar
 
 
 def get_current_datetime() -> datetime:
@@ -15,6 +16,20 @@ def get_current_date() -> date:
     return get_current_datetime().date()
 
 
+def to_sao_paulo(dt: datetime) -> datetime:
+    """Converte datetime para São Paulo (datetimes sem fuso são tratados como São Paulo)."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=SAO_PAULO_TZ)
+    return dt.astimezone(SAO_PAULO_TZ)
+
+
+def from_database(dt: datetime) -> datetime:
+    """Converte datetime lido do MongoDB (UTC, sem fuso) para São Paulo."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(SAO_PAULO_TZ)
+
+
 def get_start_of_day(target_date: date = None) -> datetime:
     """Retorna o início do dia (00:00:00) para a data especificada."""
     if target_date is None:
@@ -40,8 +55,27 @@ def is_weekend(target_date: date = None) -> bool:
 
 
 def is_workday(target_date: date = None) -> bool:
-    """Verifica se a data é dia útil."""
-    return not is_weekend(target_date)
+    """Verifica se a data é dia útil (não é fim de semana nem feriado)."""
+    if target_date is None:
+        target_date = get_current_date()
+    
+    return workday_calendar.is_workday(target_date)
+
+
+def is_holiday(target_date: date = None) -> bool:
+    """Verifica se a data é feriado em dia de semana."""
+    if target_date is None:
+        target_date = get_current_date()
+    
+    return workday_calendar.is_holiday(target_date)
+
+
+def get_previous_workday(target_date: date = None) -> date:
+    """Retorna o dia útil imediatamente anterior à data (pula fins de semana e feriados)."""
+    if target_date is None:
+        target_date = get_current_date()
+    
+    return workday_calendar.previous_workday(target_date)
 
 
 def get_week_id(target_date: date = None) -> str:
@@ -59,6 +59,18 @@ class WeekendCheckinError(BusinessRuleError):
         )
 
 
+class HolidayCheckinError(WeekendCheckinError):
+    """Tentativa de checkin em feriado (tratada como o fim de semana)."""
+    
+    def __init__(self, date: str):
+        BusinessRuleError.__init__(
+            self,
+            message="Check-ins não são permitidos em feriados",
+            error_code="HOLIDAY_CHECKIN_NOT_ALLOWED",
+            details={"attempted_date": date}
+        )
+
+
 class DuplicateCheckinError(BusinessRuleError):
     """Tentativa de checkin duplicado no mesmo dia."""
     
@@ -89,6 +101,23 @@ class DatabaseError(CheckinBaseException):
     pass
 
 
+class ServiceOverloadedError(CheckinBaseException):
+    """Serviço interno sem capacidade para atender a requisição no momento."""
+    pass
+
+
+class RateLimitExceededError(CheckinBaseException):
+    """Limite de requisições excedido."""
+    
+    def __init__(self, scope: str, retry_after: int = 1):
+        self.retry_after = max(1, int(retry_after))
+        super().__init__(
+            message="Muitas tentativas, aguarde antes de tentar novamente",
+            error_code="RATE_LIMIT_EXCEEDED",
+            details={"scope": scope, "retry_after": self.retry_after}
+        )
+
+
 class ExternalServiceError(CheckinBaseException):
     """Erro em serviço externo."""
     pass
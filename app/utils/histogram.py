@@ -0,0 +1,96 @@
+"""
+Histograma de pontuações para posição e percentil sem ordenação.
+Pontuações são inteiros pequenos e limitados: counts[p] = quantidade de usuários com p pontos,
+com uma árvore de Fenwick sobre o array para somar as faixas em O(log max_points).
+"""
+from typing import Dict, List, Optional
+
+
+class ScoreHistogram:
+    """Contagem de usuários por pontuação, mantida incrementalmente."""
+
+    def __init__(self):
+        self._counts: List[int] = [0]
+        # Árvore de Fenwick (1-based): _tree[i] soma um bloco de _counts terminado em i - 1
+        self._tree: List[int] = [0, 0]
+        self._distinct = 0
+        self.total = 0
+
+    def _grow(self, points: int) -> None:
+        """Dobra a capacidade até caber `points` e reconstrói a árvore em O(capacidade)."""
+        size = len(self._counts)
+        while size <= points:
+            size *= 2
+        self._counts.extend([0] * (size - len(self._counts)))
+        self._tree = [0] + self._counts
+        for index in range(1, size + 1):
+            parent = index + (index & -index)
+            if parent <= size:
+                self._tree[parent] += self._tree[index]
+
+    def _add(self, points: int, amount: int) -> None:
+        """Soma `amount` à contagem de `points` (pontuações negativas contam como zero)."""
+        points = max(0, int(points))
+        if points >= len(self._counts):
+            self._grow(points)
+
+        before = self._counts[points]
+        self._counts[points] = before + amount
+        self._distinct += bool(self._counts[points]) - bool(before)
+
+        index = points + 1
+        while index < len(self._tree):
+            self._tree[index] += amount
+            index += index & -index
+
+    def _at_or_below(self, points: int) -> int:
+        """Quantidade de usuários com pontuação menor ou igual a `points`."""
+        index = min(max(0, int(points)) + 1, len(self._counts))
+        result = 0
+        while index > 0:
+            result += self._tree[index]
+            index -= index & -index
+        return result
+
+    def move(self, old_points: Optional[int], new_points: Optional[int]) -> None:
+        """
+        Atualiza a contagem quando um usuário muda de pontuação.
+
+        Args:
+            old_points: Pontuação anterior (None = usuário novo)
+            new_points: Pontuação nova (None = usuário removido)
+        """
+        if old_points is not None:
+            self._add(old_points, -1)
+            self.total -= 1
+        if new_points is not None:
+            self._add(new_points, 1)
+            self.total += 1
+
+    def rank(self, points: int) -> int:
+        """Posição (1 = primeiro) de quem tem `points`; empates dividem a posição."""
+        return self.total - self._at_or_below(points) + 1
+
+    def percentile(self, points: int) -> float:
+        """Percentual de participantes com pontuação menor ou igual (primeiro = 100)."""
+        if self.total <= 0:
+            return 0.0
+        return round(100 * self._at_or_below(points) / self.total, 1)
+
+    def position(self, points: Optional[int]) -> Dict[str, Optional[float]]:
+        """Posição e percentil (None quando o usuário não pontuou)."""
+        if points is None:
+            return {"user_position": None, "percentile": None}
+        return {"user_position": self.rank(points), "percentile": self.percentile(points)}
+
+    def stats(self) -> Dict[str, int]:
+        """Tamanho do histograma."""
+        top = next(
+            (points for points in range(len(self._counts) - 1, -1, -1) if self._counts[points]),
+            0
+        )
+        return {
+            "participants": self.total,
+            "max_points": top,
+            "distinct_scores": self._distinct
+        }
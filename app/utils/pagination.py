@@ -0,0 +1,40 @@
+"""
+Cursores de paginação por chave (keyset) para os rankings.
+O cursor é a última posição da página, (pontos, username), codificada de forma opaca.
+"""
+import base64
+import json
+from typing import Optional, Tuple
+
+from app.utils.exceptions import ValidationError
+
+# Posição no ranking: (pontos, username) - ordem de pontos desc, username asc
+RankingCursor = Tuple[int, str]
+
+
+def encode_cursor(points: int, username: str) -> str:
+    """Codifica a última posição da página como cursor opaco (base64 url-safe)."""
+    raw = json.dumps({"p": points, "u": username}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[RankingCursor]:
+    """
+    Decodifica o cursor recebido do cliente.
+
+    Raises:
+        ValidationError: Cursor malformado
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["p"]), str(data["u"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValidationError(
+            message="Cursor de paginação inválido",
+            error_code="INVALID_CURSOR",
+            details={"cursor": cursor}
+        ) from e
@@ -0,0 +1,182 @@
+"""
+Calendário de dias úteis pré-calculado (fins de semana + feriados).
+Mantém, para um intervalo contínuo de anos, um bitmap de dias úteis, a tabela de
+"dia útil anterior" e a contagem acumulada de dias úteis: todas as consultas são O(1).
+"""
+import json
+from array import array
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core import config
+from app.utils.constants import WEEKDAYS
+from app.utils.logging import system_logger
+
+
+def easter_sunday(year: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+class WorkdayCalendar:
+    """Calendário de dias úteis com tabelas pré-calculadas por ano."""
+
+    def __init__(
+        self,
+        fixed: Iterable[Tuple[int, int]] = (),
+        easter_offsets: Iterable[int] = (),
+        dates: Iterable[date] = ()
+    ):
+        """
+        Args:
+            fixed: Feriados de data fixa como (mês, dia)
+            easter_offsets: Feriados móveis em dias relativos ao Domingo de Páscoa
+            dates: Datas avulsas (feriados da empresa, pontos facultativos)
+        """
+        self._fixed = frozenset(fixed)
+        self._easter_offsets = tuple(easter_offsets)
+        self._dates = frozenset(dates)
+
+        self._first_year: Optional[int] = None
+        self._last_year: Optional[int] = None
+        self._base = 0                      # ordinal do primeiro dia coberto
+        self._anchor: Optional[int] = None  # ordinal de referência do índice (fixo após o 1º build)
+        self._bits = bytearray()            # bit 1 = dia útil
+        self._previous = array("i")         # ordinal do dia útil anterior (0 = fora do intervalo)
+        self._index = array("i")            # dias úteis acumulados até o dia (inclusive)
+
+    @classmethod
+    def from_file(cls, path: str) -> "WorkdayCalendar":
+        """
+        Carrega os feriados de um arquivo JSON com as chaves `fixed` ("MM-DD"),
+        `easter_offsets` (dias relativos à Páscoa) e `dates` ("YYYY-MM-DD").
+
+        Sem arquivo (ou com arquivo inválido) apenas os fins de semana são excluídos.
+        """
+        try:
+            with open(Path(path), encoding="utf-8") as holiday_file:
+                data = json.load(holiday_file)
+
+            fixed = [tuple(int(part) for part in key.split("-")) for key in data.get("fixed", {})]
+            easter_offsets = [int(offset) for offset in data.get("easter_offsets", {})]
+            dates = [date.fromisoformat(day) for day in data.get("dates", {})]
+        except (OSError, ValueError) as e:
+            system_logger.warning(
+                "⚠️ Arquivo de feriados indisponível - considerando apenas fins de semana",
+                {"path": str(path), "error": str(e)}
+            )
+            return cls()
+
+        return cls(fixed=fixed, easter_offsets=easter_offsets, dates=dates)
+
+    def _holidays_for(self, year: int) -> set:
+        """Feriados do ano (fixos, móveis e avulsos)."""
+        holidays = {date(year, month, day) for month, day in self._fixed}
+        if self._easter_offsets:
+            easter = easter_sunday(year)
+            holidays.update(easter + timedelta(days=offset) for offset in self._easter_offsets)
+        holidays.update(day for day in self._dates if day.year == year)
+        return holidays
+
+    def _build(self, first_year: int, last_year: int) -> None:
+        """(Re)constrói as tabelas para os anos [first_year, last_year]."""
+        holidays = set()
+        for year in range(first_year, last_year + 1):
+            holidays |= self._holidays_for(year)
+
+        base = date(first_year, 1, 1).toordinal()
+        days = date(last_year, 12, 31).toordinal() - base + 1
+
+        bits = bytearray((days + 7) // 8)
+        previous = array("i", [0]) * days
+        index = array("i", [0]) * days
+
+        last_workday = 0
+        count = 0
+        for offset in range(days):
+            current = date.fromordinal(base + offset)
+            previous[offset] = last_workday
+            if current.weekday() not in WEEKDAYS['WEEKEND'] and current not in holidays:
+                bits[offset >> 3] |= 1 << (offset & 7)
+                last_workday = base + offset
+                count += 1
+            index[offset] = count
+
+        # Índice relativo a uma data fixa: estender o intervalo não muda os valores já emitidos
+        if self._anchor is None:
+            self._anchor = base
+        shift = index[self._anchor - base - 1] if self._anchor > base else 0
+        if shift:
+            for offset in range(days):
+                index[offset] -= shift
+
+        self._first_year, self._last_year = first_year, last_year
+        self._base, self._bits, self._previous, self._index = base, bits, previous, index
+
+    def _offset(self, target_date: date) -> int:
+        """Posição da data nas tabelas (estende o intervalo de anos quando necessário)."""
+        year = target_date.year
+        if self._first_year is None:
+            self._build(year - 1, year + 1)
+        elif year <= self._first_year or year > self._last_year:
+            # Um ano de folga antes garante o "dia útil anterior" de janeiro
+            self._build(min(self._first_year, year - 1), max(self._last_year, year))
+        return target_date.toordinal() - self._base
+
+    def is_workday(self, target_date: date) -> bool:
+        """Verifica se a data é dia útil (não é fim de semana nem feriado)."""
+        offset = self._offset(target_date)
+        return bool(self._bits[offset >> 3] & (1 << (offset & 7)))
+
+    def is_holiday(self, target_date: date) -> bool:
+        """Verifica se a data é feriado em dia de semana."""
+        return target_date.weekday() not in WEEKDAYS['WEEKEND'] and not self.is_workday(target_date)
+
+    def previous_workday(self, target_date: date) -> date:
+        """Dia útil imediatamente anterior à data."""
+        offset = self._offset(target_date)
+        return date.fromordinal(self._previous[offset])
+
+    def workday_index(self, target_date: date) -> int:
+        """
+        Posição da data na sequência de dias úteis (dias não úteis repetem o índice do
+        dia útil anterior). Só a diferença entre índices tem significado.
+        """
+        offset = self._offset(target_date)
+        return self._index[offset]
+
+    def workdays_between(self, start: date, end: date) -> int:
+        """Dias úteis no intervalo (start, end] - ex.: 1 entre dias úteis consecutivos."""
+        # Garantir que as duas datas estão no mesmo intervalo de tabelas antes de comparar
+        self._offset(min(start, end))
+        self._offset(max(start, end))
+        return (
+            self._index[end.toordinal() - self._base]
+            - self._index[start.toordinal() - self._base]
+        )
+
+    def stats(self) -> Dict:
+        """Intervalo de anos pré-calculado e tamanho das tabelas."""
+        return {
+            "first_year": self._first_year,
+            "last_year": self._last_year,
+            "days": len(self._index),
+            "workdays": self._index[-1] - self._index[0] + (self._bits[0] & 1) if self._index else 0,
+            "table_bytes": len(self._bits) + self._previous.itemsize * len(self._previous)
+                           + self._index.itemsize * len(self._index)
+        }
+
+
+# Instância global do calendário de dias úteis
+workday_calendar = WorkdayCalendar.from_file(config.HOLIDAYS_FILE)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmark do custo de autenticação por requisição (app/auth.py):
+verificação do JWT com e sem o cache de tokens verificados.
+"""
+
+import os
+import statistics
+import time
+
+# Valores padrão para permitir importar a aplicação sem um .env configurado
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from app.auth import create_access_token, decode_access_token, verified_token_cache
+
+
+def benchmark_decode(token, use_cache, iterations=5000, rounds=5):
+    """Mede o tempo médio (em microssegundos) de verificação do token por requisição"""
+    results = []
+
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            decode_access_token(token, use_cache=use_cache)
+        elapsed = time.perf_counter() - start_time
+        results.append(elapsed / iterations * 1_000_000)
+
+    return {
+        "avg": statistics.mean(results),
+        "min": min(results),
+        "max": max(results)
+    }
+
+
+def main():
+    print("🔬 MICRO-BENCHMARK DE AUTENTICAÇÃO")
+    print("=" * 50)
+
+    token = create_access_token({"sub": "benchmark"})
+    verified_token_cache.clear()
+
+    uncached = benchmark_decode(token, use_cache=False)
+    cached = benchmark_decode(token, use_cache=True)
+
+    print(f"\n📈 CUSTO POR REQUISIÇÃO (verificação do JWT):")
+    print(f"   🐌 Sem cache: {uncached['avg']:.2f}µs (min {uncached['min']:.2f}µs / max {uncached['max']:.2f}µs)")
+    print(f"   🚀 Com cache: {cached['avg']:.2f}µs (min {cached['min']:.2f}µs / max {cached['max']:.2f}µs)")
+    print(f"   📊 Ganho: {uncached['avg'] / cached['avg']:.1f}x")
+    print(f"   🗂️  Estatísticas do cache: {verified_token_cache.stats()}")
+
+    print(f"\n✅ BENCHMARK CONCLUÍDO!")
+
+
+if __name__ == "__main__":
+    main()